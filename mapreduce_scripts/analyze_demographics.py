@@ -2,12 +2,16 @@
 from collections import defaultdict
 import sys
 
+from category_dictionary import Encoder
+
 class DemographicsMapper:
-    def __init__(self):
+    def __init__(self, dictionary_path=None):
         # Update indices based on actual file structure
         self.age_idx = 7        # AGE is in column 8
         self.gender_idx = 3     # gender is in column 4 (0=female, 1=male)
         self.region_idx = 4     # region is in column 5
+        # Emit region ids instead of names when a category dictionary is shipped
+        self.encoder = Encoder(dictionary_path)
 
     def map(self):
         for line in sys.stdin:
@@ -33,12 +37,15 @@ class DemographicsMapper:
                 if region and region.strip():
                     # Extract just the main region name before the comma
                     main_region = region.split(',')[0].strip()
-                    print(f'REGION\t{main_region}\t1')
+                    print(f'REGION\t{self.encoder.encode("main_region", main_region)}\t1')
                     
             except Exception as e:
                 continue
 
 class DemographicsReducer:
+    def __init__(self, dictionary_path=None):
+        self.encoder = Encoder(dictionary_path)
+
     def reduce(self):
         current_category = None
         current_key = None
@@ -65,6 +72,11 @@ class DemographicsReducer:
                 
         if current_category and current_key:
             stats[current_category][current_key] = current_count
+
+        # Decode dictionary ids only now, at output time
+        if 'REGION' in stats:
+            stats['REGION'] = {self.encoder.decode('main_region', key): count
+                               for key, count in stats['REGION'].items()}
             
         # Print results with total counts
         for category in sorted(stats.keys()):
@@ -75,15 +87,16 @@ class DemographicsReducer:
                 print(f"{key}: Count={stats[category][key]} ({percentage:.2f}%)")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python script.py [mapper|reducer] [category_dictionary.json]")
         sys.exit(1)
+    dictionary_path = sys.argv[2] if len(sys.argv) == 3 else None
         
     if sys.argv[1] == "mapper":
-        mapper = DemographicsMapper()
+        mapper = DemographicsMapper(dictionary_path)
         mapper.map()
     elif sys.argv[1] == "reducer":
-        reducer = DemographicsReducer()
+        reducer = DemographicsReducer(dictionary_path)
         reducer.reduce()
     else:
         print("Invalid argument. Use 'mapper' or 'reducer'")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Persisted, versioned dictionary of categorical profile values.
+
+Mappers that group by region, gender or eye_color can emit the small integer id
+of a value instead of the value itself (Slovak region names are long and make up
+most of the shuffle), and reducers decode ids only when writing the report.
+Ship the JSON file to tasks through the distributed cache, e.g.
+
+    -files hdfs:///pokec/category_dictionary.json#category_dictionary.json
+
+together with this script and groupby_engine.py, and pass its name to the
+mapper and reducer. Ids are append-only: rebuilding against new data keeps
+existing ids and bumps the version.
+"""
+import json
+import sys
+from collections import defaultdict
+
+from groupby_engine import read_profiles
+
+# feature -> profile column index
+FEATURES = {
+    'gender': 3,
+    'region': 4,
+    'eye_color': 9,
+}
+UNKNOWN_PREFIX = '~'  # values missing from the dictionary travel verbatim
+
+
+class CategoryDictionary:
+    def __init__(self, features=None, version=0):
+        self.version = version
+        self.values = {feature: list(values) for feature, values in (features or {}).items()}
+        self._ids = {}
+        self._reindex()
+
+    def _reindex(self):
+        # main_region ids are derived from the full region list so the two never disagree
+        main_regions = []
+        for region in self.values.get('region', []):
+            main_region = region.split(',')[0].strip()
+            if main_region not in main_regions:
+                main_regions.append(main_region)
+        self.values['main_region'] = main_regions
+        self._ids = {feature: {value: i for i, value in enumerate(values)}
+                     for feature, values in self.values.items()}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['features'], data['version'])
+
+    def save(self, path):
+        features = {feature: values for feature, values in self.values.items() if feature in FEATURES}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'features': features}, f, ensure_ascii=False, indent=1)
+
+    def update(self, counts):
+        """Append unseen values (most frequent first, so they get the smallest ids)"""
+        changed = False
+        for feature, value_counts in counts.items():
+            known = self._ids.get(feature, {})
+            new = sorted((value for value in value_counts if value not in known),
+                         key=lambda value: (-value_counts[value], value))
+            if new:
+                self.values.setdefault(feature, []).extend(new)
+                changed = True
+        if changed:
+            self.version += 1
+            self._reindex()
+        return changed
+
+    def encode(self, feature, value):
+        idx = self._ids[feature].get(value)
+        return UNKNOWN_PREFIX + value if idx is None else str(idx)
+
+    def decode(self, feature, token):
+        if token.startswith(UNKNOWN_PREFIX):
+            return token[len(UNKNOWN_PREFIX):]
+        return self.values[feature][int(token)]
+
+
+class Encoder:
+    """Encode/decode helper for mappers and reducers; a no-op without a dictionary"""
+    def __init__(self, path=None):
+        self.dictionary = CategoryDictionary.load(path) if path else None
+
+    def encode(self, feature, value):
+        return self.dictionary.encode(feature, value) if self.dictionary else value
+
+    def decode(self, feature, token):
+        return self.dictionary.decode(feature, token) if self.dictionary else token
+
+
+class DictionaryMapper:
+    def map(self):
+        """Pre-pass: emit distinct values per feature with in-mapper counts"""
+        for feature, value_counts in profile_counts(sys.stdin).items():
+            for value, count in value_counts.items():
+                print(f"{feature}\t{value}\t{count}")
+
+
+class DictionaryReducer:
+    def reduce(self):
+        counts = defaultdict(int)
+        for line in sys.stdin:
+            try:
+                feature, value, count = line.rstrip('\n').split('\t')
+                counts[(feature, value)] += int(count)
+            except Exception:
+                continue
+
+        for (feature, value), count in counts.items():
+            print(f"{feature}\t{value}\t{count}")
+
+
+def read_counts(lines):
+    counts = defaultdict(dict)
+    for line in lines:
+        feature, value, count = line.rstrip('\n').split('\t')
+        counts[feature][value] = counts[feature].get(value, 0) + int(count)
+    return counts
+
+
+def profile_counts(source):
+    counts = defaultdict(lambda: defaultdict(int))
+    for frame in read_profiles(source, FEATURES.values()):
+        for feature, idx in FEATURES.items():
+            for value, count in frame[idx].value_counts().items():
+                if value:
+                    counts[feature][value] += int(count)
+    return counts
+
+
+def build(counts, path):
+    """Merge value counts into the dictionary at path (created if missing)"""
+    try:
+        dictionary = CategoryDictionary.load(path)
+    except FileNotFoundError:
+        dictionary = CategoryDictionary()
+    dictionary.update(counts)
+    dictionary.save(path)
+    return dictionary
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python category_dictionary.py [mapper|reducer]\n"
+             "       python category_dictionary.py build <reducer_output> <dictionary.json>\n"
+             "       python category_dictionary.py local <profiles_file> <dictionary.json>")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "mapper":
+        DictionaryMapper().map()
+    elif sys.argv[1] == "reducer":
+        DictionaryReducer().reduce()
+    elif sys.argv[1] in ("build", "local") and len(sys.argv) == 4:
+        if sys.argv[1] == "build":
+            with open(sys.argv[2], encoding='utf-8') as f:
+                counts = read_counts(f)
+        else:
+            counts = profile_counts(sys.argv[2])
+        dictionary = build(counts, sys.argv[3])
+        sizes = ', '.join(f"{feature}={len(values)}" for feature, values in dictionary.values.items())
+        print(f"Dictionary version {dictionary.version}: {sizes}")
+    else:
+        print(usage)
+        sys.exit(1)
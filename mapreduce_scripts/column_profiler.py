@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""One-pass profile of every Pokec column built from mergeable sketches.
+
+For each column the mapper tracks the null rate, numeric min/max, an
+approximate distinct count (HyperLogLog), the most frequent values
+(Space-Saving) and a uniform reservoir sample. Each mapper emits one JSON line
+per column, the combiner/reducer merges them, so the shuffle stays a few
+hundred kilobytes per mapper regardless of input size.
+"""
+import json
+import sys
+
+import pandas as pd
+
+from groupby_engine import PROFILE_COLUMNS, read_profiles
+from sketches import HyperLogLog, Reservoir, SpaceSaving
+
+TOP_K = 10
+SAMPLE_SIZE = 10
+NULL_VALUES = ['', 'null']
+
+
+class ColumnProfile:
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.min = None
+        self.max = None
+        self.distinct = HyperLogLog()
+        # Twice the reported k so the reported top values are reliable
+        self.top = SpaceSaving(TOP_K * 2)
+        self.sample = Reservoir(SAMPLE_SIZE)
+
+    def update(self, values):
+        """Update from one chunk of a column (pandas Series of strings)"""
+        self.rows += len(values)
+        present = values[~values.isin(NULL_VALUES)]
+        self.nulls += len(values) - len(present)
+        if not len(present):
+            return
+
+        numbers = pd.to_numeric(present, errors='coerce').dropna()
+        if len(numbers):
+            self.numeric += len(numbers)
+            self.min = float(numbers.min()) if self.min is None else min(self.min, float(numbers.min()))
+            self.max = float(numbers.max()) if self.max is None else max(self.max, float(numbers.max()))
+
+        self.distinct.add_hashes(pd.util.hash_pandas_object(present, index=False).to_numpy())
+        self.top.update(present.value_counts().to_dict())
+        self.sample.add_many(present.tolist())
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric += other.numeric
+        for bound, pick in (('min', min), ('max', max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self.distinct.merge(other.distinct)
+        self.top.merge(other.top)
+        self.sample.merge(other.sample)
+
+    def to_dict(self):
+        return {'rows': self.rows, 'nulls': self.nulls, 'numeric': self.numeric,
+                'min': self.min, 'max': self.max, 'distinct': self.distinct.to_dict(),
+                'top': self.top.to_dict(), 'sample': self.sample.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        profile.rows, profile.nulls, profile.numeric = data['rows'], data['nulls'], data['numeric']
+        profile.min, profile.max = data['min'], data['max']
+        profile.distinct = HyperLogLog.from_dict(data['distinct'])
+        profile.top = SpaceSaving.from_dict(data['top'])
+        profile.sample = Reservoir.from_dict(data['sample'])
+        return profile
+
+
+def profile_frames(frames):
+    profiles = {}
+    for frame in frames:
+        for column in frame.columns:
+            profiles.setdefault(column, ColumnProfile()).update(frame[column])
+    return profiles
+
+
+def emit(profiles, out=sys.stdout):
+    for column, profile in sorted(profiles.items()):
+        out.write(f"{column}\t{json.dumps(profile.to_dict(), ensure_ascii=False)}\n")
+
+
+def report(profiles, out=sys.stdout):
+    out.write("Column\tName\tRows\tNull_Rate\tApprox_Distinct\tNumeric_Rate\tMin\tMax\n")
+    for column, profile in sorted(profiles.items()):
+        present = profile.rows - profile.nulls
+        null_rate = profile.nulls / profile.rows * 100 if profile.rows else 0
+        numeric_rate = profile.numeric / present * 100 if present else 0
+        bounds = ['-' if v is None else f"{v:g}" for v in (profile.min, profile.max)]
+        out.write(f"{column}\t{PROFILE_COLUMNS[column]}\t{profile.rows}\t{null_rate:.2f}\t"
+                  f"{profile.distinct.count()}\t{numeric_rate:.2f}\t{bounds[0]}\t{bounds[1]}\n")
+
+    out.write("\nTop Values:\n")
+    out.write("=" * 80 + "\n")
+    for column, profile in sorted(profiles.items()):
+        out.write(f"\n{PROFILE_COLUMNS[column]} (column {column}):\n")
+        for value, count, error in profile.top.top(TOP_K):
+            out.write(f"{value}\t{count}\t(+/-{error})\n")
+
+    out.write("\nRandom Samples:\n")
+    out.write("=" * 80 + "\n")
+    for column, profile in sorted(profiles.items()):
+        out.write(f"\n{PROFILE_COLUMNS[column]} (column {column}):\n")
+        for value in profile.sample.sample():
+            out.write(f"{value}\n")
+
+
+class ProfilerMapper:
+    def map(self):
+        emit(profile_frames(read_profiles(sys.stdin, range(len(PROFILE_COLUMNS)))))
+
+
+class ProfilerReducer:
+    def __init__(self, final=True):
+        self.final = final  # False when used as the combiner
+
+    def reduce(self):
+        profiles = {}
+        for line in sys.stdin:
+            try:
+                column, data = line.rstrip('\n').split('\t', 1)
+                profile = ColumnProfile.from_dict(json.loads(data))
+            except Exception:
+                continue
+            column = int(column)
+            if column in profiles:
+                profiles[column].merge(profile)
+            else:
+                profiles[column] = profile
+
+        if self.final:
+            report(profiles)
+        else:
+            emit(profiles)
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python column_profiler.py [mapper|combiner|reducer]\n"
+             "       python column_profiler.py local <profiles_file>")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "mapper":
+        ProfilerMapper().map()
+    elif sys.argv[1] == "combiner":
+        ProfilerReducer(final=False).reduce()
+    elif sys.argv[1] == "reducer":
+        ProfilerReducer().reduce()
+    elif sys.argv[1] == "local" and len(sys.argv) == 3:
+        report(profile_frames(read_profiles(sys.argv[2], range(len(PROFILE_COLUMNS)))))
+    else:
+        print(usage)
+        sys.exit(1)
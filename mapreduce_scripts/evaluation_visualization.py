@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import sys
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from figure_spec import FigureSpec
+from streaming_evaluation import COUNTS_FILE, read_counts
+
+class EvaluationVisualizer:
+    """ROC, precision-recall and confusion-matrix plots from streaming_evaluation.py counts"""
+    def __init__(self, counts_file=COUNTS_FILE):
+        with open(counts_file) as f:
+            self.counts = read_counts(f)
+
+    def plot_roc_curves(self):
+        plt.figure(figsize=(10, 6))
+
+        for name, counts in sorted(self.counts.items()):
+            fpr, tpr, _, _ = counts.curves()
+            auc, error = counts.auc()
+            plt.plot(fpr, tpr, label=f'{name} (AUC = {auc:.3f} ± {error:.3f})')
+
+        plt.plot([0, 1], [0, 1], 'k--')
+        plt.xlim([0.0, 1.0])
+        plt.ylim([0.0, 1.05])
+        plt.xlabel('False Positive Rate')
+        plt.ylabel('True Positive Rate')
+        plt.title('ROC Curves (streaming evaluation)')
+        plt.legend(loc="lower right")
+        plt.tight_layout()
+        plt.savefig('results/models/streaming_roc_curves.png')
+        plt.close()
+
+    def plot_pr_curves(self):
+        plt.figure(figsize=(10, 6))
+
+        for name, counts in sorted(self.counts.items()):
+            _, _, recall, precision = counts.curves()
+            # Skip the empty-prediction point at the top threshold
+            plt.plot(recall[1:], precision[1:], label=name)
+
+        plt.xlim([0.0, 1.0])
+        plt.ylim([0.0, 1.05])
+        plt.xlabel('Recall')
+        plt.ylabel('Precision')
+        plt.title('Precision-Recall Curves (streaming evaluation)')
+        plt.legend(loc="lower left")
+        plt.tight_layout()
+        plt.savefig('results/models/streaming_pr_curves.png')
+        plt.close()
+
+    def plot_confusion_matrices(self):
+        fig, axes = plt.subplots(1, len(self.counts), figsize=(7.5 * len(self.counts), 6), squeeze=False)
+
+        for ax, (name, counts) in zip(axes[0], sorted(self.counts.items())):
+            sns.heatmap(counts.confusion, annot=True, fmt='d', ax=ax)
+            ax.set_title(f'{name} Confusion Matrix')
+            ax.set_xlabel('Predicted')
+            ax.set_ylabel('Actual')
+
+        plt.tight_layout()
+        plt.savefig('results/models/streaming_confusion_matrices.png')
+        plt.close()
+
+PLOTS = {
+    'plot_roc_curves': 'streaming_roc_curves.png',
+    'plot_pr_curves': 'streaming_pr_curves.png',
+    'plot_confusion_matrices': 'streaming_confusion_matrices.png',
+}
+
+def render_plot(counts_file, method):
+    getattr(EvaluationVisualizer(counts_file), method)()
+
+def figures(counts_file=COUNTS_FILE):
+    """Figures for render_plots.py"""
+    return [FigureSpec(f'models/{filename[:-4]}', 'evaluation_visualization', 'render_plot',
+                       [counts_file, method], [counts_file], [f'results/models/{filename}'])
+            for method, filename in PLOTS.items()]
+
+if __name__ == "__main__":
+    visualizer = EvaluationVisualizer(sys.argv[1] if len(sys.argv) > 1 else COUNTS_FILE)
+    if not visualizer.counts:
+        print("No evaluation counts found; run streaming_evaluation.py first")
+        sys.exit(1)
+
+    visualizer.plot_roc_curves()
+    visualizer.plot_pr_curves()
+    visualizer.plot_confusion_matrices()
+
+    print("Streaming evaluation plots have been saved in results/models/ directory")
@@ -2,14 +2,18 @@
 import sys
 from collections import defaultdict
 
+from category_dictionary import Encoder
+
 class CorrelationMapper:
-    def __init__(self):
+    def __init__(self, dictionary_path=None):
         # Define indices for relevant columns
         self.completion_idx = 2  # completion_percentage
         self.age_idx = 7        # age
         self.gender_idx = 3     # gender
         self.region_idx = 4     # region
         self.public_idx = 1     # public profile indicator
+        # Emit region ids instead of names when a category dictionary is shipped
+        self.encoder = Encoder(dictionary_path)
 
     def map(self):
         for line in sys.stdin:
@@ -40,7 +44,7 @@ class CorrelationMapper:
                 region = fields[self.region_idx]
                 if region and region.strip():
                     main_region = region.split(',')[0].strip()
-                    print(f'REGION\t{main_region}\t{completion}')
+                    print(f'REGION\t{self.encoder.encode("main_region", main_region)}\t{completion}')
 
                 # Emit public/private profile correlation
                 public = fields[self.public_idx]
@@ -52,6 +56,9 @@ class CorrelationMapper:
                 continue
 
 class CorrelationReducer:
+    def __init__(self, dictionary_path=None):
+        self.encoder = Encoder(dictionary_path)
+
     def reduce(self):
         current_feature = None
         current_value = None
@@ -79,6 +86,11 @@ class CorrelationReducer:
         if current_feature and current_value:
             stats[current_feature][current_value] = completions
 
+        # Decode dictionary ids only now, at output time
+        if 'REGION' in stats:
+            stats['REGION'] = {self.encoder.decode('main_region', value): completions
+                               for value, completions in stats['REGION'].items()}
+
         # Calculate and print statistics
         for feature in sorted(stats.keys()):
             print(f"\n{feature} Correlation with Completion Percentage:")
@@ -96,15 +108,16 @@ class CorrelationReducer:
                     print(f"{value}\t{len(completions)}\t{avg:.2f}%\t{min_val}%\t{max_val}%\t{median}%")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python script.py [mapper|reducer] [category_dictionary.json]")
         sys.exit(1)
+    dictionary_path = sys.argv[2] if len(sys.argv) == 3 else None
         
     if sys.argv[1] == "mapper":
-        mapper = CorrelationMapper()
+        mapper = CorrelationMapper(dictionary_path)
         mapper.map()
     elif sys.argv[1] == "reducer":
-        reducer = CorrelationReducer()
+        reducer = CorrelationReducer(dictionary_path)
         reducer.reduce()
     else:
         print("Invalid argument. Use 'mapper' or 'reducer'")
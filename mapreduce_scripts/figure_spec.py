@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Description of one renderable result figure, shared by the visualizers and render_plots.py.
+
+Kept free of plotting imports so that listing figures stays cheap.
+"""
+
+
+class FigureSpec:
+    def __init__(self, name, module, function, args=(), sources=(), outputs=()):
+        self.name = name            # e.g. 'task4/cluster_bubble_plot'
+        self.module = module        # visualizer module in mapreduce_scripts/
+        self.function = function    # module-level function that draws and saves the figure
+        self.args = tuple(args)     # plain values only, the spec is sent to worker processes
+        self.sources = list(sources)
+        self.outputs = list(outputs)
+
+    def describe(self):
+        return f"{self.module}.{self.function}({', '.join(map(repr, self.args))})"
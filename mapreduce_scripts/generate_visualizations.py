@@ -4,6 +4,10 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
+from figure_spec import FigureSpec
+
+DATA_FILE = 'results/visualization_data.txt'
+
 def load_data(file_path):
     # Read the data from the results file
     with open(file_path, 'r') as f:
@@ -66,42 +70,33 @@ def load_data(file_path):
     
     return pd.DataFrame(age_data), pd.DataFrame(height_data)
 
-def create_visualizations(age_df, height_df, output_dir):
-    # Create task3 directory if it doesn't exist
-    task3_dir = os.path.join(output_dir, 'task3')
-    os.makedirs(task3_dir, exist_ok=True)
-    
-    # Set style using seaborn's default style
-    sns.set_style("whitegrid")
-    
-    # 1. Age vs Completion Percentage Box Plot
+def plot_completion_boxplot(df, title, xlabel, path):
     plt.figure(figsize=(15, 8))
+    # Tick labels are set separately: boxplot's labels= keyword was renamed in newer matplotlib
     plt.boxplot([
         [row['Min'], row['Q1'], row['Median'], row['Q3'], row['Max']]
-        for _, row in age_df.iterrows()
-    ], labels=age_df['Range'])
-    plt.title('Age Groups vs Completion Percentage')
-    plt.xlabel('Age Groups')
+        for _, row in df.iterrows()
+    ])
+    plt.xticks(range(1, len(df) + 1), df['Range'])
+    plt.title(title)
+    plt.xlabel(xlabel)
     plt.ylabel('Completion Percentage')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.savefig(os.path.join(task3_dir, 'age_completion_boxplot.png'))
+    plt.savefig(path)
     plt.close()
-    
+
+def plot_age_boxplot(age_df, height_df, task3_dir):
+    # 1. Age vs Completion Percentage Box Plot
+    plot_completion_boxplot(age_df, 'Age Groups vs Completion Percentage', 'Age Groups',
+                            os.path.join(task3_dir, 'age_completion_boxplot.png'))
+
+def plot_height_boxplot(age_df, height_df, task3_dir):
     # 2. Height vs Completion Percentage Box Plot
-    plt.figure(figsize=(15, 8))
-    plt.boxplot([
-        [row['Min'], row['Q1'], row['Median'], row['Q3'], row['Max']]
-        for _, row in height_df.iterrows()
-    ], labels=height_df['Range'])
-    plt.title('Height (cm) vs Completion Percentage')
-    plt.xlabel('Height (cm)')
-    plt.ylabel('Completion Percentage')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(os.path.join(task3_dir, 'height_completion_boxplot.png'))
-    plt.close()
-    
+    plot_completion_boxplot(height_df, 'Height (cm) vs Completion Percentage', 'Height (cm)',
+                            os.path.join(task3_dir, 'height_completion_boxplot.png'))
+
+def plot_age_heatmap(age_df, height_df, task3_dir):
     # 3. Age Distribution Heatmap
     plt.figure(figsize=(15, 8))
     sns.heatmap(
@@ -116,12 +111,43 @@ def create_visualizations(age_df, height_df, output_dir):
     plt.tight_layout()
     plt.savefig(os.path.join(task3_dir, 'age_correlation_heatmap.png'))
     plt.close()
-    
+
+def save_statistics(age_df, height_df, task3_dir):
     # Save the numerical data as well
     age_df.to_csv(os.path.join(task3_dir, 'age_statistics.csv'), index=False)
     height_df.to_csv(os.path.join(task3_dir, 'height_statistics.csv'), index=False)
 
+PARTS = {
+    'age_completion_boxplot': (plot_age_boxplot, ['age_completion_boxplot.png']),
+    'height_completion_boxplot': (plot_height_boxplot, ['height_completion_boxplot.png']),
+    'age_correlation_heatmap': (plot_age_heatmap, ['age_correlation_heatmap.png']),
+    'statistics': (save_statistics, ['age_statistics.csv', 'height_statistics.csv']),
+}
+
+def create_visualizations(age_df, height_df, output_dir, parts=PARTS):
+    # Create task3 directory if it doesn't exist
+    task3_dir = os.path.join(output_dir, 'task3')
+    os.makedirs(task3_dir, exist_ok=True)
+    
+    # Set style using seaborn's default style
+    sns.set_style("whitegrid")
+    
+    for part in parts:
+        PARTS[part][0](age_df, height_df, task3_dir)
+
+def render_part(data_file, output_dir, part):
+    """Draw a single figure (or the statistics CSVs) straight from the data file"""
+    age_df, height_df = load_data(data_file)
+    create_visualizations(age_df, height_df, output_dir, [part])
+
+def figures(data_file=DATA_FILE, output_dir='results'):
+    """Figures for render_plots.py"""
+    return [FigureSpec(f'task3/{part}', 'generate_visualizations', 'render_part',
+                       [data_file, output_dir, part], [data_file],
+                       [os.path.join(output_dir, 'task3', name) for name in names])
+            for part, (_, names) in PARTS.items()]
+
 if __name__ == "__main__":
     # Create visualizations
-    age_df, height_df = load_data('results/visualization_data.txt')
-    create_visualizations(age_df, height_df, 'results') 
\ No newline at end of file
+    age_df, height_df = load_data(DATA_FILE)
+    create_visualizations(age_df, height_df, 'results')
\ No newline at end of file
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Declarative group-by engine for the completion_percentage reports.
+
+A report is a ReportSpec: a list of dimensions (name + key expression over one
+profile column) and the aggregates to print for each group. Because
+completion_percentage is an integer in [0, 100], every group is stored as a
+101-bin histogram, so count/mean/min/max/median/quartiles are exact and partial
+results from mappers can simply be added together.
+
+The same spec runs either as a Hadoop streaming job (mapper/combiner/reducer)
+or locally over chunked NumPy arrays.
+"""
+import csv
+import os
+import re
+import sys
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Column layout of soc-pokec-profiles.txt
+PROFILE_COLUMNS = [
+    'user_id', 'public', 'completion_percentage', 'gender', 'region', 'last_login',
+    'registration', 'AGE', 'body', 'I_am_working_in_field', 'spoken_languages', 'hobbies',
+    'I_most_enjoy_good_food', 'pets', 'body_type', 'my_eyesight', 'eye_color', 'hair_color',
+    'hair_type', 'completed_level_of_education', 'favourite_color', 'relation_to_smoking',
+    'relation_to_alcohol', 'sign_in_zodiac', 'on_pokec_i_am_looking_for', 'love_is_for_me',
+    'relation_to_casual_sex', 'my_partner_should_be', 'marital_status', 'children',
+    'relation_to_children', 'I_like_movies', 'I_like_watching_movie', 'I_like_music',
+    'I_mostly_like_listening_to_music', 'the_idea_of_good_evening',
+    'I_like_specialties_from_kitchen', 'fun', 'I_am_going_to_concerts', 'my_active_sports',
+    'my_passive_sports', 'profession', 'I_like_books', 'life_style', 'music', 'cars',
+    'politics', 'relationships', 'art_culture', 'hobbies_interests', 'science_technologies',
+    'computers_internet', 'education', 'sport', 'movies', 'travelling', 'health',
+    'companies_brands', 'more',
+]
+COMPLETION_IDX = 2
+VALUE_BINS = 101  # completion_percentage is an integer in [0, 100]
+CHUNK_SIZE = 200000
+STREAMING_JAR = os.environ.get(
+    'HADOOP_STREAMING_JAR',
+    os.path.join(os.environ.get('HADOOP_HOME', '/usr/local/hadoop'),
+                 'share/hadoop/tools/lib/hadoop-streaming-3.2.4.jar'))
+
+
+def read_profiles(source, columns, chunksize=CHUNK_SIZE):
+    """Yield DataFrames holding the requested profile columns as strings"""
+    reader = pd.read_csv(source, sep='\t', header=None, usecols=sorted(set(columns)),
+                         dtype=str, na_filter=False, quoting=csv.QUOTE_NONE,
+                         on_bad_lines='skip', encoding_errors='replace',
+                         chunksize=chunksize)
+    for chunk in reader:
+        yield chunk.fillna('')
+
+
+def _labels(values, fmt):
+    """Format the valid (non-NaN) entries of a numeric Series, None elsewhere"""
+    labels = pd.Series(None, index=values.index, dtype=object)
+    valid = values.notna()
+    labels[valid] = values[valid].map(fmt.format)
+    return labels
+
+
+def _range_labels(values, size):
+    starts = values // size * size
+    labels = pd.Series(None, index=values.index, dtype=object)
+    valid = starts.notna()
+    labels[valid] = [f"{float(start)}-{float(start + size)}" for start in starts[valid]]
+    return labels
+
+
+def _range_start(label):
+    return float(re.match(r'-?\d+(\.\d+)?', label).group())
+
+
+def _age(col):
+    age = pd.to_numeric(col.where(col.str.isdigit()), errors='coerce')
+    return age.where((age >= 0) & (age <= 100))
+
+
+def _height(col):
+    # Height is the leading integer of the body column, e.g. "185 cm, 80 kg"
+    height = col.str.split('cm').str[0].str.strip()
+    height = height.where(col.str.contains('cm', regex=False) & height.str.fullmatch(r'-?\d+'))
+    return pd.to_numeric(height, errors='coerce')
+
+
+def _binary_label(col, one, zero):
+    col = col.str.strip()
+    return col.map({'1': one, '0': zero})
+
+
+def _any_gender(col):
+    # Every non-empty gender counts; anything but "1" is reported as Female
+    col = col.str.strip()
+    labels = pd.Series('Female', index=col.index, dtype=object)
+    labels[col == '1'] = 'Male'
+    return labels.where(col != '')
+
+
+def _main_region(col):
+    return col.str.split(',').str[0].str.strip().where(col.str.strip() != '')
+
+
+def _full_region(col):
+    return col.str.strip().where(col.str.strip() != '')
+
+
+def parent_region(label):
+    """Kraj of a full "kraj, district" region label"""
+    return label.split(',')[0].strip()
+
+
+class KeyExpression:
+    """Vectorized mapping from one profile column to group labels (None skips the row)"""
+    def __init__(self, column, func, sort_key=None):
+        self.column = column
+        self.func = func
+        self.sort_key = sort_key
+
+    def __call__(self, col):
+        return self.func(col)
+
+
+KEY_EXPRESSIONS = {
+    'age': KeyExpression(7, lambda col: _labels(_age(col), '{:.0f}')),
+    'age_decade': KeyExpression(7, lambda col: _labels(_age(col) // 10 * 10, '{:.0f}')),
+    'age_decade_label': KeyExpression(7, lambda col: _labels(_age(col) // 10 * 10, '{:.0f}s')),
+    'age_range_10': KeyExpression(7, lambda col: _range_labels(_age(col), 10), _range_start),
+    'height_range_5': KeyExpression(8, lambda col: _range_labels(_height(col), 5), _range_start),
+    'gender_label': KeyExpression(3, lambda col: _binary_label(col, 'Male', 'Female')),
+    'gender_label_any': KeyExpression(3, _any_gender),
+    'main_region': KeyExpression(4, _main_region),
+    'region': KeyExpression(4, _full_region),
+    'profile_type': KeyExpression(1, lambda col: _binary_label(col, 'Public', 'Private')),
+}
+
+
+def _quantile(num, den):
+    """Value at sorted position n*num//den, as the original reducers index it"""
+    def aggregate(hist):
+        rank = (int(hist.sum()) * num) // den
+        return int(np.searchsorted(np.cumsum(hist), rank, side='right'))
+    return aggregate
+
+
+AGGREGATES = {
+    'count': lambda hist: int(hist.sum()),
+    'mean': lambda hist: float(np.dot(hist, np.arange(VALUE_BINS)) / hist.sum()),
+    'min': lambda hist: int(np.flatnonzero(hist)[0]),
+    'max': lambda hist: int(np.flatnonzero(hist)[-1]),
+    'q1': _quantile(1, 4),
+    'median': _quantile(1, 2),
+    'q3': _quantile(3, 4),
+}
+
+
+class ReportSpec:
+    """Declarative description of a grouped completion_percentage report"""
+    def __init__(self, name, dimensions, columns=(), value=True, layout='table',
+                 title='{dimension}', key_header='Category', rule=70, rollups=()):
+        self.name = name
+        self.dimensions = list(dimensions)   # [(dimension name, key expression name)]
+        self.columns = list(columns)         # [(header, aggregate name, format)]
+        self.value = value                   # group completion_percentage or just count rows
+        self.layout = layout
+        self.title = title
+        self.key_header = key_header
+        self.rule = rule
+        # [(coarse dimension, fine dimension, label -> parent label)]; coarse tables
+        # are derived from the fine histograms at report time, so mappers and the
+        # combiner only ever carry the finest level
+        self.rollups = list(rollups)
+
+    def input_columns(self):
+        columns = [KEY_EXPRESSIONS[expr].column for _, expr in self.dimensions]
+        if self.value:
+            columns.append(COMPLETION_IDX)
+        return columns
+
+
+SPECS = {
+    # results/demographics_analysis.txt (analyze_demographics.py)
+    'demographics': ReportSpec(
+        'demographics',
+        [('AGE', 'age_decade'), ('GENDER', 'gender_label_any'), ('REGION', 'main_region')],
+        value=False, layout='distribution'),
+    # results/correlation_analysis.txt (feature_correlations.py)
+    'correlations': ReportSpec(
+        'correlations',
+        [('AGE', 'age_decade_label'), ('GENDER', 'gender_label'),
+         ('REGION', 'main_region'), ('PROFILE_TYPE', 'profile_type')],
+        [('Count', 'count', '{}'), ('Avg Completion', 'mean', '{:.2f}%'),
+         ('Min', 'min', '{}%'), ('Max', 'max', '{}%'), ('Median', 'median', '{}%')],
+        title='{dimension} Correlation with Completion Percentage:'),
+    # results/visualization_data.txt (relationship_visualization.py)
+    'relationships': ReportSpec(
+        'relationships',
+        [('AGE', 'age_range_10'), ('HEIGHT', 'height_range_5')],
+        [('Count', 'count', '{}'), ('Avg Completion', 'mean', '{:.1f}%'),
+         ('Min', 'min', '{}%'), ('Max', 'max', '{}%'), ('Q1', 'q1', '{}%'),
+         ('Median', 'median', '{}%'), ('Q3', 'q3', '{}%')],
+        title='{dimension} vs Completion Percentage Statistics:',
+        key_header='Value Range', rule=80),
+    # Kraj and district completion tables from a single scan: only districts are
+    # shuffled, kraj totals are summed from them in the reducer
+    'regions': ReportSpec(
+        'regions',
+        [('DISTRICT', 'region')],
+        [('Count', 'count', '{}'), ('Avg Completion', 'mean', '{:.2f}%'),
+         ('Min', 'min', '{}%'), ('Max', 'max', '{}%'), ('Median', 'median', '{}%')],
+        title='{dimension} Completion Statistics:', key_header='Region',
+        rollups=[('KRAJ', 'DISTRICT', parent_region)]),
+}
+
+
+class GroupTable:
+    """Per-dimension, per-label completion histograms; tables merge by addition"""
+    def __init__(self, spec):
+        self.spec = spec
+        self.groups = defaultdict(lambda: defaultdict(lambda: np.zeros(VALUE_BINS, dtype=np.int64)))
+
+    def add_chunk(self, frame):
+        """Aggregate one DataFrame of raw profile columns"""
+        if self.spec.value:
+            completion = frame[COMPLETION_IDX]
+            values = pd.to_numeric(completion.where(completion.str.isdigit()), errors='coerce')
+            keep = (values <= 100).to_numpy()
+            values = np.nan_to_num(values.to_numpy()).astype(np.int64)
+        else:
+            keep = np.ones(len(frame), dtype=bool)
+            values = np.zeros(len(frame), dtype=np.int64)
+
+        for dimension, expr_name in self.spec.dimensions:
+            expr = KEY_EXPRESSIONS[expr_name]
+            labels = expr(frame[expr.column])
+            mask = keep & labels.notna().to_numpy()
+            codes, uniques = pd.factorize(labels[mask])
+            if len(uniques) == 0:
+                continue
+            hist = np.bincount(codes * VALUE_BINS + values[mask],
+                               minlength=len(uniques) * VALUE_BINS).reshape(len(uniques), VALUE_BINS)
+            table = self.groups[dimension]
+            for label, row in zip(uniques, hist):
+                table[label] += row
+
+    def add(self, dimension, label, bin_idx, count):
+        self.groups[dimension][label][bin_idx] += count
+
+    def merge(self, other, sign=1):
+        """Add another table's histograms (sign=-1 retracts them); emptied groups are dropped"""
+        for dimension, table in other.groups.items():
+            for label, hist in table.items():
+                mine = self.groups[dimension][label]
+                mine += sign * hist
+                if not mine.any():
+                    del self.groups[dimension][label]
+
+    def emit(self, out=sys.stdout):
+        """Write non-empty bins as dimension \t label \t bin \t count"""
+        for dimension, table in self.groups.items():
+            for label, hist in table.items():
+                for bin_idx in np.flatnonzero(hist):
+                    out.write(f"{dimension}\t{label}\t{bin_idx}\t{hist[bin_idx]}\n")
+
+    def roll_up(self):
+        """Fill the coarse dimensions of the spec's hierarchies from their finer level"""
+        for coarse, fine, parent in self.spec.rollups:
+            table = self.groups[coarse]
+            table.clear()
+            for label, hist in self.groups[fine].items():
+                table[parent(label)] += hist
+
+    def sorted_labels(self, dimension):
+        expr_name = dict(self.spec.dimensions).get(dimension)
+        sort_key = KEY_EXPRESSIONS[expr_name].sort_key if expr_name else None
+        return sorted(self.groups[dimension], key=sort_key)
+
+    def report(self, out=sys.stdout):
+        """Format the aggregated groups in the layout of the original report"""
+        self.roll_up()
+        for dimension in sorted(self.groups):
+            table = self.groups[dimension]
+            if self.spec.layout == 'distribution':
+                total = sum(int(hist.sum()) for hist in table.values())
+                out.write(f"\n{dimension} Distribution (Total: {total}):\n")
+                for label in self.sorted_labels(dimension):
+                    count = int(table[label].sum())
+                    out.write(f"{label}: Count={count} ({count / total * 100:.2f}%)\n")
+                continue
+
+            out.write('\n' + self.spec.title.format(dimension=dimension) + '\n')
+            headers = [self.spec.key_header] + [header for header, _, _ in self.spec.columns]
+            out.write('\t'.join(headers) + '\n')
+            out.write('-' * self.spec.rule + '\n')
+            for label in self.sorted_labels(dimension):
+                hist = table[label]
+                cells = [fmt.format(AGGREGATES[agg](hist)) for _, agg, fmt in self.spec.columns]
+                out.write('\t'.join([label] + cells) + '\n')
+
+
+class GroupByMapper:
+    def __init__(self, spec):
+        self.spec = spec
+
+    def map(self):
+        """In-mapper combining: aggregate stdin in chunks, emit one line per non-empty bin"""
+        table = GroupTable(self.spec)
+        for frame in read_profiles(sys.stdin, self.spec.input_columns()):
+            table.add_chunk(frame)
+        table.emit()
+
+
+class GroupByReducer:
+    def __init__(self, spec, final=True):
+        self.spec = spec
+        self.final = final  # False when used as the combiner
+
+    def reduce(self):
+        table = GroupTable(self.spec)
+        for line in sys.stdin:
+            try:
+                dimension, label, bin_idx, count = line.rstrip('\n').split('\t')
+                table.add(dimension, label, int(bin_idx), int(count))
+            except Exception:
+                continue
+
+        if self.final:
+            table.report()
+        else:
+            table.emit()
+
+
+class LocalExecutor:
+    """Run a spec over a local profiles file without Hadoop"""
+    def __init__(self, spec, chunksize=CHUNK_SIZE):
+        self.spec = spec
+        self.chunksize = chunksize
+
+    def run(self, input_file):
+        table = GroupTable(self.spec)
+        for frame in read_profiles(input_file, self.spec.input_columns(), self.chunksize):
+            table.add_chunk(frame)
+        return table
+
+
+def streaming_command(spec_name, input_path, output_path, streaming_jar=STREAMING_JAR):
+    """Build the hadoop-streaming invocation for a spec"""
+    script = os.path.abspath(__file__)
+    name = os.path.basename(script)
+    return [
+        'hadoop', 'jar', streaming_jar,
+        '-files', script,
+        '-input', input_path,
+        '-output', output_path,
+        '-mapper', f'python3 {name} mapper {spec_name}',
+        '-combiner', f'python3 {name} combiner {spec_name}',
+        '-reducer', f'python3 {name} reducer {spec_name}',
+        '-numReduceTasks', '1',
+    ]
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python groupby_engine.py [mapper|combiner|reducer] <spec>\n"
+             "       python groupby_engine.py local <spec> <profiles_file>\n"
+             "       python groupby_engine.py command <spec> <hdfs_input> <hdfs_output>")
+    if len(sys.argv) < 3 or sys.argv[2] not in SPECS:
+        print(usage)
+        print(f"Available specs: {', '.join(sorted(SPECS))}")
+        sys.exit(1)
+
+    mode, spec = sys.argv[1], SPECS[sys.argv[2]]
+    if mode == "mapper":
+        GroupByMapper(spec).map()
+    elif mode == "combiner":
+        GroupByReducer(spec, final=False).reduce()
+    elif mode == "reducer":
+        GroupByReducer(spec).reduce()
+    elif mode == "local" and len(sys.argv) == 4:
+        LocalExecutor(spec).run(sys.argv[3]).report()
+    elif mode == "command" and len(sys.argv) == 5:
+        print(' '.join(f"'{arg}'" if ' ' in arg else arg
+                       for arg in streaming_command(spec.name, sys.argv[3], sys.argv[4])))
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Out-of-core training on the DataPrepMapper/DataPrepReducer output stream.
+
+Rows are read in fixed-size batches, so memory depends on the batch size only,
+never on the number of profiles. Features are standardized with a running
+mean/variance (Chan et al. parallel update) that is refreshed by every batch
+before the model's partial_fit sees it. The model and the scaler are saved
+together; training again on a newer profile snapshot continues from the saved
+state instead of starting over.
+
+    python model_prep.py mapper < profiles.txt | python incremental_training.py train sgd -
+"""
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neural_network import MLPClassifier
+
+from model_training import classification_metrics
+from prepared_data import FEATURE_COLS, PREPARED_FILE, read_text_chunks
+
+BATCH_SIZE = 50000
+CLASSES = np.array([0, 1])
+
+# Estimators with partial_fit
+INCREMENTAL_ENGINES = {
+    'sgd': lambda: SGDClassifier(loss='log_loss', random_state=42),
+    'nb': lambda: GaussianNB(),
+    'mlp': lambda: MLPClassifier(hidden_layer_sizes=(16,), random_state=42),
+}
+
+
+class RunningScaler:
+    """Streaming per-feature mean and variance; batches merge with Chan's formula"""
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)  # sum of squared deviations from the mean
+
+    def update(self, X):
+        n = len(X)
+        if not n:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.ones_like(self.mean)
+        std = np.sqrt(self.m2 / self.count)
+        return np.where(std > 0, std, 1.0)
+
+    def transform(self, X):
+        return (X - self.mean) / self.std
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean.tolist(), 'm2': self.m2.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        scaler = cls(len(data['mean']))
+        scaler.count = data['count']
+        scaler.mean = np.array(data['mean'], dtype=np.float64)
+        scaler.m2 = np.array(data['m2'], dtype=np.float64)
+        return scaler
+
+
+def load_scaler(state):
+    """Scaler of a saved state; older states pickled the RunningScaler object itself"""
+    scaler = state['scaler']
+    return RunningScaler.from_dict(scaler) if isinstance(scaler, dict) else scaler
+
+
+def model_path(engine):
+    return f'results/models/{engine}_incremental.pkl'
+
+
+def iter_batches(source, dataset, batch_size=BATCH_SIZE):
+    """(X, y) NumPy batches of one dataset from a prepared file or stream"""
+    for chunk in read_text_chunks(source, batch_size):
+        chunk = chunk[chunk['dataset'] == dataset]
+        if len(chunk):
+            yield chunk[FEATURE_COLS].to_numpy(np.float64), chunk['target'].to_numpy()
+
+
+class IncrementalTrainer:
+    def __init__(self, engine, path=None):
+        self.engine = engine
+        self.path = path or model_path(engine)
+        self.model = INCREMENTAL_ENGINES[engine]()
+        self.scaler = RunningScaler(len(FEATURE_COLS))
+        self.rows_seen = 0
+
+    def load(self):
+        """Continue from the saved state; False when there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        self.model, self.scaler, self.rows_seen = state['model'], load_scaler(state), state['rows_seen']
+        return True
+
+    def save(self):
+        # The scaler is stored as plain arrays so the pickle only references sklearn classes,
+        # whichever script (or __main__) saved it
+        with open(self.path, 'wb') as f:
+            pickle.dump({'engine': self.engine, 'model': self.model, 'scaler': self.scaler.to_dict(),
+                         'rows_seen': self.rows_seen, 'feature_cols': FEATURE_COLS}, f)
+
+    def train(self, source, batch_size=BATCH_SIZE):
+        for X, y in iter_batches(source, 'train', batch_size):
+            self.scaler.update(X)
+            self.model.partial_fit(self.scaler.transform(X), y, classes=CLASSES)
+            self.rows_seen += len(y)
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(self.scaler.transform(X))[:, 1]
+
+    def evaluate(self, source, dataset='test', batch_size=BATCH_SIZE):
+        """Metrics over a dataset, predicted batch by batch"""
+        y_true, y_pred = [], []
+        for X, y in iter_batches(source, dataset, batch_size):
+            y_true.append(y)
+            y_pred.append(self.model.predict(self.scaler.transform(X)))
+        if not y_true:
+            return None
+        # Only the labels are kept; feature batches are dropped after prediction
+        return classification_metrics(np.concatenate(y_true), np.concatenate(y_pred))
+
+
+if __name__ == '__main__':
+    usage = (f"Usage: python incremental_training.py train <{'|'.join(INCREMENTAL_ENGINES)}> "
+             f"[prepared_file|-] [batch_size] [fresh]\n"
+             f"       python incremental_training.py evaluate <{'|'.join(INCREMENTAL_ENGINES)}> "
+             f"[prepared_file|-] [test|validation]")
+    if (len(sys.argv) < 3 or sys.argv[1] not in ('train', 'evaluate')
+            or sys.argv[2] not in INCREMENTAL_ENGINES):
+        print(usage)
+        sys.exit(1)
+
+    trainer = IncrementalTrainer(sys.argv[2])
+    source = sys.argv[3] if len(sys.argv) > 3 else PREPARED_FILE
+    source = sys.stdin if source == '-' else source
+
+    if sys.argv[1] == "train":
+        batch_size = int(sys.argv[4]) if len(sys.argv) > 4 else BATCH_SIZE
+        fresh = len(sys.argv) > 5 and sys.argv[5] == 'fresh'
+        resumed = not fresh and trainer.load()
+        seen = trainer.rows_seen
+        start = time.perf_counter()
+        trainer.train(source, batch_size)
+        trainer.save()
+        print(f"{'Updated' if resumed else 'Trained'} {sys.argv[2]} on {trainer.rows_seen - seen} rows "
+              f"({trainer.rows_seen} in total) in {time.perf_counter() - start:.2f}s -> {trainer.path}")
+        print("Feature\tMean\tStd")
+        for feature, mean, std in zip(FEATURE_COLS, trainer.scaler.mean, trainer.scaler.std):
+            print(f"{feature}\t{mean:.4f}\t{std:.4f}")
+    else:
+        if not trainer.load():
+            print(f"No saved model at {trainer.path}; run train first")
+            sys.exit(1)
+        dataset = sys.argv[4] if len(sys.argv) > 4 else 'test'
+        metrics = trainer.evaluate(source, dataset)
+        if metrics is None:
+            print(f"No {dataset} rows in the input")
+            sys.exit(1)
+        print(f"\n{sys.argv[2].upper()} incremental model on {dataset} rows:")
+        print("-" * 40)
+        for metric, value in metrics.items():
+            print(f"{metric}: {value:.4f}")
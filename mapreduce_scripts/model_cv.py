@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Parallel stratified k-fold cross-validation of the model_training engines.
+
+The feature matrix is written once as .npy files (named after the prepared
+file's size and mtime, and reused while those match) and every worker process
+memory-maps them, so the data lives once in the page cache instead of being
+pickled to each worker. A task is just (engine, fold); the worker recomputes
+the deterministic fold split and gathers only its own fold's rows.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+from model_training import DEFAULT_ENGINES, ENGINES, classification_metrics
+from prepared_data import PREPARED_FILE, load_prepared, source_signature
+
+N_FOLDS = 5
+SEED = 42
+CV_DIR = 'results/models/cv'
+CV_SPLITS = ['train', 'test']  # validation stays held out for model_search.py
+
+
+def fold_indices(y, n_folds, fold, seed=SEED):
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    # Only the labels drive stratification, so a placeholder X avoids touching the features
+    return list(folds.split(np.zeros(len(y)), y))[fold]
+
+
+def run_fold(engine, fold, n_folds, x_file, y_file):
+    X = np.load(x_file, mmap_mode='r')
+    y = np.load(y_file, mmap_mode='r')
+    train_idx, test_idx = fold_indices(y, n_folds, fold)
+    model = clone(ENGINES[engine]())
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)  # parallelism comes from the fold pool
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    seconds = time.perf_counter() - start
+    return classification_metrics(y[test_idx], model.predict(X[test_idx])), seconds
+
+
+class CrossValidator:
+    def __init__(self, engines=None, n_folds=N_FOLDS, input_file=PREPARED_FILE, workers=None,
+                 splits=CV_SPLITS, cv_dir=CV_DIR):
+        self.engines = engines or DEFAULT_ENGINES
+        self.n_folds = n_folds
+        self.input_file = input_file
+        self.workers = workers or os.cpu_count() or 1
+        self.splits = splits
+        self.cv_dir = cv_dir
+
+    def matrix_files(self):
+        """X/y file names keyed by the prepared file's signature and the splits used"""
+        signature = source_signature(self.input_file)
+        key = hashlib.sha256(json.dumps([signature, self.splits]).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cv_dir, f'X_{key}.npy'), os.path.join(self.cv_dir, f'y_{key}.npy')
+
+    def write_matrix(self):
+        """Concatenate the cross-validated splits into X/y .npy files, unless already current.
+
+        Each file is written under a temporary name and renamed, so a concurrent
+        or interrupted run never leaves a torn matrix behind.
+        """
+        x_file, y_file = self.matrix_files()
+        if os.path.exists(x_file) and os.path.exists(y_file):
+            return x_file, y_file
+        loaded = load_prepared(self.input_file)
+        os.makedirs(self.cv_dir, exist_ok=True)
+        # y first: X is renamed last, so an existing X implies a complete y
+        for path, index in ((y_file, 1), (x_file, 0)):
+            tmp = f'{path[:-4]}.tmp-{os.getpid()}.npy'
+            np.save(tmp, np.concatenate([loaded[name][index] for name in self.splits]))
+            os.replace(tmp, path)
+        return x_file, y_file
+
+    def run(self):
+        """{engine: [(metrics, seconds) per fold]}"""
+        x_file, y_file = self.write_matrix()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {(engine, fold): pool.submit(run_fold, engine, fold, self.n_folds, x_file, y_file)
+                       for engine in self.engines for fold in range(self.n_folds)}
+            return {engine: [futures[(engine, fold)].result() for fold in range(self.n_folds)]
+                    for engine in self.engines}
+
+    def report(self, results):
+        print(f"\n{self.n_folds}-Fold Cross-Validation Results ({'+'.join(self.splits)} rows)")
+        print("=" * 80)
+        for engine, folds in results.items():
+            print(f"\n{engine.upper()} Classifier:")
+            print("-" * 40)
+            for metric in folds[0][0]:
+                values = np.array([metrics[metric] for metrics, _ in folds])
+                print(f"{metric}: {values.mean():.4f} +/- {values.std():.4f}")
+            print(f"Fit time per fold: {np.mean([seconds for _, seconds in folds]):.2f}s")
+
+
+if __name__ == '__main__':
+    # python model_cv.py [n_folds] [rf,gb,hgb] [workers]
+    try:
+        n_folds = int(sys.argv[1]) if len(sys.argv) > 1 else N_FOLDS
+        engines = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        if n_folds < 2 or any(e not in ENGINES for e in engines or []):
+            raise ValueError
+    except ValueError:
+        print(f"Usage: python model_cv.py [n_folds] [{','.join(ENGINES)}] [workers]")
+        sys.exit(1)
+
+    validator = CrossValidator(engines, n_folds, workers=workers)
+    validator.report(validator.run())
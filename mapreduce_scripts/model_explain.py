@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Permutation importance and partial dependence for the registry models.
+
+Impurity-based feature_importances_ favour features with many distinct values
+such as days_since_registration. Permutation importance instead measures how
+much the test score drops when one feature's values are shuffled, and partial
+dependence shows how the predicted probability moves across a feature's range.
+
+Every (model, feature, repeat) permutation and every (model, feature) curve is
+a separate task in a process pool. Workers memory-map the test split from the
+prepared_data.py cache and the joblib model, so the feature matrix is shared
+read-only between them. Baseline predictions are computed once per model and
+cached in results/models/explain, keyed by the model artifact and the data.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from sklearn.metrics import accuracy_score
+
+from model_registry import ModelRegistry, load_model
+from prepared_data import FEATURE_COLS, PREPARED_FILE, load_prepared, source_signature
+
+EXPLAIN_DIR = 'results/models/explain'
+N_REPEATS = 5
+GRID_POINTS = 20
+PD_ROWS = 5000  # rows averaged per partial-dependence grid point
+SEED = 42
+
+
+def test_split(input_file):
+    return load_prepared(input_file)['test']
+
+
+def baseline_predictions(name, input_file, explain_dir=EXPLAIN_DIR):
+    """Test-split predictions of a model, cached until the model or the data changes"""
+    registry = ModelRegistry()
+    artifact = os.stat(registry.path(name))
+    key = {'artifact': [artifact.st_size, artifact.st_mtime_ns], 'data': source_signature(input_file)}
+    path = os.path.join(explain_dir, f'{name}_baseline.npy')
+    key_path = os.path.join(explain_dir, f'{name}_baseline.json')
+    try:
+        with open(key_path) as f:
+            if json.load(f) == key:
+                return np.load(path)
+    except (OSError, ValueError):
+        pass
+
+    X, _ = test_split(input_file)
+    predictions = load_model(name).predict(X)
+    os.makedirs(explain_dir, exist_ok=True)
+    np.save(path, predictions)
+    with open(key_path, 'w') as f:
+        json.dump(key, f)
+    return predictions
+
+
+def worker_model(name):
+    model = load_model(name)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)  # parallelism comes from the pool
+    return model
+
+
+def permuted_score(name, input_file, feature, repeat):
+    """Test accuracy with one feature column shuffled"""
+    X, y = test_split(input_file)
+    X = np.array(X)  # private copy; the shared memmap stays read-only
+    rng = np.random.default_rng([SEED, feature, repeat])
+    X[:, feature] = rng.permutation(X[:, feature])
+    return accuracy_score(y, worker_model(name).predict(X))
+
+
+def partial_dependence(name, input_file, feature, grid_points=GRID_POINTS, max_rows=PD_ROWS):
+    """(grid, mean predicted probability) over quantiles of one feature"""
+    X, _ = test_split(input_file)
+    rows = np.random.default_rng(SEED).choice(len(X), min(max_rows, len(X)), replace=False)
+    X = np.array(X[np.sort(rows)])
+    grid = np.unique(np.quantile(X[:, feature], np.linspace(0.05, 0.95, grid_points)))
+    model = worker_model(name)
+    averages = []
+    for value in grid:
+        X[:, feature] = value
+        averages.append(float(model.predict_proba(X)[:, 1].mean()))
+    return grid, np.array(averages)
+
+
+class ModelExplainer:
+    def __init__(self, models=None, input_file=PREPARED_FILE, n_repeats=N_REPEATS, workers=None):
+        self.models = models or ['rf', 'gb']
+        self.input_file = input_file
+        self.n_repeats = n_repeats
+        self.workers = workers or os.cpu_count() or 1
+        self.importance = None
+        self.dependence = None
+
+    def run(self):
+        # Warm the shared .npy cache before workers start mapping it
+        load_prepared(self.input_file)
+        _, y = test_split(self.input_file)
+        baseline = {name: accuracy_score(y, baseline_predictions(name, self.input_file))
+                    for name in self.models}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            permutations = {(name, f, r): pool.submit(permuted_score, name, self.input_file, f, r)
+                            for name in self.models for f in range(len(FEATURE_COLS))
+                            for r in range(self.n_repeats)}
+            curves = {(name, f): pool.submit(partial_dependence, name, self.input_file, f)
+                      for name in self.models for f in range(len(FEATURE_COLS))}
+
+            rows = []
+            for name in self.models:
+                for f, feature in enumerate(FEATURE_COLS):
+                    drops = [baseline[name] - permutations[(name, f, r)].result()
+                             for r in range(self.n_repeats)]
+                    rows.append({'Model': name, 'Feature': feature, 'Baseline_Accuracy': baseline[name],
+                                 'Importance_Mean': np.mean(drops), 'Importance_Std': np.std(drops)})
+            self.importance = pd.DataFrame(rows)
+
+            rows = []
+            for (name, f), future in curves.items():
+                grid, averages = future.result()
+                rows.extend({'Model': name, 'Feature': FEATURE_COLS[f], 'Value': value,
+                             'Mean_Probability': average} for value, average in zip(grid, averages))
+            self.dependence = pd.DataFrame(rows)
+
+    def save(self, output_dir='results/models'):
+        self.importance.to_csv(os.path.join(output_dir, 'permutation_importance.txt'), sep='\t',
+                               index=False, float_format='%.6f')
+        self.dependence.to_csv(os.path.join(output_dir, 'partial_dependence.txt'), sep='\t',
+                               index=False, float_format='%.6f')
+
+        plt.figure(figsize=(12, 6))
+        width = 0.8 / len(self.models)
+        positions = np.arange(len(FEATURE_COLS))
+        for i, name in enumerate(self.models):
+            data = self.importance[self.importance['Model'] == name]
+            plt.bar(positions + (i - (len(self.models) - 1) / 2) * width, data['Importance_Mean'],
+                    width, yerr=data['Importance_Std'], capsize=4, label=name)
+        plt.xticks(positions, FEATURE_COLS, rotation=45)
+        plt.axhline(0, color='black', linewidth=0.8)
+        plt.legend(title='Model')
+        plt.title(f'Permutation Importance (accuracy drop, {self.n_repeats} repeats)')
+        plt.ylabel('Accuracy drop')
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'permutation_importance.png'))
+        plt.close()
+
+        fig, axes = plt.subplots(1, len(FEATURE_COLS), figsize=(6 * len(FEATURE_COLS), 5))
+        for ax, feature in zip(axes, FEATURE_COLS):
+            data = self.dependence[self.dependence['Feature'] == feature]
+            sns.lineplot(data=data, x='Value', y='Mean_Probability', hue='Model', marker='o', ax=ax)
+            ax.set_title(f'Partial Dependence: {feature}')
+            ax.set_xlabel(feature)
+            ax.set_ylabel('Mean P(public)')
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'partial_dependence.png'))
+        plt.close()
+
+
+if __name__ == '__main__':
+    # python model_explain.py [rf,gb] [n_repeats] [workers]
+    try:
+        models = sys.argv[1].split(',') if len(sys.argv) > 1 else None
+        n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else N_REPEATS
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    except ValueError:
+        print("Usage: python model_explain.py [rf,gb] [n_repeats] [workers]")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    explainer = ModelExplainer(models, n_repeats=n_repeats, workers=workers)
+    explainer.run()
+    explainer.save()
+    print(explainer.importance.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    print(f"\nPermutation importance and partial dependence saved in results/models/ "
+          f"({time.perf_counter() - start:.1f}s)")
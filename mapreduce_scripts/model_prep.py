@@ -1,9 +1,28 @@
 import sys
-import random
+import hashlib
+from collections import Counter
 from datetime import datetime
 
+from shard_writer import ShardWriter
+
+HEADER = "dataset\ttarget\tcompletion_percentage\tage\tdays_since_registration"
+DATASETS = ('train', 'test', 'validation')
+SPLIT_RATIOS = (0.7, 0.15, 0.15)
+SPLIT_SALT = 'pokec-split-v1'  # changing it reshuffles every user
+
+def split_for_user(user_id, ratios=SPLIT_RATIOS):
+    """Dataset of a user, a pure function of user_id: the same for any number of mappers"""
+    digest = hashlib.blake2b(f"{SPLIT_SALT}:{user_id}".encode('utf-8'), digest_size=8).digest()
+    position = int.from_bytes(digest, 'big') / 2 ** 64 * sum(ratios)
+    cumulative = 0
+    for dataset, ratio in zip(DATASETS, ratios):
+        cumulative += ratio
+        if position < cumulative:
+            return dataset
+    return DATASETS[-1]
+
 class DataPrepMapper:
-    def __init__(self):
+    def __init__(self, ratios=SPLIT_RATIOS, writer=None, datasets=DATASETS):
         # Define column indices
         self.columns = {
             'user_id': 0,
@@ -29,8 +48,15 @@ class DataPrepMapper:
         # Target variable (let's predict if profile is public)
         self.target_col = 'public'
         
-        # Set random seed for consistent splits
-        random.seed(42)
+        # train/test/validation ratios; the split is derived from a hash of user_id
+        self.ratios = ratios
+        
+        # Splits to emit; one split per job gives each split its own HDFS output directory
+        self.datasets = datasets
+        
+        # Optional ShardWriter for map-only output on a shared filesystem, one shard per dataset
+        self.writer = writer
+        self.split_counts = Counter()
     
     def parse_date(self, date_str):
         try:
@@ -38,46 +64,59 @@ class DataPrepMapper:
         except:
             return None
     
+    def extract_features(self, fields):
+        """Feature dict for one profile, or None without both dates (raises on bad values)"""
+        # Calculate days since registration
+        last_login = self.parse_date(fields[self.columns['last_login']])
+        registration = self.parse_date(fields[self.columns['registration']])
+        
+        if last_login and registration:
+            days_since_reg = (last_login - registration).days
+        else:
+            return None
+        
+        return {
+            'completion_percentage': float(fields[self.columns['completion_percentage']]),
+            'age': float(fields[self.columns['age']]) if fields[self.columns['age']] != "null" else 0,
+            'days_since_registration': days_since_reg
+        }
+    
     def map(self):
         """Map input data to features and split into train/test/validation"""
         for line in sys.stdin:
             try:
                 fields = line.strip().split('\t')
                 
-                # Calculate days since registration
-                last_login = self.parse_date(fields[self.columns['last_login']])
-                registration = self.parse_date(fields[self.columns['registration']])
-                
-                if last_login and registration:
-                    days_since_reg = (last_login - registration).days
-                else:
-                    continue
-                
                 # Get features
-                features = {
-                    'completion_percentage': float(fields[self.columns['completion_percentage']]),
-                    'age': float(fields[self.columns['age']]) if fields[self.columns['age']] != "null" else 0,
-                    'days_since_registration': days_since_reg
-                }
+                features = self.extract_features(fields)
+                if features is None:
+                    continue
                 
                 # Get target (convert to binary)
                 target = 1 if fields[self.columns[self.target_col]] == "1" else 0
                 
-                # Randomly assign to train/test/validation
-                split = random.random()
-                if split < 0.7:  # 70% training
-                    dataset = "train"
-                elif split < 0.85:  # 15% testing
-                    dataset = "test"
-                else:  # 15% validation
-                    dataset = "validation"
+                # Assign to train/test/validation by user_id hash
+                dataset = split_for_user(fields[self.columns['user_id']], self.ratios)
+                if dataset not in self.datasets:
+                    continue
+                self.split_counts[(dataset, target)] += 1
                 
                 # Output format: dataset \t target \t feature1 \t feature2 \t ...
-                feature_values = [str(features[col]) for col in self.feature_cols]
-                print(f"{dataset}\t{target}\t{'\t'.join(feature_values)}")
+                feature_values = '\t'.join(str(features[col]) for col in self.feature_cols)
+                line = f"{dataset}\t{target}\t{feature_values}"
+                if self.writer:
+                    self.writer.write(dataset, line)
+                else:
+                    print(line)
                 
             except Exception as e:
                 continue
+        
+        if self.writer:
+            self.writer.close()
+        # Per-split class counts, to check the target balance of each split
+        for (dataset, target), count in sorted(self.split_counts.items()):
+            sys.stderr.write(f"reporter:counter:DataPrep,{dataset}_target_{target},{count}\n")
 
 class DataPrepReducer:
     def reduce(self):
@@ -92,7 +131,7 @@ class DataPrepReducer:
                 # Print header for each new dataset
                 if dataset != current_dataset:
                     if current_dataset is None:
-                        print("dataset\ttarget\tcompletion_percentage\tage\tdays_since_registration")
+                        print(HEADER)
                     current_dataset = dataset
                 
                 # Output the line as is
@@ -101,17 +140,45 @@ class DataPrepReducer:
             except Exception:
                 continue
 
+def parse_ratios(arg):
+    ratios = tuple(float(r) for r in arg.split(','))
+    if len(ratios) != len(DATASETS) or min(ratios) < 0 or sum(ratios) <= 0:
+        raise ValueError(arg)
+    return ratios
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    usage = ("Usage: python model_prep.py mapper [train,test,validation ratios] [train|test|validation]\n"
+             "       python model_prep.py shard <output_dir> [ratios] [task_id]\n"
+             "       python model_prep.py [reducer|header]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+    
+    try:
+        if sys.argv[1] == "mapper" and len(sys.argv) <= 4:
+            # Also the map-only job on a cluster: -numReduceTasks 0 and Hadoop writes
+            # headerless part-m-* files to HDFS, the split being the first column
+            ratios = parse_ratios(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] else SPLIT_RATIOS
+            if len(sys.argv) == 4 and sys.argv[3] not in DATASETS:
+                raise ValueError(sys.argv[3])
+            mapper = DataPrepMapper(ratios, datasets=sys.argv[3:] or DATASETS)
+            mapper.map()
+        elif sys.argv[1] == "shard" and 3 <= len(sys.argv) <= 5:
+            # Local or shared-filesystem runs only: every mapper writes <output_dir>/<dataset>/part-m-<task>
+            # with plain file I/O, so output_dir must be the same directory for every task
+            ratios = parse_ratios(sys.argv[3]) if len(sys.argv) > 3 else SPLIT_RATIOS
+            task_id = int(sys.argv[4]) if len(sys.argv) > 4 else None
+            mapper = DataPrepMapper(ratios, ShardWriter(sys.argv[2], HEADER, task_id))
+            mapper.map()
+        elif sys.argv[1] == "reducer" and len(sys.argv) == 2:
+            reducer = DataPrepReducer()
+            reducer.reduce()
+        elif sys.argv[1] == "header" and len(sys.argv) == 2:
+            # Written once by the driver next to map-only output, e.g. as <output>/_header
+            print(HEADER)
+        else:
+            print(usage)
+            sys.exit(1)
+    except ValueError:
+        print(usage)
         sys.exit(1)
-        
-    if sys.argv[1] == "mapper":
-        mapper = DataPrepMapper()
-        mapper.map()
-    elif sys.argv[1] == "reducer":
-        reducer = DataPrepReducer()
-        reducer.reduce()
-    else:
-        print("Invalid argument. Use 'mapper' or 'reducer'")
-        sys.exit(1)
\ No newline at end of file
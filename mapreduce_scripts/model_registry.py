@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Registry of trained models in results/models.
+
+Each model is stored as <name>_model.joblib, an uncompressed joblib dump whose
+NumPy arrays can be memory-mapped on load. A sidecar <name>_model.json
+records what it was trained on and how it did: estimator class, feature
+columns, a hash of the training data, metrics and timings. The manifest can
+be read without touching the estimator, and models are only deserialized the
+first time they are actually used. Older <name>_model.pkl files are still
+loaded when no joblib artifact exists.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from collections.abc import Mapping
+
+import joblib
+import sklearn
+
+MODEL_DIR = 'results/models'
+
+
+def data_hash(path, block_size=1 << 24):
+    """sha256 of a training data file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_path(name, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f'{name}_model.joblib')
+
+
+def manifest_path(name, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f'{name}_model.json')
+
+
+def save_model(name, model, feature_cols, training_data=None, metrics=None, timings=None,
+               model_dir=MODEL_DIR):
+    """Write the joblib artifact and its manifest; returns the manifest"""
+    os.makedirs(model_dir, exist_ok=True)
+    path = artifact_path(name, model_dir)
+    start = time.perf_counter()
+    joblib.dump(model, path)  # uncompressed, so arrays stay mmap-able
+    manifest = {
+        'name': name,
+        'estimator': f'{type(model).__module__}.{type(model).__name__}',
+        'params': {k: v for k, v in model.get_params().items()
+                   if v is None or isinstance(v, (bool, int, float, str))},
+        'feature_cols': list(feature_cols),
+        'training_data': training_data,
+        'metrics': metrics or {},
+        'timings': dict(timings or {}, save_seconds=time.perf_counter() - start),
+        'sklearn_version': sklearn.__version__,
+        'artifact': os.path.basename(path),
+        'artifact_bytes': os.path.getsize(path),
+        'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(manifest_path(name, model_dir), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def load_artifact(path, mmap=True):
+    if path.endswith('.joblib'):
+        return joblib.load(path, mmap_mode='r' if mmap else None)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry(Mapping):
+    """{name: estimator} over a model directory, deserializing each model on first access"""
+    def __init__(self, model_dir=MODEL_DIR, mmap=True):
+        self.model_dir = model_dir
+        self.mmap = mmap
+        self.loaded = {}
+
+    def names(self):
+        names = set()
+        if os.path.isdir(self.model_dir):
+            for filename in os.listdir(self.model_dir):
+                for suffix in ('_model.joblib', '_model.pkl'):
+                    if filename.endswith(suffix):
+                        names.add(filename[:-len(suffix)])
+        return sorted(names)
+
+    def path(self, name):
+        for path in (artifact_path(name, self.model_dir),
+                     os.path.join(self.model_dir, f'{name}_model.pkl')):
+            if os.path.exists(path):
+                return path
+        raise KeyError(name)
+
+    def manifest(self, name):
+        """Sidecar metadata without loading the model (None for legacy pickles)"""
+        try:
+            with open(manifest_path(name, self.model_dir)) as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def __getitem__(self, name):
+        if name not in self.loaded:
+            self.loaded[name] = load_artifact(self.path(name), self.mmap)
+        return self.loaded[name]
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self):
+        return len(self.names())
+
+
+class LazyModels(Mapping):
+    """Display name -> registry model, e.g. {'Random Forest': 'rf'}, loaded on first access"""
+    def __init__(self, names, registry=None):
+        self.names = dict(names)
+        self.registry = registry or ModelRegistry()
+
+    def __getitem__(self, label):
+        return self.registry[self.names[label]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def load_model(spec, model_dir=MODEL_DIR):
+    """A model from a file path (.joblib or pickle) or a registry name such as 'rf'"""
+    if os.path.exists(spec):
+        return load_artifact(spec)
+    return ModelRegistry(model_dir)[spec]
+
+
+if __name__ == '__main__':
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else MODEL_DIR
+    registry = ModelRegistry(model_dir)
+    print("Model\tEstimator\tF1 Score\tFit_Seconds\tArtifact_MB\tTraining_Data")
+    for name in registry.names():
+        manifest = registry.manifest(name) or {}
+        f1 = manifest.get('metrics', {}).get('F1 Score')
+        fit = manifest.get('timings', {}).get('fit_seconds')
+        size = os.path.getsize(registry.path(name)) / (1024 * 1024)
+        print(f"{name}\t{manifest.get('estimator', 'legacy pickle')}\t"
+              f"{'-' if f1 is None else f'{f1:.4f}'}\t{'-' if fit is None else f'{fit:.2f}'}\t"
+              f"{size:.1f}\t{(manifest.get('training_data') or {}).get('sha256', '-')[:12]}")
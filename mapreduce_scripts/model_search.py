@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Successive-halving hyperparameter search for the model_training engines.
+
+Every candidate configuration is first fitted on a small stratified slice of
+the training split and scored on the validation split. Only the best
+1/FACTOR of them are promoted to the next rung, which has FACTOR times more
+rows, until the last rung trains on the full training split. Each rung's fits
+run in a process pool; workers memory-map the cached splits (prepared_data.py)
+and the shared row order, so nothing large is pickled.
+
+Every finished fit is appended to results/models/search/<engine>_trials.jsonl
+together with the sha256 of the prepared data and the seed of the row order.
+Re-running the same search skips fits recorded for the same data and seed,
+so an interrupted search resumes where it stopped, while records from other
+data or seeds are ignored. The winner is written to
+<engine>_best.json, which ModelTrainer picks up with load_best_params.
+"""
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import ParameterSampler
+
+from model_registry import data_hash
+from model_training import ENGINES
+from prepared_data import PREPARED_FILE, load_prepared
+
+SEARCH_DIR = 'results/models/search'
+N_CANDIDATES = 27
+FACTOR = 3
+MIN_ROWS = 1000
+SEED = 42
+METRICS = {'f1': f1_score, 'accuracy': accuracy_score}
+
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 5, 20, 50],
+        'max_features': [1, 2, 3],
+    },
+    'gb': {
+        'n_estimators': [50, 100, 200, 400],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 5, 7],
+        'subsample': [0.5, 0.8, 1.0],
+    },
+    'hgb': {
+        'max_iter': [100, 200, 400],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_leaf_nodes': [15, 31, 63, 127],
+        'min_samples_leaf': [20, 50, 200],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    },
+}
+
+
+def stratified_order(y, seed=SEED):
+    """Row order whose every prefix keeps the class balance of y.
+
+    Each row gets the key (rank within its shuffled class + jitter) / class
+    size, so both classes are spread evenly along the order.
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.empty(len(y), dtype=np.float64)
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        keys[rng.permutation(rows)] = (np.arange(len(rows)) + rng.random(len(rows))) / len(rows)
+    return np.argsort(keys, kind='stable')
+
+
+def rung_sizes(n_candidates, n_rows, factor=FACTOR, min_rows=MIN_ROWS):
+    """[(candidates kept, training rows)] per rung, ending with the full split"""
+    rungs = max(1, int(math.log(n_candidates, factor) + 1e-9) + 1)
+    while rungs > 1 and n_rows / factor ** (rungs - 1) < min_rows:
+        rungs -= 1
+    return [(max(1, math.ceil(n_candidates / factor ** r)), int(n_rows / factor ** (rungs - 1 - r)))
+            for r in range(rungs)]
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def evaluate(engine, params, n_rows, input_file, order_file, metric):
+    """Fit one configuration on the first n_rows of the stratified order; validation score"""
+    splits = load_prepared(input_file)
+    X_train, y_train = splits['train']
+    X_val, y_val = splits['validation']
+    rows = np.sort(np.load(order_file, mmap_mode='r')[:n_rows])
+
+    model = clone(ENGINES[engine]()).set_params(**params)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)  # the pool already uses every core
+    start = time.perf_counter()
+    model.fit(X_train[rows], y_train[rows])
+    seconds = time.perf_counter() - start
+    return float(METRICS[metric](y_val, model.predict(X_val))), seconds
+
+
+class HalvingSearch:
+    def __init__(self, engine, input_file=PREPARED_FILE, n_candidates=N_CANDIDATES, factor=FACTOR,
+                 metric='f1', workers=None, search_dir=SEARCH_DIR, seed=SEED):
+        self.engine = engine
+        self.input_file = input_file
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.metric = metric
+        self.workers = workers or os.cpu_count() or 1
+        self.search_dir = search_dir
+        self.seed = seed
+        self.trials_file = os.path.join(search_dir, f'{engine}_trials.jsonl')
+        self.data_sha = None
+        self.order_file = None
+
+    def load_trials(self):
+        """{(params key, rows): score} already recorded for this search setup"""
+        trials = {}
+        if os.path.exists(self.trials_file):
+            with open(self.trials_file) as f:
+                for line in f:
+                    try:
+                        trial = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    if (trial['metric'] == self.metric and trial.get('data_sha256') == self.data_sha
+                            and trial.get('seed') == self.seed):
+                        trials[(params_key(trial['params']), trial['rows'])] = trial['score']
+        return trials
+
+    def prepare_order(self, y_train):
+        """Row order file named after the data hash and seed; written once, atomically"""
+        self.order_file = os.path.join(self.search_dir, f'train_order_{self.data_sha[:16]}_{self.seed}.npy')
+        if os.path.exists(self.order_file):
+            return
+        tmp = f'{self.order_file[:-4]}.tmp-{os.getpid()}.npy'
+        np.save(tmp, stratified_order(np.asarray(y_train), self.seed))
+        os.replace(tmp, self.order_file)
+
+    def run(self):
+        os.makedirs(self.search_dir, exist_ok=True)
+        _, y_train = load_prepared(self.input_file)['train']
+        self.data_sha = data_hash(self.input_file)
+        self.prepare_order(y_train)
+
+        candidates = list(ParameterSampler(SEARCH_SPACES[self.engine], self.n_candidates,
+                                           random_state=self.seed))
+        trials = self.load_trials()
+        scores = {}
+
+        for rung, (keep, n_rows) in enumerate(rung_sizes(len(candidates), len(y_train), self.factor)):
+            candidates = candidates[:keep]
+            pending = [p for p in candidates if (params_key(p), n_rows) not in trials]
+            print(f"Rung {rung}: {len(candidates)} candidates on {n_rows} rows "
+                  f"({len(candidates) - len(pending)} already done)")
+
+            with ProcessPoolExecutor(max_workers=self.workers) as pool, \
+                    open(self.trials_file, 'a') as log:
+                futures = {pool.submit(evaluate, self.engine, params, n_rows, self.input_file,
+                                       self.order_file, self.metric): params for params in pending}
+                for future in as_completed(futures):
+                    params = futures[future]
+                    score, seconds = future.result()
+                    trials[(params_key(params), n_rows)] = score
+                    log.write(json.dumps({'engine': self.engine, 'rung': rung, 'rows': n_rows,
+                                          'params': params, 'metric': self.metric,
+                                          'data_sha256': self.data_sha, 'seed': self.seed,
+                                          'score': score, 'seconds': round(seconds, 3)}) + '\n')
+                    log.flush()
+
+            scores = {params_key(p): trials[(params_key(p), n_rows)] for p in candidates}
+            # Stable sort: ties keep the sampler's order, so resumed runs promote the same configs
+            candidates.sort(key=lambda p: -scores[params_key(p)])
+
+        best = candidates[0]
+        result = {'engine': self.engine, 'params': best, 'metric': self.metric,
+                  'validation_score': scores[params_key(best)]}
+        with open(os.path.join(self.search_dir, f'{self.engine}_best.json'), 'w') as f:
+            json.dump(result, f, indent=1)
+        return result
+
+
+def load_best_params(engine, search_dir=SEARCH_DIR):
+    """Tuned parameters for an engine, or None when it has not been searched"""
+    try:
+        with open(os.path.join(search_dir, f'{engine}_best.json')) as f:
+            return json.load(f)['params']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+if __name__ == '__main__':
+    usage = (f"Usage: python model_search.py <{'|'.join(ENGINES)}> "
+             f"[n_candidates] [factor] [{'|'.join(METRICS)}] [workers]")
+    if len(sys.argv) < 2 or len(sys.argv) > 6 or sys.argv[1] not in ENGINES:
+        print(usage)
+        sys.exit(1)
+    metric = sys.argv[4] if len(sys.argv) > 4 else 'f1'
+    if metric not in METRICS:
+        print(usage)
+        sys.exit(1)
+
+    search = HalvingSearch(sys.argv[1],
+                           n_candidates=int(sys.argv[2]) if len(sys.argv) > 2 else N_CANDIDATES,
+                           factor=int(sys.argv[3]) if len(sys.argv) > 3 else FACTOR,
+                           metric=metric,
+                           workers=int(sys.argv[5]) if len(sys.argv) > 5 else None)
+    result = search.run()
+    print(f"\nBest {result['engine']} parameters ({result['metric']} on validation = "
+          f"{result['validation_score']:.4f}):")
+    for name, value in sorted(result['params'].items()):
+        print(f"{name}: {value}")
@@ -1,99 +1,166 @@
 #!/usr/bin/env python3
+import os
 import sys
+import time
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-import pickle
+from threadpoolctl import threadpool_limits
+
+from model_registry import data_hash, save_model
+from prepared_data import FEATURE_COLS, load_prepared
+
+# Model engines by short name; the short name is also the saved model's file prefix
+ENGINES = {
+    'rf': lambda: RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+    'gb': lambda: GradientBoostingClassifier(n_estimators=100, random_state=42),
+    'hgb': lambda: HistGradientBoostingClassifier(max_iter=100, random_state=42),
+}
+DEFAULT_ENGINES = ['rf', 'gb']
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def classification_metrics(y_true, y_pred):
+    return {
+        'Accuracy': accuracy_score(y_true, y_pred),
+        'Precision': precision_score(y_true, y_pred),
+        'Recall': recall_score(y_true, y_pred),
+        'F1 Score': f1_score(y_true, y_pred)
+    }
+
+
+def fit_model(name, model, input_file, threads=None, training_data=None):
+    """Train one model, evaluate it on the test split and save it to the model registry.
+
+    Runs in the parent or in a pool worker; workers memory-map the cached
+    splits themselves, so the data is never pickled between processes.
+    """
+    splits = load_prepared(input_file)
+    X_train, y_train = splits['train']
+    X_test, y_test = splits['test']
+
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        elapsed = time.perf_counter() - start
+        y_pred = model.predict(X_test)
+
+    result = {
+        'metrics': classification_metrics(y_test, y_pred),
+        # HistGradientBoosting has no impurity-based importances
+        'importances': getattr(model, 'feature_importances_', None),
+        'seconds': elapsed,
+        'peak_mb': peak_memory_mb(),
+    }
+    save_model(name, model, FEATURE_COLS, dict(training_data or {}, rows=len(y_train)),
+               result['metrics'], {'fit_seconds': elapsed, 'peak_mb': result['peak_mb']})
+    return result
+
 
 class ModelTrainer:
-    def __init__(self):
-        self.feature_cols = ['completion_percentage', 'age', 'days_since_registration']
-        self.models = {
-            'rf': RandomForestClassifier(n_estimators=100, random_state=42),
-            'gb': GradientBoostingClassifier(n_estimators=100, random_state=42)
-        }
-        self.X_train = []
-        self.y_train = []
-        self.X_test = []
-        self.y_test = []
-        self.X_val = []
-        self.y_val = []
-    
+    def __init__(self, engines=None, params=None):
+        self.feature_cols = FEATURE_COLS
+        self.models = {name: ENGINES[name]() for name in (engines or DEFAULT_ENGINES)}
+        # Optional {name: {param: value}}, e.g. the winners of model_search.py
+        for name, values in (params or {}).items():
+            if name in self.models and values:
+                self.models[name].set_params(**values)
+        self.input_file = None
+        self.training_data = None
+        self.X_train = self.y_train = None
+        self.X_test = self.y_test = None
+        self.X_val = self.y_val = None
+
     def process_data(self, input_file):
-        """Read and process the prepared data"""
-        header = True
-        for line in open(input_file):
-            if header:
-                header = False
-                continue
-                
-            parts = line.strip().split('\t')
-            dataset = parts[0]
-            target = int(parts[1])
-            features = [float(x) for x in parts[2:]]
-            
-            if dataset == 'train':
-                self.X_train.append(features)
-                self.y_train.append(target)
-            elif dataset == 'test':
-                self.X_test.append(features)
-                self.y_test.append(target)
-            else:  # validation
-                self.X_val.append(features)
-                self.y_val.append(target)
-    
-    def train_and_evaluate(self):
+        """Load the prepared data (memory-mapped from the .npy cache when fresh)"""
+        self.input_file = input_file
+        self.training_data = {'path': input_file, 'sha256': data_hash(input_file)}
+        splits = load_prepared(input_file)
+        self.X_train, self.y_train = splits['train']
+        self.X_test, self.y_test = splits['test']
+        self.X_val, self.y_val = splits['validation']
+
+    def run_parallel(self):
+        """Fit every model at once, each in a fresh process, splitting the cores between them"""
+        workers = min(len(self.models), os.cpu_count() or 1)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn + one task per child: each model's peak memory is its own
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as pool:
+            futures = {}
+            for name, model in self.models.items():
+                if 'n_jobs' in model.get_params():
+                    model.set_params(n_jobs=threads)
+                futures[name] = pool.submit(fit_model, name, model, self.input_file, threads,
+                                            self.training_data)
+            return {name: future.result() for name, future in futures.items()}
+
+    def train_and_evaluate(self, parallel=False):
         """Train models and evaluate performance"""
         results = {}
-        
-        # Convert to numpy arrays
-        X_train = np.array(self.X_train)
-        y_train = np.array(self.y_train)
-        X_test = np.array(self.X_test)
-        y_test = np.array(self.y_test)
-        X_val = np.array(self.X_val)
-        y_val = np.array(self.y_val)
-        
+
+        if parallel:
+            fitted = self.run_parallel()
+        else:
+            # In-process peak memory is cumulative over the models trained so far
+            fitted = {name: fit_model(name, model, self.input_file, training_data=self.training_data)
+                      for name, model in self.models.items()}
+
         print("\nModel Training and Evaluation Results")
         print("=" * 80)
-        
-        for name, model in self.models.items():
+
+        for name, result in fitted.items():
             print(f"\n{name.upper()} Classifier:")
             print("-" * 40)
-            
-            # Train model
-            model.fit(X_train, y_train)
-            
-            # Save model
-            with open(f'results/models/{name}_model.pkl', 'wb') as f:
-                pickle.dump(model, f)
-            
-            # Evaluate on test set
-            y_pred = model.predict(X_test)
-            
-            # Calculate metrics
-            metrics = {
-                'Accuracy': accuracy_score(y_test, y_pred),
-                'Precision': precision_score(y_test, y_pred),
-                'Recall': recall_score(y_test, y_pred),
-                'F1 Score': f1_score(y_test, y_pred)
-            }
-            
+
             # Print metrics
+            metrics = result['metrics']
             for metric, value in metrics.items():
                 print(f"{metric}: {value:.4f}")
-            
+
             # Feature importance
             print("\nFeature Importance:")
-            importances = model.feature_importances_
-            for feat, imp in zip(self.feature_cols, importances):
-                print(f"{feat}: {imp:.4f}")
-            
+            importances = result['importances']
+            if importances is None:
+                print("not available for this model")
+            else:
+                for feat, imp in zip(self.feature_cols, importances):
+                    print(f"{feat}: {imp:.4f}")
+
+            print(f"\nTraining time: {result['seconds']:.2f}s")
+            print(f"Peak memory: {result['peak_mb']:.1f} MB")
+
             results[name] = metrics
-        
+
+        print("\nModel\tAccuracy\tF1 Score\tSeconds\tPeak_MB")
+        for name, result in fitted.items():
+            print(f"{name}\t{result['metrics']['Accuracy']:.4f}\t{result['metrics']['F1 Score']:.4f}\t"
+                  f"{result['seconds']:.2f}\t{result['peak_mb']:.1f}")
+
         return results
 
 if __name__ == "__main__":
-    trainer = ModelTrainer()
+    # python model_training.py [sequential|parallel] [rf,gb,hgb] [tuned]
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'sequential'
+    engines = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+    tuned = len(sys.argv) > 3 and sys.argv[3] == 'tuned'
+    if (mode not in ('sequential', 'parallel') or any(e not in ENGINES for e in engines or [])
+            or (len(sys.argv) > 3 and not tuned)):
+        print(f"Usage: python model_training.py [sequential|parallel] [{','.join(ENGINES)}] [tuned]")
+        sys.exit(1)
+
+    params = None
+    if tuned:
+        from model_search import load_best_params
+        params = {name: load_best_params(name) for name in (engines or DEFAULT_ENGINES)}
+    trainer = ModelTrainer(engines, params)
     trainer.process_data('results/models/prepared_data.txt')
-    results = trainer.train_and_evaluate() 
\ No newline at end of file
+    results = trainer.train_and_evaluate(parallel=(mode == 'parallel'))
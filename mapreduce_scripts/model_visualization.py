@@ -4,28 +4,33 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import confusion_matrix, roc_curve, auc
-import pickle
+
+from figure_spec import FigureSpec
+from model_registry import LazyModels, artifact_path
+from prepared_data import FEATURE_COLS, load_prepared, prepared_frame
+
+PREPARED_FILE = 'results/models/prepared_data.txt'
+MODEL_NAMES = {'Random Forest': 'rf', 'Gradient Boosting': 'gb'}
+PLOTS = {
+    'plot_feature_importance': 'feature_importance.png',
+    'plot_roc_curves': 'roc_curves.png',
+    'plot_confusion_matrices': 'confusion_matrices.png',
+    'plot_feature_distributions': 'feature_distributions.png',
+}
 
 class ModelVisualizer:
     def __init__(self):
-        self.feature_cols = ['completion_percentage', 'age', 'days_since_registration']
+        self.feature_cols = FEATURE_COLS
         self.models = {}
-        self.data = None
+        self.splits = None
         
     def load_models(self):
-        """Load the trained models"""
-        model_files = {
-            'Random Forest': 'results/models/rf_model.pkl',
-            'Gradient Boosting': 'results/models/gb_model.pkl'
-        }
-        
-        for name, path in model_files.items():
-            with open(path, 'rb') as f:
-                self.models[name] = pickle.load(f)
+        """Register the trained models; each is only deserialized when a plot first uses it"""
+        self.models = LazyModels(MODEL_NAMES)
     
     def load_data(self):
-        """Load the prepared data"""
-        self.data = pd.read_csv('results/models/prepared_data.txt', sep='\t')
+        """Load the prepared data (shared loader and .npy cache with ModelTrainer)"""
+        self.splits = load_prepared(PREPARED_FILE)
     
     def plot_feature_importance(self):
         """Plot feature importance comparison"""
@@ -54,9 +59,7 @@ class ModelVisualizer:
         plt.figure(figsize=(10, 6))
         
         # Get test data
-        test_data = self.data[self.data['dataset'] == 'test']
-        X_test = test_data[self.feature_cols].values
-        y_test = test_data['target'].values
+        X_test, y_test = self.splits['test']
         
         for name, model in self.models.items():
             y_pred_proba = model.predict_proba(X_test)[:, 1]
@@ -78,9 +81,7 @@ class ModelVisualizer:
     
     def plot_confusion_matrices(self):
         """Plot confusion matrices for both models"""
-        test_data = self.data[self.data['dataset'] == 'test']
-        X_test = test_data[self.feature_cols].values
-        y_test = test_data['target'].values
+        X_test, y_test = self.splits['test']
         
         fig, axes = plt.subplots(1, 2, figsize=(15, 6))
         
@@ -99,16 +100,36 @@ class ModelVisualizer:
     
     def plot_feature_distributions(self):
         """Plot feature distributions by target class"""
+        data = prepared_frame(self.splits)
         fig, axes = plt.subplots(1, 3, figsize=(18, 6))
         
         for i, feature in enumerate(self.feature_cols):
-            sns.boxplot(data=self.data, x='target', y=feature, ax=axes[i])
+            sns.boxplot(data=data, x='target', y=feature, ax=axes[i])
             axes[i].set_title(f'{feature} Distribution by Target')
         
         plt.tight_layout()
         plt.savefig('results/models/feature_distributions.png')
         plt.close()
 
+def render_plot(method):
+    """Draw one plot in a fresh visualizer; models are only loaded if the plot uses them"""
+    visualizer = ModelVisualizer()
+    visualizer.load_models()
+    visualizer.load_data()
+    getattr(visualizer, method)()
+
+def prepare_figures():
+    """Build the prepared-data .npy cache once, before render_plots.py starts its workers"""
+    load_prepared(PREPARED_FILE)
+
+def figures():
+    """Figures for render_plots.py"""
+    models = [artifact_path(name) for name in MODEL_NAMES.values()]
+    return [FigureSpec(f'models/{filename[:-4]}', 'model_visualization', 'render_plot', [method],
+                       [PREPARED_FILE] + ([] if method == 'plot_feature_distributions' else models),
+                       [f'results/models/{filename}'])
+            for method, filename in PLOTS.items()]
+
 if __name__ == "__main__":
     visualizer = ModelVisualizer()
     visualizer.load_models()
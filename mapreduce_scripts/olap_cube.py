@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Dense profile cube over (age, gender, main region, public) x completion_percentage.
+
+One pass over the profiles fills a 5-d array of counts: exact age (0..100),
+gender, main region (text before the first comma), public flag and a
+completion_percentage histogram bin. Every report that is a marginal of these
+dimensions (demographics, correlations, cluster sizes, gender/public encoding
+counts) becomes a sum over axes of the saved cube instead of a new MapReduce job.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from groupby_engine import AGGREGATES, COMPLETION_IDX, KEY_EXPRESSIONS, VALUE_BINS, read_profiles
+
+UNKNOWN = 'unknown'
+DIMENSIONS = ('age', 'gender', 'region', 'public')
+SUMMARY = ('count', 'mean', 'min', 'max', 'median')
+
+
+class ProfileCube:
+    def __init__(self, regions=(), hist=None):
+        self.labels = {
+            'age': [str(age) for age in range(101)] + [UNKNOWN],
+            'gender': ['Female', 'Male', UNKNOWN],
+            'region': list(regions),
+            'public': ['Private', 'Public', UNKNOWN],
+        }
+        # Label -> axis position, kept in step with self.labels as regions are added
+        self.positions = {dim: {label: i for i, label in enumerate(labels)}
+                          for dim, labels in self.labels.items()}
+        # Last completion bin holds profiles without a valid completion_percentage
+        shape = (102, 3, len(self.labels['region']), 3, VALUE_BINS + 1)
+        self.hist = hist if hist is not None else np.zeros(shape, dtype=np.int64)
+
+    def _region_codes(self, regions):
+        """Map region labels to axis positions, growing the region axis for new ones"""
+        index = self.positions['region']
+        codes, uniques = pd.factorize(regions)
+        new = [region for region in uniques if region not in index]
+        if new:
+            for region in new:
+                index[region] = len(self.labels['region'])
+                self.labels['region'].append(region)
+            pad = [(0, 0)] * self.hist.ndim
+            pad[2] = (0, len(new))
+            self.hist = np.pad(self.hist, pad)
+        return np.array([index[region] for region in uniques], dtype=np.int64)[codes]
+
+    def add_chunk(self, frame):
+        """Count one DataFrame of raw profile columns into the cube"""
+        def codes(expr, mapping, missing):
+            labels = KEY_EXPRESSIONS[expr](frame[KEY_EXPRESSIONS[expr].column])
+            return labels.map(mapping).fillna(missing).to_numpy(dtype=np.int64)
+
+        age = KEY_EXPRESSIONS['age'](frame[KEY_EXPRESSIONS['age'].column])
+        age = pd.to_numeric(age).fillna(101).to_numpy(dtype=np.int64)
+        gender = codes('gender_label', {'Female': 0, 'Male': 1}, 2)
+        public = codes('profile_type', {'Private': 0, 'Public': 1}, 2)
+        region = KEY_EXPRESSIONS['main_region'](frame[KEY_EXPRESSIONS['main_region'].column])
+        region = self._region_codes(region.fillna(UNKNOWN).to_numpy(dtype=object))
+
+        completion = frame[COMPLETION_IDX]
+        completion = pd.to_numeric(completion.where(completion.str.isdigit()), errors='coerce')
+        completion = completion.where(completion <= 100).fillna(VALUE_BINS).to_numpy(dtype=np.int64)
+
+        flat = np.ravel_multi_index((age, gender, region, public, completion), self.hist.shape)
+        self.hist += np.bincount(flat, minlength=self.hist.size).reshape(self.hist.shape)
+
+    def add_cell(self, age, gender, region, public, bin_idx, count):
+        if region not in self.positions['region']:
+            self._region_codes(np.array([region], dtype=object))
+        positions = self.positions
+        idx = (positions['age'][age], positions['gender'][gender],
+               positions['region'][region], positions['public'][public], bin_idx)
+        self.hist[idx] += count
+
+    def emit(self, out=sys.stdout):
+        """Write non-empty cells as age \t gender \t region \t public \t bin \t count"""
+        for idx in zip(*np.nonzero(self.hist)):
+            labels = [self.labels[dim][i] for dim, i in zip(DIMENSIONS, idx)]
+            out.write('\t'.join(labels + [str(idx[-1]), str(self.hist[idx])]) + '\n')
+
+    def save(self, path):
+        dtype = np.min_scalar_type(int(self.hist.max()))
+        np.savez_compressed(path, hist=self.hist.astype(dtype),
+                            regions=np.array(self.labels['region'], dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['regions'].tolist(), data['hist'].astype(np.int64))
+
+    def query(self, group_by=(), where=None, age_bucket=None):
+        """Roll up / slice the cube.
+
+        group_by: dimensions to keep, e.g. ('gender', 'public')
+        where: {dimension: label or list of labels}; age also accepts ints/ranges
+        age_bucket: group ages into buckets of this width (e.g. 10 for decades)
+
+        Returns {tuple of labels: {count, mean, min, max, median}}.
+        """
+        hist = self.hist
+        labels = {dim: list(values) for dim, values in self.labels.items()}
+        for dim, values in (where or {}).items():
+            axis = DIMENSIONS.index(dim)
+            if isinstance(values, (str, int)):
+                values = [values]
+            idx = [labels[dim].index(str(value)) for value in values]
+            hist = np.take(hist, idx, axis=axis)
+            labels[dim] = [labels[dim][i] for i in idx]
+
+        drop = tuple(i for i, dim in enumerate(DIMENSIONS) if dim not in group_by)
+        hist = hist.sum(axis=drop)
+        kept = [dim for dim in DIMENSIONS if dim in group_by]
+
+        if age_bucket and 'age' in kept:
+            hist, labels['age'] = self._bucket_ages(hist, kept.index('age'), labels['age'], age_bucket)
+
+        results = {}
+        for idx in np.ndindex(*hist.shape[:-1]):
+            cell = hist[idx]
+            if cell.sum() == 0:
+                continue
+            key = tuple(labels[dim][i] for dim, i in zip(kept, idx))
+            results[key] = summarize(cell)
+        return results
+
+    @staticmethod
+    def _bucket_ages(hist, axis, age_labels, width):
+        buckets = {}
+        for i, label in enumerate(age_labels):
+            bucket = label if label == UNKNOWN else str(int(label) // width * width)
+            buckets.setdefault(bucket, []).append(i)
+        summed = [np.take(hist, idx, axis=axis).sum(axis=axis) for idx in buckets.values()]
+        return np.stack(summed, axis=axis), list(buckets)
+
+
+def summarize(cell):
+    """Count plus completion statistics for one histogram (unknown completion only counted)"""
+    stats = {'count': int(cell.sum())}
+    known = cell[:VALUE_BINS]
+    for name in SUMMARY[1:]:
+        stats[name] = AGGREGATES[name](known) if known.sum() else None
+    return stats
+
+
+class CubeMapper:
+    def map(self):
+        """Build a partial cube for this split and emit its non-empty cells"""
+        cube = ProfileCube()
+        for frame in read_profiles(sys.stdin, [1, COMPLETION_IDX, 3, 4, 7]):
+            cube.add_chunk(frame)
+        cube.emit()
+
+
+class CubeReducer:
+    def reduce(self):
+        """Sum cells; also usable as the combiner"""
+        cube = ProfileCube()
+        for line in sys.stdin:
+            try:
+                age, gender, region, public, bin_idx, count = line.rstrip('\n').split('\t')
+                cube.add_cell(age, gender, region, public, int(bin_idx), int(count))
+            except Exception:
+                continue
+        cube.emit()
+
+
+def parse_where(args):
+    where = {}
+    for arg in args:
+        dim, value = arg.split('=', 1)
+        if dim == 'age' and '-' in value:
+            low, high = map(int, value.split('-'))
+            where[dim] = list(range(low, high + 1))
+        else:
+            where[dim] = value.split(',')
+    return where
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python olap_cube.py [mapper|reducer]\n"
+             "       python olap_cube.py build <profiles_file> <cube.npz>\n"
+             "       python olap_cube.py load <reducer_output> <cube.npz>\n"
+             "       python olap_cube.py query <cube.npz> <dim,dim|-> [dim=value ...] [--age-bucket N]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "mapper":
+        CubeMapper().map()
+    elif sys.argv[1] == "reducer":
+        CubeReducer().reduce()
+    elif sys.argv[1] == "build" and len(sys.argv) == 4:
+        cube = ProfileCube()
+        for frame in read_profiles(sys.argv[2], [1, COMPLETION_IDX, 3, 4, 7]):
+            cube.add_chunk(frame)
+        cube.save(sys.argv[3])
+    elif sys.argv[1] == "load" and len(sys.argv) == 4:
+        cube = ProfileCube()
+        with open(sys.argv[2]) as f:
+            for line in f:
+                age, gender, region, public, bin_idx, count = line.rstrip('\n').split('\t')
+                cube.add_cell(age, gender, region, public, int(bin_idx), int(count))
+        cube.save(sys.argv[3])
+    elif sys.argv[1] == "query" and len(sys.argv) >= 4:
+        args = sys.argv[4:]
+        age_bucket = None
+        if '--age-bucket' in args:
+            pos = args.index('--age-bucket')
+            age_bucket = int(args[pos + 1])
+            args = args[:pos] + args[pos + 2:]
+        group_by = [] if sys.argv[3] == '-' else sys.argv[3].split(',')
+
+        cube = ProfileCube.load(sys.argv[2])
+        start = time.perf_counter()
+        results = cube.query(group_by, parse_where(args), age_bucket)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        # Result keys follow DIMENSIONS order, whatever order group_by was given in
+        print('\t'.join([dim for dim in DIMENSIONS if dim in group_by] + list(SUMMARY)))
+        for key, stats in sorted(results.items()):
+            cells = ['-' if stats[name] is None else
+                     (f"{stats[name]:.2f}" if name == 'mean' else str(stats[name])) for name in SUMMARY]
+            print('\t'.join(list(key) + cells))
+        print(f"\n{len(results)} groups in {elapsed:.1f} ms")
+    else:
+        print(usage)
+        sys.exit(1)
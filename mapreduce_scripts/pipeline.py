@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""Dependency-aware runner for the analysis and modelling scripts.
+
+Every step declares its input and output files; a step depends on whichever
+step produces one of its inputs. Before running, a step is fingerprinted from
+its command, the contents of its inputs and the code of its script plus every
+local module it imports. If the fingerprint matches the last successful run
+and the recorded outputs are unchanged on disk, the step is skipped. Because
+inputs are compared by content, a rerun that reproduces an identical file does
+not invalidate the steps below it.
+
+Streaming jobs run locally as mapper | sort | reducer. Independent steps run
+concurrently in a thread pool (each step is a subprocess). Content hashes are
+cached by file size and mtime in results/pipeline_state.json; step logs go to
+results/pipeline_logs/<step>.log.
+
+    python pipeline.py run [step,step,...] [workers] [force]
+    python pipeline.py status [step,step,...]
+    python pipeline.py list
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILES = 'data/soc-pokec-profiles.txt'
+STATE_FILE = 'results/pipeline_state.json'
+LOG_DIR = 'results/pipeline_logs'
+IMPORT_RE = re.compile(r'^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))', re.MULTILINE)
+
+
+def cached_digest(hashes, path, lock):
+    """sha256 of a file's content, recomputed only when its size or mtime changes"""
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    with lock:
+        cached = hashes.get(path)
+    if cached and cached[:2] == signature:
+        return cached[2]
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 24), b''):
+            sha.update(block)
+    with lock:
+        hashes[path] = signature + [sha.hexdigest()]
+    return sha.hexdigest()
+
+
+class Step:
+    def __init__(self, name, script, commands, inputs=(), outputs=(), stdin=None, stdout=None):
+        self.name = name
+        self.script = script            # file in mapreduce_scripts/, fingerprinted with its imports
+        self.commands = commands        # argument lists after `python <script>`, piped together; 'sort' is sort
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.stdin = stdin
+        self.stdout = stdout
+
+    def argv(self):
+        path = os.path.join(SCRIPT_DIR, self.script)
+        return [['sort'] if args == 'sort' else [sys.executable, path, *args] for args in self.commands]
+
+    def describe(self):
+        parts = ['sort' if args == 'sort' else ' '.join(['python', self.script, *args]) for args in self.commands]
+        command = ' | '.join(parts)
+        if self.stdin:
+            command += f' < {self.stdin}'
+        if self.stdout:
+            command += f' > {self.stdout}'
+        return command
+
+
+def streaming(name, script, input_file, output_file, mapper=('mapper',), reducer=('reducer',), inputs=()):
+    """A streaming job run locally as mapper | sort | reducer"""
+    return Step(name, script, [list(mapper), 'sort', list(reducer)], [input_file, *inputs], [output_file],
+                stdin=input_file, stdout=output_file)
+
+
+def command(name, script, inputs, outputs, args=()):
+    return Step(name, script, [list(args)], inputs, outputs)
+
+
+STATS_FILE = 'results/task9/normalization_stats.txt'
+PREPARED = 'results/models/prepared_data.txt'
+MODELS = [f'results/models/{name}_model.{ext}' for name in ('rf', 'gb') for ext in ('joblib', 'json')]
+
+STEPS = [
+    streaming('demographics', 'analyze_demographics.py', PROFILES, 'results/demographics_analysis.txt'),
+    streaming('correlations', 'feature_correlations.py', PROFILES, 'results/correlation_analysis.txt'),
+    streaming('relationships', 'relationship_visualization.py', PROFILES, 'results/visualization_data.txt'),
+    command('task3_visualize', 'generate_visualizations.py', ['results/visualization_data.txt'],
+            [f'results/task3/{name}' for name in ('age_completion_boxplot.png', 'height_completion_boxplot.png',
+                                                  'age_correlation_heatmap.png', 'age_statistics.csv',
+                                                  'height_statistics.csv')]),
+    streaming('task4', 'task4_age_clustering.py', PROFILES, 'results/task4/cluster_results.txt'),
+    command('task4_visualize', 'task4_visualize_clusters.py', ['results/task4/cluster_results.txt'],
+            ['results/task4/cluster_completion_rates.png', 'results/task4/cluster_bubble_plot.png']),
+    streaming('task5', 'task5_outlier_detection.py', PROFILES, 'results/task5/outlier_results.txt'),
+    command('task5_visualize', 'task5_visualize_outliers.py', ['results/task5/outlier_results.txt'],
+            ['results/task5/feature_outliers_boxplot.png', 'results/task5/outlier_percentages.png',
+             'results/task5/outlier_analysis_summary.txt']),
+    streaming('task6', 'task6_categorical_encoding.py', PROFILES, 'results/task6/encoding_results.txt'),
+    command('task6_visualize', 'task6_visualize_encoding.py', ['results/task6/encoding_results.txt'],
+            [f'results/task6/{feature}_distribution.png' for feature in ('gender', 'region', 'eye_color')]
+            + ['results/task6/encoding_reference.txt']),
+    streaming('task7', 'task7_multilabel_processing.py', PROFILES, 'results/task7/multilabel_results.txt'),
+    command('task7_visualize', 'task7_visualize_multilabel.py', ['results/task7/multilabel_results.txt'],
+            [f'results/task7/{label_type}_{kind}'
+             for label_type in ('hobby', 'sport', 'hobby_pair', 'sport_pair')
+             for kind in ('distribution.png', 'statistics.txt')]),
+    command('task8', 'task8_registration_days.py', [PROFILES],
+            ['results/task8/registration_days.txt', 'results/task8/registration_days_summary.txt']),
+    streaming('task9_stats', 'task9_normalize_features.py', PROFILES, STATS_FILE,
+              mapper=('stats_mapper',), reducer=('stats_reducer',)),
+    # Map-only: the reducer only puts the header in front
+    Step('task9_normalize', 'task9_normalize_features.py',
+         [['normalize_mapper', STATS_FILE], ['normalize_reducer', STATS_FILE]],
+         [PROFILES, STATS_FILE], ['results/task9/normalized_features.txt'],
+         stdin=PROFILES, stdout='results/task9/normalized_features.txt'),
+    streaming('model_prep', 'model_prep.py', PROFILES, PREPARED),
+    command('model_training', 'model_training.py', [PREPARED], MODELS),
+    command('model_visualization', 'model_visualization.py', [PREPARED] + MODELS,
+            [f'results/models/{name}.png' for name in ('feature_importance', 'roc_curves',
+                                                       'confusion_matrices', 'feature_distributions')]),
+]
+
+
+def local_imports(script, seen=None):
+    """script plus every mapreduce_scripts module it imports, transitively"""
+    seen = set() if seen is None else seen
+    if script in seen:
+        return seen
+    seen.add(script)
+    with open(os.path.join(SCRIPT_DIR, script), encoding='utf-8') as f:
+        for match in IMPORT_RE.finditer(f.read()):
+            module = f"{match.group(1) or match.group(2)}.py"
+            if os.path.exists(os.path.join(SCRIPT_DIR, module)):
+                local_imports(module, seen)
+    return seen
+
+
+class Pipeline:
+    def __init__(self, steps=STEPS, state_file=STATE_FILE):
+        self.steps = {step.name: step for step in steps}
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.producers = {}
+        for step in steps:
+            for output in step.outputs:
+                if output in self.producers:
+                    raise ValueError(f"{output} is produced by both {self.producers[output]} and {step.name}")
+                self.producers[output] = step.name
+        self.order = self.topological_order()
+        try:
+            with open(state_file) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {'hashes': {}, 'steps': {}}
+
+    def dependencies(self, name):
+        return {self.producers[i] for i in self.steps[name].inputs if i in self.producers}
+
+    def topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"dependency cycle through {name}")
+            visiting.add(name)
+            for dependency in sorted(self.dependencies(name)):
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.steps:
+            visit(name)
+        return order
+
+    def select(self, targets=None):
+        """Targets and everything upstream of them, in dependency order"""
+        if not targets:
+            return list(self.order)
+        unknown = [t for t in targets if t not in self.steps]
+        if unknown:
+            raise ValueError(f"unknown step {', '.join(unknown)}")
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.dependencies(name))
+        return [name for name in self.order if name in selected]
+
+    def save_state(self):
+        with self.lock:
+            data = json.dumps(self.state, indent=1)
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp = f'{self.state_file}.tmp-{threading.get_ident()}'
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self.state_file)
+
+    def digest(self, path):
+        return cached_digest(self.state['hashes'], path, self.lock)
+
+    def fingerprint(self, name):
+        step = self.steps[name]
+        missing = [i for i in step.inputs if not os.path.exists(i)]
+        if missing:
+            raise FileNotFoundError(f"missing input {', '.join(missing)}")
+        parts = {
+            'command': step.describe(),
+            'inputs': {i: self.digest(i) for i in step.inputs},
+            'code': {m: self.digest(os.path.join(SCRIPT_DIR, m)) for m in sorted(local_imports(step.script))},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_current(self, name, fingerprint):
+        with self.lock:
+            record = self.state['steps'].get(name)
+        if not record or record['fingerprint'] != fingerprint:
+            return False
+        return all(os.path.exists(o) and self.digest(o) == record['outputs'].get(o)
+                   for o in self.steps[name].outputs)
+
+    def execute(self, step, log):
+        """Run the step's command pipeline; stdout goes to a temporary file renamed on success"""
+        for output in step.outputs:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        env = dict(os.environ, LC_ALL='C', MPLBACKEND='Agg')
+        tmp = f'{step.stdout}.tmp-{os.getpid()}' if step.stdout else None
+        source = open(step.stdin, 'rb') if step.stdin else subprocess.DEVNULL
+        sink = open(tmp, 'wb') if tmp else log
+        processes = []
+        try:
+            argvs = step.argv()
+            for i, argv in enumerate(argvs):
+                last = i == len(argvs) - 1
+                process = subprocess.Popen(argv, stdin=source, stdout=sink if last else subprocess.PIPE,
+                                           stderr=log, env=env)
+                if source is not subprocess.DEVNULL:
+                    source.close()  # the child owns it now
+                source = process.stdout
+                processes.append(process)
+            codes = [process.wait() for process in processes]
+        finally:
+            if sink is not log:
+                sink.close()
+            if source not in (None, subprocess.DEVNULL) and not source.closed:
+                source.close()
+        if any(codes):
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+            raise RuntimeError(f"exit codes {codes}, see {log.name}")
+        if tmp:
+            os.replace(tmp, step.stdout)
+
+    def run_step(self, name, force=False):
+        """(status, seconds) after running the step or finding it current"""
+        start = time.perf_counter()
+        step = self.steps[name]
+        fingerprint = self.fingerprint(name)
+        if not force and self.is_current(name, fingerprint):
+            return 'current', time.perf_counter() - start
+
+        os.makedirs(LOG_DIR, exist_ok=True)
+        with open(os.path.join(LOG_DIR, f'{name}.log'), 'wb') as log:
+            self.execute(step, log)
+        missing = [o for o in step.outputs if not os.path.exists(o)]
+        if missing:
+            raise RuntimeError(f"did not write {', '.join(missing)}")
+        outputs = {o: self.digest(o) for o in step.outputs}
+        with self.lock:
+            self.state['steps'][name] = {'fingerprint': fingerprint, 'outputs': outputs,
+                                         'seconds': round(time.perf_counter() - start, 3)}
+        self.save_state()
+        return 'ran', time.perf_counter() - start
+
+    def run(self, targets=None, workers=None, force=False, out=sys.stdout):
+        """Run the selected steps, each as soon as its dependencies have finished"""
+        names = self.select(targets)
+        results = {}
+        running = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            while len(results) < len(names):
+                for name in names:
+                    if name in results or name in running.values():
+                        continue
+                    dependencies = self.dependencies(name) & set(names)
+                    if any(results.get(d, ('',))[0] in ('failed', 'blocked') for d in dependencies):
+                        results[name] = ('blocked', 0.0, 'an upstream step failed')
+                        out.write(f"{name}: blocked\n")
+                    elif all(d in results for d in dependencies):
+                        running[pool.submit(self.run_step, name, force)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status, seconds = future.result()
+                        results[name] = (status, seconds, '')
+                    except Exception as e:
+                        results[name] = ('failed', 0.0, str(e))
+                    out.write(f"{name}: {results[name][0]} ({results[name][1]:.2f}s)"
+                              f"{' - ' + results[name][2] if results[name][2] else ''}\n")
+        self.save_state()
+
+        out.write(f"\nStep\tStatus\tSeconds\n")
+        for name in names:
+            status, seconds, _ = results[name]
+            out.write(f"{name}\t{status}\t{seconds:.2f}\n")
+        counts = {status: sum(1 for s, _, _ in results.values() if s == status)
+                  for status in ('ran', 'current', 'failed', 'blocked')}
+        out.write(f"\n{', '.join(f'{n} {status}' for status, n in counts.items())}, "
+                  f"{time.perf_counter() - start:.2f}s total\n")
+        return results
+
+    def status(self, targets=None, out=sys.stdout):
+        """Which steps would run, without running anything"""
+        out.write("Step\tStatus\tDepends on\n")
+        stale = set()
+        for name in self.select(targets):
+            dependencies = self.dependencies(name)
+            try:
+                current = not (dependencies & stale) and self.is_current(name, self.fingerprint(name))
+                status = 'current' if current else 'stale'
+            except FileNotFoundError:
+                status = 'waiting' if dependencies else 'missing input'
+            if status != 'current':
+                stale.add(name)
+            out.write(f"{name}\t{status}\t{', '.join(sorted(dependencies)) or '-'}\n")
+        self.save_state()
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python pipeline.py run [step,step,...] [workers] [force]\n"
+             "       python pipeline.py status [step,step,...]\n"
+             "       python pipeline.py list")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    try:
+        pipeline = Pipeline()
+        targets = sys.argv[2].split(',') if len(sys.argv) > 2 and sys.argv[2] not in ('', 'all') else None
+        if sys.argv[1] == "run" and len(sys.argv) <= 5 and (len(sys.argv) < 5 or sys.argv[4] == 'force'):
+            workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            results = pipeline.run(targets, workers, force=len(sys.argv) == 5)
+            sys.exit(1 if any(status in ('failed', 'blocked') for status, _, _ in results.values()) else 0)
+        elif sys.argv[1] == "status" and len(sys.argv) <= 3:
+            pipeline.status(targets)
+        elif sys.argv[1] == "list" and len(sys.argv) == 2:
+            for name in pipeline.order:
+                step = pipeline.steps[name]
+                print(f"{name}\t{step.describe()}")
+                print(f"\tinputs: {', '.join(step.inputs) or '-'}\n\toutputs: {', '.join(step.outputs) or '-'}")
+        else:
+            print(usage)
+            sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Local HTTP prediction service for the "is this profile public" models.
+
+The models in the results/models registry are loaded once at startup. Concurrent requests
+for the same model are coalesced into micro-batches: a batch is sent to
+predict_proba as soon as MAX_BATCH requests are waiting or MAX_WAIT_MS has
+passed since the first one, so a busy service makes few vectorized calls while
+a quiet one adds at most MAX_WAIT_MS of latency. Plain asyncio, no web
+framework.
+
+    POST /predict  {"model": "rf", "completion_percentage": 55, "age": 24,
+                    "days_since_registration": 1200}
+                   -> {"model": "rf", "probability": 0.61, "label": 1}
+    GET  /metrics  latency percentiles, throughput and batch sizes
+    GET  /health
+
+    python prediction_service.py serve [port] [rf,gb]
+    python prediction_service.py bench [concurrency] [requests] [port]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from model_registry import ModelRegistry
+from prepared_data import FEATURE_COLS
+
+MODEL_DIR = 'results/models'
+DEFAULT_MODELS = ['rf', 'gb']
+PORT = 8765
+MAX_BATCH = 256
+MAX_WAIT_MS = 2.0
+LATENCY_WINDOW = 10000
+
+
+class MicroBatcher:
+    """Queue of pending requests for one model, drained in bounded batches"""
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, features):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.array([features for features, _ in pending], dtype=np.float64)
+            try:
+                # Off the event loop, so requests keep queueing while the model runs
+                probabilities = await loop.run_in_executor(None, lambda: self.model.predict_proba(X)[:, 1])
+            except Exception:
+                # Retry row by row, so only the request that broke the batch fails
+                await self.run_rows(loop, X, pending)
+                continue
+            self.batches += 1
+            self.rows += len(pending)
+            for (_, future), p in zip(pending, probabilities):
+                if not future.done():
+                    future.set_result(float(p))
+
+    async def run_rows(self, loop, X, pending):
+        for row, (_, future) in zip(X, pending):
+            try:
+                p = await loop.run_in_executor(None, lambda: self.model.predict_proba(row[None, :])[0, 1])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += 1
+            if not future.done():
+                future.set_result(float(p))
+
+
+class PredictionService:
+    def __init__(self, models=None, model_dir=MODEL_DIR, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        registry = ModelRegistry(model_dir)
+        # Load everything up front: the first request should not pay for deserialization
+        self.models = {name: registry[name] for name in models or DEFAULT_MODELS}
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.batchers = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # seconds, most recent requests
+        self.requests = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def start_batchers(self):
+        for name, model in self.models.items():
+            self.batchers[name] = MicroBatcher(model, self.max_batch, self.max_wait_ms)
+            asyncio.get_running_loop().create_task(self.batchers[name].run())
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1000
+        batches = sum(b.batches for b in self.batchers.values())
+        rows = sum(b.rows for b in self.batchers.values())
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'throughput_rps': self.requests / elapsed if elapsed else 0.0,
+            'latency_ms': {q: float(np.percentile(latencies, int(q[1:]))) if len(latencies) else None
+                           for q in ('p50', 'p90', 'p99')},
+            'batches': batches,
+            'mean_batch_size': rows / batches if batches else 0.0,
+            'models': list(self.models),
+        }
+
+    async def predict(self, payload):
+        name = payload.get('model', next(iter(self.models)))
+        if name not in self.batchers:
+            raise ValueError(f"unknown model {name!r}")
+        if 'features' in payload:
+            features = [float(v) for v in payload['features']]
+        else:
+            features = [float(payload[col]) for col in FEATURE_COLS]
+        if len(features) != len(FEATURE_COLS):
+            raise ValueError(f"expected {len(FEATURE_COLS)} features: {', '.join(FEATURE_COLS)}")
+        # json.loads accepts Infinity, NaN and 1e999; reject them before they reach a shared batch
+        if not np.isfinite(features).all():
+            raise ValueError("features must be finite numbers")
+        probability = await self.batchers[name].predict(features)
+        return {'model': name, 'probability': probability, 'label': int(probability > 0.5)}
+
+    async def route(self, method, path, body):
+        """(status, response dict)"""
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics()
+        if method == 'POST' and path == '/predict':
+            start = time.perf_counter()
+            try:
+                result = await self.predict(json.loads(body or b'{}'))
+            except (ValueError, KeyError, TypeError) as e:
+                self.errors += 1
+                return 400, {'error': str(e)}
+            except Exception as e:
+                # Still answer, instead of dropping the connection
+                self.errors += 1
+                return 500, {'error': f"{type(e).__name__}: {e}"}
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+            return 200, result
+        return 404, {'error': 'not found'}
+
+    async def handle(self, reader, writer):
+        """One keep-alive HTTP/1.1 connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                status, response = await self.route(method, path, body)
+                data = json.dumps(response).encode('utf-8')
+                close = headers.get('connection', '').lower() == 'close'
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port=PORT):
+        self.start_batchers()
+        server = await asyncio.start_server(self.handle, '127.0.0.1', port)
+        print(f"Serving {', '.join(self.models)} on http://127.0.0.1:{port} "
+              f"(max batch {self.max_batch}, max wait {self.max_wait_ms} ms)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+async def http_request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load_generator(port, concurrency, total, models):
+    """Closed-loop load: `concurrency` keep-alive clients sending `total` requests between them"""
+    rng = np.random.default_rng(42)
+    features = np.column_stack([rng.integers(0, 101, total), rng.integers(14, 80, total),
+                                rng.integers(0, 4000, total)]).astype(float)
+    latencies = []
+    counter = iter(range(total))
+
+    async def client():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for i in counter:
+            payload = dict(zip(FEATURE_COLS, features[i].tolist()), model=models[i % len(models)])
+            start = time.perf_counter()
+            status, _ = await http_request(reader, writer, 'POST', '/predict', payload)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, server_metrics = await http_request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    return np.array(latencies) * 1000, elapsed, server_metrics
+
+
+async def wait_until_up(port, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status, _ = await http_request(reader, writer, 'GET', '/health')
+            writer.close()
+            if status == 200:
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"service did not come up on port {port}")
+
+
+def benchmark(concurrency=64, total=20000, port=PORT + 1, models=None):
+    """Start a service in a subprocess, load it from this process and report latency/throughput"""
+    models = models or DEFAULT_MODELS
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', str(port), ','.join(models)],
+                              stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(port))
+        latencies, elapsed, server_metrics = asyncio.run(load_generator(port, concurrency, total, models))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\nLoad test: {total} requests, {concurrency} concurrent clients, models {', '.join(models)}")
+    print("=" * 80)
+    print(f"Throughput: {len(latencies) / elapsed:.0f} requests/s ({total - len(latencies)} failed)")
+    for q in (50, 90, 99):
+        print(f"Client p{q} latency: {np.percentile(latencies, q):.2f} ms")
+    print(f"Server p50/p99 latency: {server_metrics['latency_ms']['p50']:.2f} / "
+          f"{server_metrics['latency_ms']['p99']:.2f} ms")
+    print(f"Mean batch size: {server_metrics['mean_batch_size']:.1f} over {server_metrics['batches']} batches")
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python prediction_service.py serve [port] [rf,gb]\n"
+             "       python prediction_service.py bench [concurrency] [requests] [port]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "serve" and len(sys.argv) <= 4:
+        service = PredictionService(sys.argv[3].split(',') if len(sys.argv) == 4 else None)
+        try:
+            asyncio.run(service.serve(int(sys.argv[2]) if len(sys.argv) > 2 else PORT))
+        except KeyboardInterrupt:
+            pass
+    elif sys.argv[1] == "bench" and len(sys.argv) <= 5:
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 64,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else 20000,
+                  int(sys.argv[4]) if len(sys.argv) > 4 else PORT + 1)
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Fast loader for the model_prep.py output (results/models/prepared_data.txt).
+
+The text file is parsed once, chunk by chunk, into preallocated typed arrays
+(float64 features, int8 targets), then split by dataset. The result is cached
+next to the text file as .npy files, so later loads - by ModelTrainer,
+ModelVisualizer or anything else - just memory-map them. The cache is rebuilt
+whenever the text file's size or modification time changes; each rebuild goes
+to a new version directory and is published by replacing manifest.json, so
+concurrent loaders never map a half-written array.
+"""
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PREPARED_FILE = 'results/models/prepared_data.txt'
+DATASETS = ['test', 'train', 'validation']  # sorted, as the shuffle orders them
+FEATURE_COLS = ['completion_percentage', 'age', 'days_since_registration']
+COLUMNS = ['dataset', 'target'] + FEATURE_COLS
+CHUNK_SIZE = 1000000
+
+
+HEADER_START = b'dataset\t'
+
+
+def scan_prepared(path, block_size=1 << 24):
+    """(line count, header lines, whether the first line is a header) in one pass over the file"""
+    lines = headers = 0
+    tail = b'\n'  # the first line counts as following a newline
+    with open(path, 'rb') as f:
+        first = f.read(len(HEADER_START))
+        f.seek(0)
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            # Keep enough of the previous block to catch a header split across blocks
+            window = tail + block
+            headers += window.count(b'\n' + HEADER_START)
+            tail = window[-len(HEADER_START):]
+    return lines + 1, headers, first == HEADER_START  # + a last line without newline
+
+
+def read_chunks(path, chunksize=CHUNK_SIZE, scan=None):
+    """Typed chunks; header lines anywhere in the file are dropped"""
+    _, headers, first_is_header = scan or scan_prepared(path)
+    if headers > int(first_is_header):
+        # Concatenated reducer outputs repeat the header; coerce each column instead.
+        # Decided before reading, so no chunk is ever yielded twice.
+        yield from read_text_chunks(path, chunksize)
+        return
+    dtypes = {'dataset': 'category', 'target': np.int8}
+    dtypes.update(dict.fromkeys(FEATURE_COLS, np.float64))
+    # Merged shards carry one header, a plain concatenation of shards none
+    yield from pd.read_csv(path, sep='\t', names=COLUMNS, header=0 if first_is_header else None,
+                           dtype=dtypes, chunksize=chunksize, on_bad_lines='skip')
+
+
+def read_text_chunks(source, chunksize=CHUNK_SIZE):
+    """Chunks from any file or stream of prepared lines; header and bad lines are dropped"""
+    for chunk in pd.read_csv(source, sep='\t', names=COLUMNS, header=None, dtype=str,
+                             chunksize=chunksize, on_bad_lines='skip'):
+        numbers = chunk[['target'] + FEATURE_COLS].apply(pd.to_numeric, errors='coerce')
+        valid = numbers.notna().all(axis=1) & chunk['dataset'].isin(DATASETS)
+        numbers = numbers[valid]
+        numbers['target'] = numbers['target'].astype(np.int8)
+        numbers.insert(0, 'dataset', chunk['dataset'][valid])
+        yield numbers
+
+
+def parse_prepared(path, chunksize=CHUNK_SIZE):
+    """{dataset: (X, y)} parsed from the text file into preallocated arrays"""
+    scan = scan_prepared(path)
+    capacity = scan[0]
+    features = np.empty((capacity, len(FEATURE_COLS)), dtype=np.float64)
+    targets = np.empty(capacity, dtype=np.int8)
+    codes = np.empty(capacity, dtype=np.int8)
+
+    rows = 0
+    for chunk in read_chunks(path, chunksize, scan):
+        chunk_codes = pd.Categorical(chunk['dataset'], categories=DATASETS).codes
+        keep = chunk_codes >= 0
+        n = int(keep.sum())
+        features[rows:rows + n] = chunk[FEATURE_COLS].to_numpy(np.float64)[keep]
+        targets[rows:rows + n] = chunk['target'].to_numpy()[keep]
+        codes[rows:rows + n] = chunk_codes[keep]
+        rows += n
+
+    features, targets, codes = features[:rows], targets[:rows], codes[:rows]
+    splits = {}
+    if np.all(codes[1:] >= codes[:-1]):
+        # Reducer output is sorted by dataset, so every split is a slice (no copy)
+        bounds = np.searchsorted(codes, np.arange(len(DATASETS) + 1))
+        for i, name in enumerate(DATASETS):
+            splits[name] = (features[bounds[i]:bounds[i + 1]], targets[bounds[i]:bounds[i + 1]])
+    else:
+        for i, name in enumerate(DATASETS):
+            mask = codes == i
+            splits[name] = (features[mask], targets[mask])
+    return splits
+
+
+def cache_dir(path):
+    return os.path.splitext(path)[0] + '_npy'
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def save_cache(splits, directory, signature):
+    """Write the arrays into a new version directory, then switch manifest.json to it atomically.
+
+    Readers open manifest.json first and only ever see complete arrays; the
+    previous version is kept for readers that are still loading it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{signature['size']}-{signature['mtime_ns']}"
+    target = os.path.join(directory, version)
+    if not os.path.isdir(target):
+        tmp = os.path.join(directory, f'.tmp-{os.getpid()}')
+        os.makedirs(tmp, exist_ok=True)
+        for name, (X, y) in splits.items():
+            np.save(os.path.join(tmp, f'{name}_X.npy'), np.ascontiguousarray(X))
+            np.save(os.path.join(tmp, f'{name}_y.npy'), np.ascontiguousarray(y))
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another process published this version first
+
+    manifest_file = os.path.join(directory, 'manifest.json')
+    previous = read_manifest(directory) or {}
+    with open(f'{manifest_file}.tmp-{os.getpid()}', 'w') as f:
+        json.dump({'source': signature, 'feature_cols': FEATURE_COLS, 'version': version,
+                   'rows': {name: len(y) for name, (_, y) in splits.items()}}, f, indent=1)
+    os.replace(f.name, manifest_file)
+
+    keep = {version, previous.get('version')}
+    for name in os.listdir(directory):
+        if name.endswith('.npy'):
+            os.remove(os.path.join(directory, name))  # arrays of the old unversioned layout
+        elif name.startswith('v') and name not in keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_cache(directory, signature, mmap=True):
+    """Cached splits, or None when the cache is missing or stale"""
+    manifest = read_manifest(directory)
+    if manifest is None or 'version' not in manifest:
+        return None
+    if manifest.get('source') != signature or manifest.get('feature_cols') != FEATURE_COLS:
+        return None
+    mode = 'r' if mmap else None
+    version = os.path.join(directory, manifest['version'])
+    try:
+        return {name: (np.load(os.path.join(version, f'{name}_X.npy'), mmap_mode=mode),
+                       np.load(os.path.join(version, f'{name}_y.npy'), mmap_mode=mode))
+                for name in manifest['rows']}
+    except (OSError, ValueError):
+        return None
+
+
+def load_prepared(path=PREPARED_FILE, cache=True, mmap=True):
+    """{dataset: (X, y)} for train/test/validation, using the .npy cache when fresh"""
+    if not cache:
+        return parse_prepared(path)
+    signature = source_signature(path)
+    splits = load_cache(cache_dir(path), signature, mmap)
+    if splits is None:
+        splits = parse_prepared(path)
+        try:
+            save_cache(splits, cache_dir(path), signature)
+        except OSError:
+            return splits  # read-only location: still usable, just not cached
+        # A concurrent writer may already have published a newer version
+        splits = load_cache(cache_dir(path), signature, mmap) or splits
+    return splits
+
+
+def prepared_frame(splits):
+    """All splits as one DataFrame with the prepared_data.txt columns (for plotting)"""
+    frames = []
+    for name, (X, y) in splits.items():
+        frame = pd.DataFrame(np.asarray(X), columns=FEATURE_COLS)
+        frame.insert(0, 'target', np.asarray(y))
+        frame.insert(0, 'dataset', name)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else PREPARED_FILE
+    start = time.perf_counter()
+    splits = load_prepared(path)
+    elapsed = time.perf_counter() - start
+    for name, (X, y) in splits.items():
+        print(f"{name}\t{len(y)} rows\tpositive rate {np.mean(y) if len(y) else 0:.4f}")
+    print(f"Loaded in {elapsed:.2f}s (cache: {cache_dir(path)})")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Headless, parallel and incremental rendering of every result plot.
+
+Each visualizer lists its figures with a figures() function (see figure_spec.py);
+one FigureSpec names the function that draws it, the result files it reads and
+the files it writes. Figures are rendered with the Agg backend in a process
+pool. An optional prepare_figures() runs in the parent before the pool starts,
+to build caches the workers would otherwise all rebuild at once. The
+visualizer modules - and with them matplotlib, seaborn and pandas - are
+imported once here, so forked workers start with them already loaded.
+
+A figure is skipped when the content of its sources, the code of its visualizer
+(plus every local module it imports) and its arguments match the last render
+and its outputs are unchanged on disk. State and cached content hashes are kept
+in results/render_state.json. Every run reports the render time of each figure.
+
+    python render_plots.py run [figure|prefix,...] [workers] [force]
+    python render_plots.py list [figure|prefix,...]
+
+A prefix selects a group, e.g. `task6` or `models`.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+
+from pipeline import SCRIPT_DIR, cached_digest, local_imports
+
+STATE_FILE = 'results/render_state.json'
+VISUALIZERS = [
+    'generate_visualizations',
+    'task4_visualize_clusters',
+    'task5_visualize_outliers',
+    'task6_visualize_encoding',
+    'task7_visualize_multilabel',
+    'model_visualization',
+    'evaluation_visualization',
+]
+
+
+def collect_figures(modules=VISUALIZERS):
+    specs = []
+    for name in modules:
+        specs.extend(importlib.import_module(name).figures())
+    return specs
+
+
+def select(specs, targets=None):
+    """Specs whose name equals or starts with one of the targets (group prefix)"""
+    if not targets:
+        return specs
+    chosen = [s for s in specs if any(s.name == t or s.name.startswith(t.rstrip('/') + '/') for t in targets)]
+    if not chosen:
+        raise ValueError(f"no figure matches {', '.join(targets)}")
+    return chosen
+
+
+def render(spec):
+    """Worker: draw one figure from default rc settings; returns the seconds taken"""
+    import matplotlib.pyplot as plt
+    matplotlib.rcdefaults()  # a previous figure's seaborn theme must not leak into this one
+    start = time.perf_counter()
+    try:
+        getattr(importlib.import_module(spec.module), spec.function)(*spec.args)
+    finally:
+        plt.close('all')
+    return time.perf_counter() - start
+
+
+class Renderer:
+    def __init__(self, state_file=STATE_FILE):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        try:
+            with open(state_file) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {'hashes': {}, 'figures': {}}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp = f'{self.state_file}.tmp-{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_file)
+
+    def digest(self, path):
+        return cached_digest(self.state['hashes'], path, self.lock)
+
+    def fingerprint(self, spec):
+        missing = [s for s in spec.sources if not os.path.exists(s)]
+        if missing:
+            raise FileNotFoundError(f"missing source {', '.join(missing)}")
+        parts = {
+            'call': spec.describe(),
+            'sources': {s: self.digest(s) for s in spec.sources},
+            'code': {m: self.digest(os.path.join(SCRIPT_DIR, m))
+                     for m in sorted(local_imports(f'{spec.module}.py'))},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_current(self, spec, fingerprint):
+        record = self.state['figures'].get(spec.name)
+        if not record or record['fingerprint'] != fingerprint:
+            return False
+        return all(os.path.exists(o) and self.digest(o) == record['outputs'].get(o) for o in spec.outputs)
+
+    def run(self, specs, workers=None, force=False, out=sys.stdout):
+        """Render every stale figure in a process pool; returns {name: (status, seconds, message)}"""
+        start = time.perf_counter()
+        results, pending = {}, {}
+        for spec in specs:
+            try:
+                fingerprint = self.fingerprint(spec)
+            except FileNotFoundError as e:
+                results[spec.name] = ('missing', 0.0, str(e))
+                continue
+            if not force and self.is_current(spec, fingerprint):
+                results[spec.name] = ('current', 0.0, '')
+            else:
+                pending[spec.name] = (spec, fingerprint)
+
+        if pending:
+            # Shared caches (e.g. the prepared-data .npy files) are built here once, not by racing workers
+            for module in sorted({spec.module for spec, _ in pending.values()}):
+                prepare = getattr(importlib.import_module(module), 'prepare_figures', None)
+                if prepare:
+                    prepare()
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as pool:
+                futures = {pool.submit(render, spec): name for name, (spec, _) in pending.items()}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    spec, fingerprint = pending[name]
+                    try:
+                        seconds = future.result()
+                        missing = [o for o in spec.outputs if not os.path.exists(o)]
+                        if missing:
+                            raise RuntimeError(f"did not write {', '.join(missing)}")
+                        self.state['figures'][name] = {
+                            'fingerprint': fingerprint,
+                            'outputs': {o: self.digest(o) for o in spec.outputs},
+                            'seconds': round(seconds, 3),
+                        }
+                        results[name] = ('rendered', seconds, '')
+                    except Exception as e:
+                        results[name] = ('failed', 0.0, str(e))
+                    out.write(f"{name}: {results[name][0]} ({results[name][1]:.2f}s)"
+                              f"{' - ' + results[name][2] if results[name][2] else ''}\n")
+        self.save_state()
+
+        out.write(f"\nFigure\tStatus\tSeconds\tNote\n")
+        for spec in specs:
+            status, seconds, message = results[spec.name]
+            out.write(f"{spec.name}\t{status}\t{seconds:.2f}\t{message or '-'}\n")
+        counts = {status: sum(1 for s, _, _ in results.values() if s == status)
+                  for status in ('rendered', 'current', 'missing', 'failed')}
+        out.write(f"\n{', '.join(f'{n} {status}' for status, n in counts.items())}, "
+                  f"{sum(s for _, s, _ in results.values()):.2f}s rendering, "
+                  f"{time.perf_counter() - start:.2f}s total\n")
+        return results
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python render_plots.py run [figure|prefix,...] [workers] [force]\n"
+             "       python render_plots.py list [figure|prefix,...]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    try:
+        targets = sys.argv[2].split(',') if len(sys.argv) > 2 and sys.argv[2] not in ('', 'all') else None
+        if sys.argv[1] == "run" and len(sys.argv) <= 5 and (len(sys.argv) < 5 or sys.argv[4] == 'force'):
+            workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            results = Renderer().run(select(collect_figures(), targets), workers, force=len(sys.argv) == 5)
+            sys.exit(1 if any(status == 'failed' for status, _, _ in results.values()) else 0)
+        elif sys.argv[1] == "list" and len(sys.argv) <= 3:
+            for spec in select(collect_figures(), targets):
+                print(f"{spec.name}\t{spec.describe()}")
+                print(f"\tsources: {', '.join(spec.sources) or '-'}\n\toutputs: {', '.join(spec.outputs)}")
+        else:
+            print(usage)
+            sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
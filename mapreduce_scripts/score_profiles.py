@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Batch scoring of every profile with a trained model.
+
+The mapper loads the model once per task, extracts the same features
+as DataPrepMapper, buffers them into a preallocated NumPy batch and calls
+predict_proba once per batch. Output is map-only:
+    user_id \t probability \t label
+
+Hadoop streaming (model shipped with -files, -numReduceTasks 0):
+    -mapper "python score_profiles.py mapper rf_model.joblib"
+Local, in parallel over byte ranges of the profiles file:
+    python score_profiles.py local <profiles_file> <model> <output_dir> [workers]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from incremental_training import load_scaler
+from model_prep import DataPrepMapper
+from model_registry import load_model
+from prepared_data import FEATURE_COLS
+
+BATCH_SIZE = 10000
+THRESHOLD = 0.5
+
+
+def load_scorer(model_spec):
+    """predict-proba function for a registry model (name or file) or an incremental_training state"""
+    model = load_model(model_spec)
+    if isinstance(model, dict) and 'scaler' in model:
+        estimator, scaler = model['model'], load_scaler(model)
+        return lambda X: estimator.predict_proba(scaler.transform(X))[:, 1]
+    return lambda X: model.predict_proba(X)[:, 1]
+
+
+class ScoringMapper:
+    def __init__(self, model_spec, batch_size=BATCH_SIZE, out=sys.stdout):
+        self.predict_proba = load_scorer(model_spec)
+        self.extractor = DataPrepMapper()
+        self.batch = np.empty((batch_size, len(FEATURE_COLS)), dtype=np.float64)
+        self.user_ids = [None] * batch_size
+        self.size = 0
+        self.skipped = 0
+        self.out = out
+
+    def add(self, line):
+        try:
+            fields = line.strip().split('\t')
+            features = self.extractor.extract_features(fields)
+        except Exception:
+            features = None
+        if features is None:
+            self.skipped += 1
+            return
+        self.batch[self.size] = [features[col] for col in FEATURE_COLS]
+        self.user_ids[self.size] = fields[self.extractor.columns['user_id']]
+        self.size += 1
+        if self.size == len(self.batch):
+            self.flush()
+
+    def flush(self):
+        if not self.size:
+            return
+        probabilities = self.predict_proba(self.batch[:self.size])
+        labels = (probabilities > THRESHOLD).astype(int)  # same tie-break as predict()
+        self.out.write(''.join(f"{user_id}\t{p:.6f}\t{label}\n" for user_id, p, label
+                               in zip(self.user_ids[:self.size], probabilities, labels)))
+        self.size = 0
+
+    def map(self, lines=sys.stdin):
+        for line in lines:
+            self.add(line)
+        self.flush()
+        if self.skipped:
+            sys.stderr.write(f"reporter:counter:Scoring,skipped_profiles,{self.skipped}\n")
+
+
+def read_range(path, start, end):
+    """Lines that begin inside the byte range [start, end) of a file"""
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line the previous range owns
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8', errors='replace')
+
+
+def score_range(path, start, end, model_spec, output_file, batch_size):
+    with open(output_file, 'w', encoding='utf-8') as out:
+        mapper = ScoringMapper(model_spec, batch_size, out)
+        for line in read_range(path, start, end):
+            mapper.add(line)
+        mapper.flush()
+    return mapper.skipped
+
+
+def score_local(path, model_spec, output_dir, workers=None, batch_size=BATCH_SIZE):
+    """Score a profiles file with one process per byte range; returns part files and skip count"""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    size = os.path.getsize(path)
+    bounds = [size * i // workers for i in range(workers + 1)]
+    parts = [os.path.join(output_dir, f'part-{i:05d}') for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        skipped = pool.map(score_range, [path] * workers, bounds[:-1], bounds[1:],
+                           [model_spec] * workers, parts, [batch_size] * workers)
+        return parts, sum(skipped)
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python score_profiles.py mapper <model> [batch_size]\n"
+             "       python score_profiles.py local <profiles_file> <model> <output_dir> [workers]")
+    if len(sys.argv) < 3:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "mapper" and len(sys.argv) in (3, 4):
+        ScoringMapper(sys.argv[2], int(sys.argv[3]) if len(sys.argv) == 4 else BATCH_SIZE).map()
+    elif sys.argv[1] == "local" and len(sys.argv) in (5, 6):
+        start = time.perf_counter()
+        parts, skipped = score_local(sys.argv[2], sys.argv[3], sys.argv[4],
+                                     int(sys.argv[5]) if len(sys.argv) == 6 else None)
+        print(f"Scored {sys.argv[2]} into {len(parts)} part files in {sys.argv[4]} "
+              f"({skipped} profiles skipped) in {time.perf_counter() - start:.2f}s")
+    else:
+        print(usage)
+        sys.exit(1)
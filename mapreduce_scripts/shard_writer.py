@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Part files written directly by map tasks, for map-only jobs on one filesystem.
+
+A mapper that would otherwise send every row through an identity reducer can
+write its own shards instead: <output_dir>/<key>/part-m-<task> (key '' writes
+straight into output_dir). Shards are written with plain file I/O, so this
+only works for local runs or when output_dir is on a filesystem every task
+sees (a single node or a shared mount). On a multi-node Hadoop cluster run
+the plain mapper with -numReduceTasks 0 instead: it prints to stdout and
+Hadoop writes the part-m-* files to HDFS.
+
+Shards hold data lines only. On the shared filesystem every task writes the
+same _header manifest into the one output directory; for HDFS output the
+driver stores it once (e.g. `model_prep.py header`). A plain concatenation
+of shards has no header line, so use merge - or a reader that checks for one,
+as prepared_data.py does. Each shard is written under a temporary name and
+renamed on close, so a failed or speculative task attempt never leaves a
+partial shard behind.
+
+When a single file is needed (HDFS output first copied with hdfs dfs -get):
+    python shard_writer.py merge <shard_dir> <output_file>
+    python shard_writer.py index <shard_dir>
+merge writes the header once followed by every shard in order; index writes
+<shard_dir>/_index with the row count and size of each shard.
+"""
+import os
+import shutil
+import sys
+
+HEADER_FILE = '_header'
+INDEX_FILE = '_index'
+
+
+def task_partition(default=0):
+    """Map task number from the Hadoop streaming environment"""
+    for name in ('mapreduce_task_partition', 'mapred_task_partition'):
+        if os.environ.get(name, '').isdigit():
+            return int(os.environ[name])
+    return default
+
+
+class ShardWriter:
+    def __init__(self, output_dir, header=None, task_id=None):
+        self.output_dir = output_dir
+        self.header = header
+        self.task_id = task_partition() if task_id is None else task_id
+        self.files = {}
+
+    def shard_path(self, key):
+        return os.path.join(self.output_dir, key, f'part-m-{self.task_id:05d}')
+
+    def file(self, key):
+        f = self.files.get(key)
+        if f is None:
+            path = self.shard_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = self.files[key] = open(f'{path}.tmp-{os.getpid()}', 'w', encoding='utf-8')
+        return f
+
+    def write(self, key, line):
+        self.file(key).write(line + '\n')
+
+    def write_text(self, key, text):
+        """Several newline-terminated lines at once, e.g. a formatted chunk"""
+        self.file(key).write(text)
+
+    def close(self):
+        """Publish every shard under its final name; returns {key: path}"""
+        paths = {}
+        for key, f in self.files.items():
+            f.close()
+            paths[key] = self.shard_path(key)
+            os.replace(f.name, paths[key])
+            if self.header:
+                write_header(os.path.dirname(paths[key]), self.header)
+        self.files = {}
+        return paths
+
+
+def write_header(shard_dir, header):
+    """Every task writes the same manifest, so the last rename wins harmlessly"""
+    path = os.path.join(shard_dir, HEADER_FILE)
+    with open(f'{path}.tmp-{os.getpid()}', 'w', encoding='utf-8') as f:
+        f.write(header + '\n')
+    os.replace(f.name, path)
+
+
+def read_header(shard_dir):
+    try:
+        with open(os.path.join(shard_dir, HEADER_FILE), encoding='utf-8') as f:
+            return f.readline().rstrip('\n')
+    except OSError:
+        return None
+
+
+def list_shards(shard_dir):
+    """Part files under shard_dir in merge order: its own parts, then each key directory in sorted order"""
+    shards = []
+    for name in sorted(os.listdir(shard_dir)):
+        path = os.path.join(shard_dir, name)
+        if name.startswith('part-') and '.tmp-' not in name and os.path.isfile(path):
+            shards.append(path)
+        elif os.path.isdir(path) and not name.startswith(('_', '.')):
+            shards.extend(list_shards(path))
+    return shards
+
+
+def find_header(shard_dir):
+    header = read_header(shard_dir)
+    if header is None:
+        for path in list_shards(shard_dir):
+            header = read_header(os.path.dirname(path))
+            if header is not None:
+                break
+    return header
+
+
+def merge_shards(shard_dir, output_file):
+    """Concatenate all shards under one header line; returns the number of shards"""
+    shards = list_shards(shard_dir)
+    header = find_header(shard_dir)
+    with open(output_file, 'wb') as out:
+        if header is not None:
+            out.write((header + '\n').encode('utf-8'))
+        for path in shards:
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, out, 1 << 24)
+    return len(shards)
+
+
+def index_shards(shard_dir):
+    """Write <shard_dir>/_index: shard path, first row, rows and bytes of every shard"""
+    first_row = 0
+    with open(os.path.join(shard_dir, INDEX_FILE), 'w', encoding='utf-8') as out:
+        out.write("shard\tfirst_row\trows\tbytes\n")
+        for path in list_shards(shard_dir):
+            rows = 0
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 24), b''):
+                    rows += block.count(b'\n')
+            out.write(f"{os.path.relpath(path, shard_dir)}\t{first_row}\t{rows}\t{os.path.getsize(path)}\n")
+            first_row += rows
+    return first_row
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python shard_writer.py merge <shard_dir> <output_file>\n"
+             "       python shard_writer.py index <shard_dir>")
+    if len(sys.argv) == 4 and sys.argv[1] == "merge":
+        count = merge_shards(sys.argv[2], sys.argv[3])
+        print(f"Merged {count} shards into {sys.argv[3]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "index":
+        rows = index_shards(sys.argv[2])
+        print(f"Indexed {rows} rows in {os.path.join(sys.argv[2], INDEX_FILE)}")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Similar-interest search with MinHash LSH over the hobbies and sports columns.
+
+Each profile's interests are the diacritic-folded tokens of the same two
+columns MultilabelMapper reads. A MinHash signature of NUM_PERM values is cut
+into BANDS bands; profiles whose band values are identical land in the same
+LSH bucket and become candidate pairs, and the fraction of equal signature
+values estimates their Jaccard similarity.
+
+Hadoop job: the mapper signs every profile and emits one line per band,
+    band:bucket \t user_id \t signature (hex)
+so each reducer scores the pairs of its own buckets from its input alone.
+
+Lookups: `index` builds a memory-mapped index of all signatures locally and
+`query` answers single-user lookups from it; `pairs` scores every bucket of
+an index without Hadoop.
+
+Buckets larger than MAX_BUCKET (generic profiles with near-identical
+interests) are not skipped: their members are sorted by signature and cut
+into blocks, and each block is scored against itself and the next block, so
+near-duplicates - adjacent after sorting - are still paired while the work
+stays linear in the bucket size.
+"""
+import json
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from groupby_engine import read_profiles
+from text_utils import tokenize
+
+HOBBIES_IDX = 11
+SPORTS_IDX = 39
+NUM_PERM = 64
+BANDS = 16           # 16 bands x 4 rows: pairs above ~0.5 Jaccard are likely candidates
+SEED = 42
+MAX_BUCKET = 500     # larger buckets are scored in signature-sorted blocks of this size
+MIN_JACCARD = 0.5
+PRIME = np.uint64((1 << 61) - 1)
+MASK = np.uint64(0xFFFFFFFF)
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+        self.band_mix = rng.randint(1, 2 ** 31 - 1, size=self.rows).astype(np.uint64) | np.uint64(1)
+
+    def signature(self, tokens):
+        """uint32 MinHash signature of a token set (None when empty)"""
+        if not tokens:
+            return None
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens),
+                             dtype=np.uint64, count=len(tokens))
+        permuted = ((hashes[:, None] * self.a + self.b) % PRIME) & MASK
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_hashes(self, signatures):
+        """(n, bands) uint64 hash of each band's rows for an (n, num_perm) signature matrix"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bands * self.band_mix).sum(axis=2)  # wraps mod 2**64 on purpose
+
+
+def interests(hobbies, sports):
+    return set(tokenize(hobbies)) | set(tokenize(sports))
+
+
+def bucket_pairs(user_ids, signatures, band_hashes, band, block=MAX_BUCKET):
+    """Scored pairs (first, second, jaccard) of one bucket, each pair reported only in its first shared band"""
+    if len(user_ids) < 2:
+        return []
+    # Signature order (ties by user id) so the result does not depend on input order
+    order = np.lexsort(np.vstack([user_ids, signatures.T[::-1]]))
+    user_ids, signatures, band_hashes = user_ids[order], signatures[order], band_hashes[order]
+    pairs = []
+    for start in range(0, len(user_ids), block):
+        # This block against itself and the next block
+        rows, cols = min(block, len(user_ids) - start), min(2 * block, len(user_ids) - start)
+        first, second = np.triu_indices(rows, k=1, m=cols)
+        first, second = first + start, second + start
+        same_band = band_hashes[first] == band_hashes[second]
+        owned = same_band.argmax(axis=1) == band
+        first, second = first[owned], second[owned]
+        jaccard = (signatures[first] == signatures[second]).mean(axis=1)
+        pairs.extend(zip(user_ids[first].tolist(), user_ids[second].tolist(), jaccard.tolist()))
+    return pairs
+
+
+class LshIndex:
+    """Persisted signatures plus, per band, user positions sorted by band hash"""
+    def __init__(self, index_dir, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(index_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.hasher = MinHasher(manifest['num_perm'], manifest['bands'], manifest['seed'])
+        self.user_ids = np.load(os.path.join(index_dir, 'user_ids.npy'), mmap_mode=mode)
+        self.signatures = np.load(os.path.join(index_dir, 'signatures.npy'), mmap_mode=mode)
+        self.band_hashes = np.load(os.path.join(index_dir, 'band_hashes.npy'), mmap_mode=mode)
+        self.band_order = np.load(os.path.join(index_dir, 'band_order.npy'), mmap_mode=mode)
+        self.sorted_hashes = np.load(os.path.join(index_dir, 'sorted_hashes.npy'), mmap_mode=mode)
+
+    @staticmethod
+    def build(input_file, index_dir, hasher=None):
+        hasher = hasher or MinHasher()
+        user_ids, signatures = [], []
+        for frame in read_profiles(input_file, [0, HOBBIES_IDX, SPORTS_IDX]):
+            for user_id, hobbies, sports in zip(frame[0], frame[HOBBIES_IDX], frame[SPORTS_IDX]):
+                signature = hasher.signature(interests(hobbies, sports))
+                if signature is not None and user_id.isdigit():
+                    user_ids.append(int(user_id))
+                    signatures.append(signature)
+
+        user_ids = np.array(user_ids, dtype=np.int64)
+        signatures = np.array(signatures, dtype=np.uint32).reshape(-1, hasher.num_perm)
+        order = np.argsort(user_ids, kind='stable')
+        user_ids, signatures = user_ids[order], signatures[order]
+        band_hashes = hasher.band_hashes(signatures)
+        # (bands, n) so each band's sorted column is contiguous for queries
+        band_order = np.argsort(band_hashes, axis=0, kind='stable').T.astype(np.int64)
+        sorted_hashes = np.take_along_axis(band_hashes.T, band_order, axis=1)
+
+        os.makedirs(index_dir, exist_ok=True)
+        for name, array in [('user_ids', user_ids), ('signatures', signatures),
+                            ('band_hashes', band_hashes), ('band_order', band_order),
+                            ('sorted_hashes', sorted_hashes)]:
+            np.save(os.path.join(index_dir, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(index_dir, 'manifest.json'), 'w') as f:
+            json.dump({'num_perm': hasher.num_perm, 'bands': hasher.bands, 'seed': SEED,
+                       'users': len(user_ids), 'columns': [HOBBIES_IDX, SPORTS_IDX]}, f, indent=1)
+
+    def positions(self, user_ids):
+        """Row positions of user ids (-1 when not indexed)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        pos = np.searchsorted(self.user_ids, user_ids)
+        pos = np.minimum(pos, len(self.user_ids) - 1)
+        return np.where(self.user_ids[pos] == user_ids, pos, -1)
+
+    def bucket_pairs(self, positions, band):
+        """Scored pairs of one bucket, each pair reported only in its first shared band"""
+        positions = np.unique(positions[positions >= 0])
+        return bucket_pairs(self.user_ids[positions], np.asarray(self.signatures[positions]),
+                            np.asarray(self.band_hashes[positions]), band)
+
+    def all_pairs(self, min_jaccard=MIN_JACCARD):
+        """Candidate pairs over the whole index, bucket by bucket"""
+        for band in range(self.hasher.bands):
+            hashes = self.sorted_hashes[band]
+            starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+            ends = np.r_[starts[1:], len(hashes)]
+            for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+                for pair in self.bucket_pairs(self.band_order[band, start:end], band):
+                    if pair[2] >= min_jaccard:
+                        yield pair
+
+    def query(self, user_id, top_n=20):
+        """Most similar indexed users to user_id: [(user_id, estimated Jaccard)]"""
+        pos = self.positions([user_id])[0]
+        if pos < 0:
+            return []
+        candidates = []
+        for band in range(self.hasher.bands):
+            value = self.band_hashes[pos, band]
+            hashes = self.sorted_hashes[band]
+            start, end = np.searchsorted(hashes, value, 'left'), np.searchsorted(hashes, value, 'right')
+            candidates.append(self.band_order[band, start:end])
+        candidates = np.unique(np.concatenate(candidates))
+        candidates = candidates[candidates != pos]
+        jaccard = (self.signatures[candidates] == self.signatures[pos]).mean(axis=1)
+        best = np.argsort(-jaccard, kind='stable')[:top_n]
+        return list(zip(self.user_ids[candidates[best]].tolist(), jaccard[best].tolist()))
+
+
+class LshMapper:
+    def __init__(self):
+        self.hasher = MinHasher()
+
+    def map(self):
+        """Emit band:bucket \t user_id \t signature for every band of every profile with interests"""
+        for frame in read_profiles(sys.stdin, [0, HOBBIES_IDX, SPORTS_IDX]):
+            user_ids, signatures = [], []
+            for user_id, hobbies, sports in zip(frame[0], frame[HOBBIES_IDX], frame[SPORTS_IDX]):
+                signature = self.hasher.signature(interests(hobbies, sports))
+                if signature is not None:
+                    user_ids.append(user_id)
+                    signatures.append(signature)
+            if not signatures:
+                continue
+            band_hashes = self.hasher.band_hashes(np.array(signatures))
+            for user_id, signature, hashes in zip(user_ids, signatures, band_hashes):
+                encoded = signature.astype('<u4').tobytes().hex()
+                for band, value in enumerate(hashes):
+                    print(f"{band}:{value:016x}\t{user_id}\t{encoded}")
+
+
+class LshReducer:
+    def __init__(self, min_jaccard=MIN_JACCARD):
+        self.hasher = MinHasher()
+        self.min_jaccard = min_jaccard
+
+    def flush(self, key, members):
+        band = int(key.split(':')[0])
+        if len(members) > MAX_BUCKET:
+            sys.stderr.write("reporter:counter:LSH,split_buckets,1\n")
+        user_ids = np.array(list(members), dtype=np.int64)
+        signatures = np.array(list(members.values()), dtype=np.uint32)
+        band_hashes = self.hasher.band_hashes(signatures)
+        for first, second, jaccard in bucket_pairs(user_ids, signatures, band_hashes, band):
+            if jaccard >= self.min_jaccard:
+                print(f"{first}\t{second}\t{jaccard:.3f}")
+
+    def reduce(self):
+        current_key = None
+        members = {}  # user_id -> signature; a repeated user is kept once
+        for line in sys.stdin:
+            try:
+                key, user_id, encoded = line.rstrip('\n').split('\t')
+                user_id = int(user_id)
+                signature = np.frombuffer(bytes.fromhex(encoded), dtype='<u4')
+                if len(signature) != self.hasher.num_perm:
+                    continue
+            except Exception:
+                continue
+            if key != current_key:
+                if current_key is not None:
+                    self.flush(current_key, members)
+                current_key = key
+                members = {}
+            members[user_id] = signature
+
+        if current_key is not None:
+            self.flush(current_key, members)
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python similar_profiles.py index <profiles_file> <index_dir>\n"
+             "       python similar_profiles.py mapper\n"
+             "       python similar_profiles.py reducer [min_jaccard]\n"
+             "       python similar_profiles.py pairs <index_dir> [min_jaccard]\n"
+             "       python similar_profiles.py query <index_dir> <user_id> [top_n]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "index" and len(sys.argv) == 4:
+        LshIndex.build(sys.argv[2], sys.argv[3])
+    elif sys.argv[1] == "mapper":
+        LshMapper().map()
+    elif sys.argv[1] == "reducer" and len(sys.argv) in (2, 3):
+        min_jaccard = float(sys.argv[2]) if len(sys.argv) == 3 else MIN_JACCARD
+        LshReducer(min_jaccard).reduce()
+    elif sys.argv[1] == "pairs" and len(sys.argv) in (3, 4):
+        min_jaccard = float(sys.argv[3]) if len(sys.argv) == 4 else MIN_JACCARD
+        for first, second, jaccard in LshIndex(sys.argv[2]).all_pairs(min_jaccard):
+            print(f"{first}\t{second}\t{jaccard:.3f}")
+    elif sys.argv[1] == "query" and len(sys.argv) in (4, 5):
+        start = time.perf_counter()
+        index = LshIndex(sys.argv[2])
+        results = index.query(int(sys.argv[3]), int(sys.argv[4]) if len(sys.argv) == 5 else 20)
+        elapsed = (time.perf_counter() - start) * 1000
+        print("user_id\testimated_jaccard")
+        for user_id, jaccard in results:
+            print(f"{user_id}\t{jaccard:.3f}")
+        print(f"\n{len(results)} similar users in {elapsed:.1f} ms")
+    else:
+        print(usage)
+        sys.exit(1)
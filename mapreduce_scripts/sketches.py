@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Mergeable streaming summaries used by the vocabulary and profiling jobs.
+
+Every sketch can be built independently in each mapper and merged in the
+combiner/reducer, so a job needs one pass over the data and only ships the
+(small, fixed-size) sketches through the shuffle.
+"""
+import base64
+import heapq
+import math
+
+import numpy as np
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters with a fixed number of counters.
+
+    counts[item] overestimates the true count by at most errors[item]. Items
+    that are not tracked occurred at most `floor` times. Merging follows the
+    mergeable-summaries construction: an item missing from one side is
+    assumed to have that side's floor, then only the largest `capacity`
+    counters are kept.
+    """
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    def update(self, counts):
+        """Fold exact counts ({item: count}, e.g. an in-mapper buffer) into the sketch"""
+        exact = SpaceSaving(self.capacity)
+        exact.counts = dict(counts)
+        exact.errors = dict.fromkeys(counts, 0)
+        self.merge(exact)
+
+    def merge(self, other):
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, self.floor) + other.counts.get(item, other.floor)
+            errors[item] = self.errors.get(item, self.floor) + other.errors.get(item, other.floor)
+        self.floor += other.floor
+        self._set(counts, errors)
+
+    def _set(self, counts, errors):
+        if len(counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity + 1, counts, key=counts.get)
+            # The largest dropped counter bounds every item we no longer track
+            self.floor = max(self.floor, counts[kept.pop()])
+            counts = {item: counts[item] for item in kept}
+        self.counts = counts
+        self.errors = {item: errors[item] for item in counts}
+
+    def top(self, k=None):
+        """[(item, count, error)] by decreasing count"""
+        items = sorted(self.counts, key=lambda item: (-self.counts[item], item))[:k]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+    def to_parts(self):
+        """Serialize as (floor, [(item, count - floor, error - floor)]).
+
+        Parts from several sketches merge by plain addition: sum the floors and,
+        per item, the offsets; an item absent from a sketch contributes nothing,
+        which is the same as counting it at that sketch's floor.
+        """
+        return self.floor, [(item, count - self.floor, self.errors[item] - self.floor)
+                            for item, count in self.counts.items()]
+
+    @classmethod
+    def from_parts(cls, floor, offsets, capacity=100):
+        """Inverse of to_parts for summed parts: offsets is {item: (count, error)}"""
+        sketch = cls(capacity)
+        sketch.floor = floor
+        sketch._set({item: floor + count for item, (count, _) in offsets.items()},
+                    {item: floor + error for item, (_, error) in offsets.items()})
+        return sketch
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'floor': self.floor,
+                'items': [[item, self.counts[item], self.errors[item]] for item in self.counts]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['capacity'])
+        sketch.floor = data['floor']
+        sketch.counts = {item: count for item, count, _ in data['items']}
+        sketch.errors = {item: error for item, _, error in data['items']}
+        return sketch
+
+
+class HyperLogLog:
+    """Approximate distinct counter over 64-bit hashes (2**precision one-byte registers).
+
+    Standard error is about 1.04 / sqrt(2**precision), 1.6% at the default
+    precision of 12. Sketches merge by taking the register-wise maximum.
+    """
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """Add an array of uint64 hashes (e.g. pd.util.hash_pandas_object)"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        p = self.precision
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes << np.uint64(p)
+        rank = np.minimum(_leading_zeros(rest) + 1, 64 - p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {'precision': self.precision,
+                'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['precision'])
+        sketch.registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+def _leading_zeros(values):
+    """Exact count of leading zero bits of uint64 values (64 for zero)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    # 32-bit halves are exact in float64, so log2 gives the exact bit length
+    with np.errstate(divide='ignore'):
+        high_bits = np.where(high > 0, np.floor(np.log2(high)) + 1, 0)
+        low_bits = np.where(low > 0, np.floor(np.log2(low)) + 1, 0)
+    return np.where(high > 0, 32 - high_bits, 64 - low_bits).astype(np.int64)
+
+
+class Reservoir:
+    """Uniform sample of fixed size, kept as the items with the smallest random keys.
+
+    Because every item draws an independent key, the union of two reservoirs
+    trimmed to the smallest keys is again a uniform sample of both streams.
+    """
+    def __init__(self, size=10, rng=None):
+        self.size = size
+        self.rng = rng or np.random.default_rng()
+        self.items = []  # [(key, value)]
+
+    def add_many(self, values):
+        values = list(values)
+        if not values:
+            return
+        keys = self.rng.random(len(values))
+        if len(values) > self.size:
+            chosen = np.argpartition(keys, self.size)[:self.size]
+        else:
+            chosen = range(len(values))
+        self._keep(self.items + [(float(keys[i]), values[i]) for i in chosen])
+
+    def merge(self, other):
+        self._keep(self.items + other.items)
+
+    def _keep(self, items):
+        self.items = sorted(items)[:self.size]
+
+    def sample(self):
+        return [value for _, value in self.items]
+
+    def to_dict(self):
+        return {'size': self.size, 'items': self.items}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['size'])
+        sketch.items = [(key, value) for key, value in data['items']]
+        return sketch
+
+
+class Moments:
+    """Count, mean, variance, min and max of a numeric stream.
+
+    Each batch is summarised with NumPy and folded in with Chan's parallel
+    update (Welford's recurrence generalised to batches), so partial moments
+    from any number of mappers merge without the cancellation error of
+    summing squares.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        batch = Moments()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def remove(self, other):
+        """Inverse of merge, to retract rows that were added before.
+
+        min and max cannot be narrowed from a summary, so they stay as bounds.
+        """
+        if not other.count:
+            return
+        total = self.count - other.count
+        if total <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = other.mean - self.mean
+        self.mean -= delta * other.count / total
+        self.m2 = max(self.m2 - other.m2 - delta * delta * self.count * other.count / total, 0.0)
+        self.count = total
+
+    @property
+    def variance(self):
+        """Population variance"""
+        return self.m2 / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = data['count'], data['mean'], data['m2']
+        if moments.count:
+            moments.min, moments.max = data['min'], data['max']
+        return moments
+
+
+class QuantileSketch:
+    """Quantiles with bounded relative error (DDSketch).
+
+    Values are counted in logarithmic buckets: bucket k holds magnitudes in
+    (gamma**(k-1), gamma**k] with gamma = (1 + a) / (1 - a), so any reported
+    quantile is within a relative error a of a true value at that rank.
+    Sketches merge by adding bucket counts; the number of buckets grows only
+    with the log of the value range.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.positive = {}  # bucket -> count
+        self.negative = {}  # bucket of the magnitude -> count
+        self.zeros = 0
+        self.count = 0
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(magnitudes):
+                buckets = np.ceil(np.log(magnitudes) / math.log(self.gamma)).astype(np.int64)
+                for bucket, n in zip(*np.unique(buckets, return_counts=True)):
+                    store[int(bucket)] = store.get(int(bucket), 0) + int(n)
+        self.count += len(values)
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, n in other_store.items():
+                store[bucket] = store.get(bucket, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def remove(self, other):
+        """Inverse of merge, to retract values that were added before"""
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, n in other_store.items():
+                left = store.get(bucket, 0) - n
+                if left > 0:
+                    store[bucket] = left
+                else:
+                    store.pop(bucket, None)
+        self.zeros -= other.zeros
+        self.count -= other.count
+
+    def _value(self, bucket):
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        ordered = ([(-self._value(b), self.negative[b]) for b in sorted(self.negative, reverse=True)]
+                   + [(0.0, self.zeros)]
+                   + [(self._value(b), self.positive[b]) for b in sorted(self.positive)])
+        seen = 0
+        for value, n in ordered:
+            seen += n
+            if seen > rank:
+                return value
+        return ordered[-1][0]
+
+    def to_dict(self):
+        return {'relative_accuracy': self.relative_accuracy, 'zeros': self.zeros, 'count': self.count,
+                'positive': sorted(self.positive.items()), 'negative': sorted(self.negative.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.zeros, sketch.count = data['zeros'], data['count']
+        sketch.positive = {bucket: n for bucket, n in data['positive']}
+        sketch.negative = {bucket: n for bucket, n in data['negative']}
+        return sketch
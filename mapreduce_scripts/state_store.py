@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Persisted aggregate state, updated from delta files of new or changed profiles.
+
+The aggregate jobs all reduce to mergeable state: completion histograms per
+group (demographics and correlations, from groupby_engine.py), category counts
+(Task 6 encoding) and per-column moments and quantile sketches (Task 9). A
+full dump is scanned once with `base`; every later `apply <delta_file>` only
+reads the delta. A changed profile is first retracted - its previous version
+is looked up in a SQLite table of the columns the aggregates use - and then
+added again, so the cost of an update and of regenerating the reports depends
+on the size of the delta, not on the 1.6M profiles.
+
+Each snapshot's state is kept under results/state/snapshots/<id>/, where the
+id hashes the parent snapshot and the input file. snapshots.json records the
+history and the head. Deltas always apply to the head, because the profile
+table follows the head; applying the delta that produced the head again is
+skipped.
+Retractions keep Task 9's min and max as bounds: a summary cannot narrow them.
+
+    python state_store.py base <profiles_file>
+    python state_store.py apply <delta_file>
+    python state_store.py report [snapshot]
+    python state_store.py list
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from groupby_engine import PROFILE_COLUMNS, SPECS, GroupTable, read_profiles
+from task6_categorical_encoding import EncodingMapper, EncodingReducer
+from task9_normalize_features import ColumnStats, collect_stats, write_stats
+
+STATE_DIR = 'results/state'
+USER_IDX = 0
+LOOKUP_BATCH = 500  # SQLite host parameters per query
+
+
+class GroupAggregate:
+    """A groupby_engine report spec; its histograms add and subtract"""
+    def __init__(self, spec_name):
+        self.spec = SPECS[spec_name]
+        self.table = GroupTable(self.spec)
+
+    def columns(self):
+        return self.spec.input_columns()
+
+    def add(self, frame, sign=1):
+        delta = GroupTable(self.spec)
+        delta.add_chunk(frame)
+        self.table.merge(delta, sign)
+
+    def to_dict(self):
+        return {dimension: {label: {str(b): int(hist[b]) for b in np.flatnonzero(hist)}
+                            for label, hist in table.items()}
+                for dimension, table in self.table.groups.items()}
+
+    def load(self, data):
+        for dimension, table in data.items():
+            for label, bins in table.items():
+                for bin_idx, count in bins.items():
+                    self.table.add(dimension, label, int(bin_idx), count)
+
+    def report(self, out):
+        self.table.report(out)
+
+
+class EncodingAggregate:
+    """Task 6 category counts"""
+    def __init__(self):
+        mapper = EncodingMapper()
+        self.features = {
+            'gender': (mapper.gender_idx, mapper.valid_genders),
+            'region': (mapper.region_idx, None),
+            'eye_color': (mapper.eye_color_idx, mapper.valid_eye_colors),
+        }
+        self.counts = {feature: {} for feature in self.features}
+
+    def columns(self):
+        return [idx for idx, _ in self.features.values()]
+
+    def add(self, frame, sign=1):
+        for feature, (idx, valid) in self.features.items():
+            values = frame[idx]
+            values = values[values.isin(valid)] if valid else values[values != '']
+            counts = self.counts[feature]
+            for value, n in values.value_counts().items():
+                counts[value] = counts.get(value, 0) + sign * int(n)
+                if counts[value] <= 0:
+                    del counts[value]
+
+    def to_dict(self):
+        return self.counts
+
+    def load(self, data):
+        self.counts.update(data)
+
+    def report(self, out):
+        # Same lines as EncodingReducer, which sees the features in sorted order
+        reducer = EncodingReducer()
+        out.write("Feature\tCategory\tCount\tPercentage\tEncoding\n")
+        with contextlib.redirect_stdout(out):
+            for feature in sorted(self.counts):
+                if self.counts[feature]:
+                    reducer.output_encoding(feature, self.counts[feature], sum(self.counts[feature].values()))
+
+
+class NormalizationAggregate:
+    """Task 9 moments and quartiles of every column; report() keeps the numeric ones.
+
+    Non-numeric columns are tracked too, since a later delta can make one numeric.
+    """
+    def __init__(self):
+        self.stats = {}
+
+    def columns(self):
+        return list(range(1, len(PROFILE_COLUMNS)))
+
+    def add(self, frame, sign=1):
+        columns = [c for c in self.columns() if c in frame.columns]
+        for name, delta in collect_stats([frame[columns]]).items():
+            if name not in self.stats:
+                if sign > 0:
+                    self.stats[name] = delta
+            elif sign > 0:
+                self.stats[name].merge(delta)
+            else:
+                self.stats[name].remove(delta)
+
+    def to_dict(self):
+        return {name: s.to_dict() for name, s in self.stats.items()}
+
+    def load(self, data):
+        self.stats = {name: ColumnStats.from_dict(s) for name, s in data.items()}
+
+    def report(self, out):
+        write_stats(self.stats, out)
+
+
+AGGREGATES = {
+    'demographics': lambda: GroupAggregate('demographics'),
+    'correlations': lambda: GroupAggregate('correlations'),
+    'encoding': EncodingAggregate,
+    'normalization': NormalizationAggregate,
+}
+# Same file names as the full jobs write
+REPORTS = {
+    'demographics': 'demographics_analysis.txt',
+    'correlations': 'correlation_analysis.txt',
+    'encoding': 'encoding_results.txt',
+    'normalization': 'normalization_stats.txt',
+}
+
+
+def file_sha256(path, block_size=1 << 24):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_id(parent, input_sha256):
+    return hashlib.sha256(f"{parent or ''}:{input_sha256}".encode('ascii')).hexdigest()[:16]
+
+
+class StateStore:
+    def __init__(self, state_dir=STATE_DIR):
+        self.state_dir = state_dir
+        self.manifest_path = os.path.join(state_dir, 'snapshots.json')
+        self.db_path = os.path.join(state_dir, 'profiles.sqlite')
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'head': None, 'columns': [], 'snapshots': {}}
+
+    def save_manifest(self):
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+    def snapshot_dir(self, snapshot):
+        return os.path.join(self.state_dir, 'snapshots', snapshot)
+
+    def load_aggregates(self, snapshot):
+        aggregates = {}
+        for name, make in AGGREGATES.items():
+            aggregates[name] = make()
+            with open(os.path.join(self.snapshot_dir(snapshot), f'{name}.json'), encoding='utf-8') as f:
+                aggregates[name].load(json.load(f))
+        return aggregates
+
+    def save_aggregates(self, snapshot, aggregates):
+        os.makedirs(self.snapshot_dir(snapshot), exist_ok=True)
+        for name, aggregate in aggregates.items():
+            with open(os.path.join(self.snapshot_dir(snapshot), f'{name}.json'), 'w', encoding='utf-8') as f:
+                json.dump(aggregate.to_dict(), f, ensure_ascii=False)
+
+    def write_reports(self, aggregates):
+        report_dir = os.path.join(self.state_dir, 'reports')
+        os.makedirs(report_dir, exist_ok=True)
+        for name, aggregate in aggregates.items():
+            with open(os.path.join(report_dir, REPORTS[name]), 'w', encoding='utf-8') as f:
+                aggregate.report(f)
+        return report_dir
+
+    def connect(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, fields TEXT)")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return db
+
+    def store_rows(self, db, frame, snapshot):
+        """Upsert the stored columns of frame and mark the table as being at snapshot"""
+        columns = self.manifest['columns']
+        db.executemany("INSERT OR REPLACE INTO profiles VALUES (?, ?)",
+                       zip(frame[USER_IDX], ('\t'.join(row) for row in zip(*(frame[c] for c in columns)))))
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('snapshot', ?)", (snapshot,))
+
+    def lookup(self, db, user_ids):
+        """Previous versions of the given users as a frame of the stored columns"""
+        columns = self.manifest['columns']
+        rows = []
+        for i in range(0, len(user_ids), LOOKUP_BATCH):
+            batch = user_ids[i:i + LOOKUP_BATCH]
+            rows.extend(db.execute(f"SELECT user_id, fields FROM profiles WHERE user_id IN "
+                                   f"({','.join('?' * len(batch))})", batch))
+        old = pd.DataFrame([fields.split('\t') for _, fields in rows], columns=columns, dtype=str)
+        old.insert(0, USER_IDX, [user_id for user_id, _ in rows])
+        return old
+
+    def record(self, snapshot, parent, input_file, input_sha256, rows, changed, seconds):
+        self.manifest['snapshots'][snapshot] = {
+            'parent': parent, 'input': os.path.abspath(input_file), 'input_sha256': input_sha256,
+            'rows': rows, 'changed': changed, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seconds': round(seconds, 3)}
+        self.manifest['head'] = snapshot
+        self.save_manifest()
+
+    def base(self, profiles_file):
+        """Full scan of a profile dump; replaces the profile table"""
+        start = time.perf_counter()
+        digest = file_sha256(profiles_file)
+        snapshot = snapshot_id(None, digest)
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        aggregates = {name: make() for name, make in AGGREGATES.items()}
+        rows = 0
+        for frame in read_profiles(profiles_file, range(len(PROFILE_COLUMNS))):
+            rows += len(frame)
+            for aggregate in aggregates.values():
+                aggregate.add(frame)
+
+        # Only the columns some aggregate reads are kept per user
+        self.manifest['columns'] = sorted({c for a in aggregates.values() for c in a.columns()} - {USER_IDX})
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db = self.connect()
+        with db:
+            for frame in read_profiles(profiles_file, [USER_IDX] + self.manifest['columns']):
+                self.store_rows(db, frame, snapshot)
+        db.close()
+
+        self.save_aggregates(snapshot, aggregates)
+        self.record(snapshot, None, profiles_file, digest, rows, 0, time.perf_counter() - start)
+        return snapshot, aggregates
+
+    def apply(self, delta_file):
+        """Merge a file of new or changed profiles into the head snapshot"""
+        start = time.perf_counter()
+        head = self.manifest['head']
+        if head is None:
+            raise ValueError("no base snapshot; run `base <profiles_file>` first")
+        digest = file_sha256(delta_file)
+        if self.manifest['snapshots'][head]['input_sha256'] == digest:
+            return head, None  # this delta is what produced the head
+
+        db = self.connect()
+        stored = db.execute("SELECT value FROM meta WHERE key = 'snapshot'").fetchone()
+        if not stored or stored[0] != head:
+            raise ValueError(f"profile table is not at head {head}; rebuild it with `base`")
+
+        snapshot = snapshot_id(head, digest)
+        aggregates = self.load_aggregates(head)
+        frames = list(read_profiles(delta_file, [USER_IDX] + self.manifest['columns']))
+        new = pd.concat(frames) if frames else pd.DataFrame(columns=[USER_IDX] + self.manifest['columns'])
+        new = new.drop_duplicates(USER_IDX, keep='last')  # the last version of a user wins
+        old = self.lookup(db, new[USER_IDX].tolist())
+        for aggregate in aggregates.values():
+            if len(old):
+                aggregate.add(old, sign=-1)
+            aggregate.add(new)
+
+        self.save_aggregates(snapshot, aggregates)
+        with db:
+            self.store_rows(db, new, snapshot)
+        db.close()
+        self.record(snapshot, head, delta_file, digest, len(new), len(old), time.perf_counter() - start)
+        return snapshot, aggregates
+
+
+def list_snapshots(store, out=sys.stdout):
+    out.write("Snapshot\tParent\tRows\tChanged\tSeconds\tCreated\tInput\n")
+    for snapshot, info in store.manifest['snapshots'].items():
+        marker = ' (head)' if snapshot == store.manifest['head'] else ''
+        out.write(f"{snapshot}{marker}\t{info['parent'] or '-'}\t{info['rows']}\t{info['changed']}\t"
+                  f"{info['seconds']}\t{info['created']}\t{info['input']}\n")
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python state_store.py base <profiles_file>\n"
+             "       python state_store.py apply <delta_file>\n"
+             "       python state_store.py report [snapshot]\n"
+             "       python state_store.py list")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    store = StateStore()
+    try:
+        if sys.argv[1] in ("base", "apply") and len(sys.argv) == 3:
+            start = time.perf_counter()
+            snapshot, aggregates = getattr(store, sys.argv[1])(sys.argv[2])
+            if aggregates is None:
+                print(f"{sys.argv[2]} was already applied (snapshot {snapshot})")
+            else:
+                report_dir = store.write_reports(aggregates)
+                info = store.manifest['snapshots'][snapshot]
+                print(f"Snapshot {snapshot}: {info['rows']} rows ({info['changed']} changed), "
+                      f"reports in {report_dir}/ ({time.perf_counter() - start:.2f}s)")
+        elif sys.argv[1] == "report" and len(sys.argv) <= 3:
+            snapshot = sys.argv[2] if len(sys.argv) == 3 else store.manifest['head']
+            if snapshot not in store.manifest['snapshots']:
+                raise ValueError(f"unknown snapshot {snapshot}")
+            report_dir = store.write_reports(store.load_aggregates(snapshot))
+            print(f"Reports for snapshot {snapshot} written to {report_dir}/")
+        elif sys.argv[1] == "list" and len(sys.argv) == 2:
+            list_snapshots(store)
+        else:
+            print(usage)
+            sys.exit(1)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Single-pass, constant-memory evaluation of trained models on prepared data.
+
+Mappers score DataPrepMapper/DataPrepReducer lines batch by batch and keep,
+per model, only a confusion matrix at the 0.5 threshold (same as predict())
+and a histogram of predicted probabilities per true class (BINS equal-width
+bins). Everything merges by addition:
+    C \t model \t tn \t fp \t fn \t tp
+    H \t model \t label \t bin \t count
+ROC and precision-recall curves are evaluated at the bin edges. AUC uses the
+trapezoid rule across bins, whose error is bounded by half the share of
+positive/negative pairs that fall in the same bin (AUC_Error_Bound).
+
+    -mapper "python streaming_evaluation.py mapper rf,gb [test]"
+    -combiner "python streaming_evaluation.py combiner"
+    -reducer "python streaming_evaluation.py reducer"
+    python streaming_evaluation.py report <reducer_output>
+    python streaming_evaluation.py local <prepared_file> <rf,gb> [test|validation|train|all]
+"""
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from model_registry import load_model
+from prepared_data import FEATURE_COLS, read_text_chunks
+
+BINS = 1000
+THRESHOLD = 0.5
+BATCH_SIZE = 50000
+COUNTS_FILE = 'results/models/evaluation_counts.txt'
+
+
+class EvaluationCounts:
+    """Mergeable confusion matrix and per-class score histogram for one model"""
+    def __init__(self, bins=BINS):
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # [actual, predicted]
+        self.histogram = np.zeros((2, bins), dtype=np.int64)  # [actual, score bin]
+
+    def add(self, y_true, probabilities):
+        y_true = np.asarray(y_true, dtype=np.int64)
+        predicted = (probabilities > THRESHOLD).astype(np.int64)  # same tie-break as predict()
+        self.confusion += np.bincount(y_true * 2 + predicted, minlength=4).reshape(2, 2)
+        n = self.histogram.shape[1]
+        bins = np.minimum((probabilities * n).astype(np.int64), n - 1)
+        self.histogram += np.bincount(y_true * n + bins, minlength=2 * n).reshape(2, n)
+
+    def merge(self, other):
+        self.confusion += other.confusion
+        self.histogram += other.histogram
+
+    def emit(self, model, out=sys.stdout):
+        tn, fp, fn, tp = self.confusion.ravel()
+        out.write(f"C\t{model}\t{tn}\t{fp}\t{fn}\t{tp}\n")
+        for label in (0, 1):
+            for b in np.flatnonzero(self.histogram[label]):
+                out.write(f"H\t{model}\t{label}\t{b}\t{self.histogram[label, b]}\n")
+
+    def curves(self):
+        """ROC (fpr, tpr) and PR (recall, precision) at every bin edge, high thresholds first"""
+        negatives, positives = self.histogram[0][::-1], self.histogram[1][::-1]
+        tp = np.concatenate([[0], np.cumsum(positives)])
+        fp = np.concatenate([[0], np.cumsum(negatives)])
+        tpr = tp / max(tp[-1], 1)
+        fpr = fp / max(fp[-1], 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 1.0)
+        return fpr, tpr, tpr, precision
+
+    def auc(self):
+        """(AUC, maximum absolute error from ties within bins)"""
+        fpr, tpr, _, _ = self.curves()
+        auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+        pairs = self.histogram[0].sum() * self.histogram[1].sum()
+        error = float((self.histogram[0] * self.histogram[1]).sum() / 2 / pairs) if pairs else 0.0
+        return auc, error
+
+    def metrics(self):
+        tn, fp, fn, tp = self.confusion.ravel()
+        total = tn + fp + fn + tp
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        auc, error = self.auc()
+        return {
+            'Rows': int(total),
+            'Accuracy': (tp + tn) / total if total else 0.0,
+            'Precision': precision,
+            'Recall': recall,
+            'F1 Score': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            'AUC': auc,
+            'AUC error bound': error,
+        }
+
+
+def read_counts(lines, bins=BINS):
+    """Sum C/H lines into {model: EvaluationCounts}"""
+    counts = defaultdict(lambda: EvaluationCounts(bins))
+    for line in lines:
+        try:
+            parts = line.rstrip('\n').split('\t')
+            if parts[0] == 'C':
+                counts[parts[1]].confusion += np.array([int(v) for v in parts[2:6]]).reshape(2, 2)
+            elif parts[0] == 'H':
+                counts[parts[1]].histogram[int(parts[2]), int(parts[3])] += int(parts[4])
+        except Exception:
+            continue
+    return dict(counts)
+
+
+class EvaluationMapper:
+    def __init__(self, models, dataset='test'):
+        # Registry names (or model files shipped with -files)
+        self.models = {name: load_model(name) for name in models}
+        self.dataset = dataset
+        self.counts = {name: EvaluationCounts() for name in models}
+
+    def add_source(self, source):
+        for chunk in read_text_chunks(source, BATCH_SIZE):
+            if self.dataset != 'all':
+                chunk = chunk[chunk['dataset'] == self.dataset]
+            if not len(chunk):
+                continue
+            X = chunk[FEATURE_COLS].to_numpy(np.float64)
+            y = chunk['target'].to_numpy()
+            for name, model in self.models.items():
+                self.counts[name].add(y, model.predict_proba(X)[:, 1])
+
+    def map(self):
+        self.add_source(sys.stdin)
+        for name, counts in self.counts.items():
+            counts.emit(name)
+
+
+class EvaluationReducer:
+    def reduce(self):
+        """Merge partial counts; also the combiner"""
+        for name, counts in sorted(read_counts(sys.stdin).items()):
+            counts.emit(name)
+
+
+def report(counts, out=sys.stdout):
+    out.write("Model\tRows\tAccuracy\tPrecision\tRecall\tF1 Score\tAUC\tAUC_Error_Bound\n")
+    for name, model_counts in sorted(counts.items()):
+        m = model_counts.metrics()
+        out.write(f"{name}\t{m['Rows']}\t{m['Accuracy']:.4f}\t{m['Precision']:.4f}\t{m['Recall']:.4f}\t"
+                  f"{m['F1 Score']:.4f}\t{m['AUC']:.4f}\t{m['AUC error bound']:.4f}\n")
+    out.write("\nConfusion matrices (rows actual 0/1, columns predicted 0/1):\n")
+    for name, model_counts in sorted(counts.items()):
+        (tn, fp), (fn, tp) = model_counts.confusion
+        out.write(f"{name}\t{tn}\t{fp}\n{name}\t{fn}\t{tp}\n")
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python streaming_evaluation.py mapper <model,model,...> [test|validation|train|all]\n"
+             "       python streaming_evaluation.py [combiner|reducer]\n"
+             "       python streaming_evaluation.py report <reducer_output>\n"
+             "       python streaming_evaluation.py local <prepared_file> <model,model,...> [dataset]")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == "mapper" and len(sys.argv) in (3, 4):
+        EvaluationMapper(sys.argv[2].split(','), sys.argv[3] if len(sys.argv) == 4 else 'test').map()
+    elif sys.argv[1] in ("combiner", "reducer"):
+        EvaluationReducer().reduce()
+    elif sys.argv[1] == "report" and len(sys.argv) == 3:
+        with open(sys.argv[2]) as f:
+            report(read_counts(f))
+    elif sys.argv[1] == "local" and len(sys.argv) in (4, 5):
+        mapper = EvaluationMapper(sys.argv[3].split(','), sys.argv[4] if len(sys.argv) == 5 else 'test')
+        mapper.add_source(sys.argv[2])
+        with open(COUNTS_FILE, 'w') as f:
+            for name, counts in mapper.counts.items():
+                counts.emit(name, f)
+        report(mapper.counts)
+        print(f"\nCounts written to {COUNTS_FILE}")
+    else:
+        print(usage)
+        sys.exit(1)
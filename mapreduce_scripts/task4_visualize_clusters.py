@@ -4,17 +4,24 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
-def create_visualizations(cluster_file):
+from figure_spec import FigureSpec
+
+CLUSTER_FILE = 'results/task4/cluster_results.txt'
+
+def load_clusters(cluster_file):
     # Create task4 directory if it doesn't exist
     os.makedirs('results/task4', exist_ok=True)
     
-    # Read the cluster results
-    df = pd.read_csv(cluster_file, sep='\t')
-    
     # Set style
     sns.set_style("whitegrid")
     
-    # 1. Bar plot of average completion rates by cluster
+    # Read the cluster results
+    return pd.read_csv(cluster_file, sep='\t')
+
+def plot_completion_rates(cluster_file):
+    df = load_clusters(cluster_file)
+    
+    # Bar plot of average completion rates by cluster
     plt.figure(figsize=(12, 6))
     plt.bar(df['Cluster'], df['Avg_Completion'])
     plt.title('Average Completion Rate by Age Cluster')
@@ -22,8 +29,11 @@ def create_visualizations(cluster_file):
     plt.ylabel('Average Completion Rate (%)')
     plt.savefig('results/task4/cluster_completion_rates.png')
     plt.close()
+
+def plot_bubble(cluster_file):
+    df = load_clusters(cluster_file)
     
-    # 2. Bubble plot showing cluster size and completion rates
+    # Bubble plot showing cluster size and completion rates
     plt.figure(figsize=(12, 6))
     plt.scatter(df['Cluster'], df['Avg_Completion'], s=df['Size']/100, alpha=0.6)
     plt.title('Age Clusters: Size vs Completion Rate')
@@ -35,5 +45,18 @@ def create_visualizations(cluster_file):
     plt.savefig('results/task4/cluster_bubble_plot.png')
     plt.close()
 
+def create_visualizations(cluster_file):
+    plot_completion_rates(cluster_file)
+    plot_bubble(cluster_file)
+
+def figures(cluster_file=CLUSTER_FILE):
+    """Figures for render_plots.py"""
+    return [
+        FigureSpec('task4/cluster_completion_rates', 'task4_visualize_clusters', 'plot_completion_rates',
+                   [cluster_file], [cluster_file], ['results/task4/cluster_completion_rates.png']),
+        FigureSpec('task4/cluster_bubble_plot', 'task4_visualize_clusters', 'plot_bubble',
+                   [cluster_file], [cluster_file], ['results/task4/cluster_bubble_plot.png']),
+    ]
+
 if __name__ == "__main__":
-    create_visualizations('results/task4/cluster_results.txt') 
\ No newline at end of file
+    create_visualizations(CLUSTER_FILE) 
\ No newline at end of file
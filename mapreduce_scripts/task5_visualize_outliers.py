@@ -4,17 +4,24 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
-def create_visualizations(outlier_file):
+from figure_spec import FigureSpec
+
+OUTLIER_FILE = 'results/task5/outlier_results.txt'
+
+def load_outliers(outlier_file):
     # Create task5 directory if it doesn't exist
     os.makedirs('results/task5', exist_ok=True)
     
-    # Read the outlier analysis results
-    df = pd.read_csv(outlier_file, sep='\t')
-    
     # Set style
     sns.set_style("whitegrid")
     
-    # 1. Box plot showing outlier boundaries for each feature
+    # Read the outlier analysis results
+    return pd.read_csv(outlier_file, sep='\t')
+
+def plot_boundaries(outlier_file):
+    df = load_outliers(outlier_file)
+    
+    # Box plot showing outlier boundaries for each feature
     plt.figure(figsize=(12, 6))
     feature_data = []
     labels = []
@@ -28,13 +35,18 @@ def create_visualizations(outlier_file):
         feature_data.append([lower, q1, q3, upper])
         labels.append(feature)
     
-    plt.boxplot(feature_data, labels=labels, whis=1.5)
+    # Tick labels are set separately: boxplot's labels= keyword was renamed in newer matplotlib
+    plt.boxplot(feature_data, whis=1.5)
+    plt.xticks(range(1, len(labels) + 1), labels)
     plt.title('Feature Distributions with Outlier Boundaries')
     plt.ylabel('Value')
     plt.savefig('results/task5/feature_outliers_boxplot.png')
     plt.close()
+
+def plot_percentages(outlier_file):
+    df = load_outliers(outlier_file)
     
-    # 2. Bar plot of outlier percentages
+    # Bar plot of outlier percentages
     plt.figure(figsize=(12, 6))
     plt.bar(df['Feature'], df['Outlier_Percentage'])
     plt.title('Percentage of Outliers by Feature')
@@ -43,6 +55,9 @@ def create_visualizations(outlier_file):
     plt.tight_layout()
     plt.savefig('results/task5/outlier_percentages.png')
     plt.close()
+
+def write_summary(outlier_file):
+    df = load_outliers(outlier_file)
     
     # Save summary report
     with open('results/task5/outlier_analysis_summary.txt', 'w') as f:
@@ -56,5 +71,21 @@ def create_visualizations(outlier_file):
             f.write(f"- Outliers: {row['Outliers_Count']} out of {row['Total_Count']} ({row['Outlier_Percentage']:.2f}%)\n")
             f.write("\n")
 
+def create_visualizations(outlier_file):
+    plot_boundaries(outlier_file)
+    plot_percentages(outlier_file)
+    write_summary(outlier_file)
+
+def figures(outlier_file=OUTLIER_FILE):
+    """Figures (and the summary report) for render_plots.py"""
+    return [
+        FigureSpec('task5/feature_outliers_boxplot', 'task5_visualize_outliers', 'plot_boundaries',
+                   [outlier_file], [outlier_file], ['results/task5/feature_outliers_boxplot.png']),
+        FigureSpec('task5/outlier_percentages', 'task5_visualize_outliers', 'plot_percentages',
+                   [outlier_file], [outlier_file], ['results/task5/outlier_percentages.png']),
+        FigureSpec('task5/outlier_analysis_summary', 'task5_visualize_outliers', 'write_summary',
+                   [outlier_file], [outlier_file], ['results/task5/outlier_analysis_summary.txt']),
+    ]
+
 if __name__ == "__main__":
-    create_visualizations('results/task5/outlier_results.txt') 
\ No newline at end of file
+    create_visualizations(OUTLIER_FILE)
\ No newline at end of file
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
+import json
+import os
 import sys
+from array import array
 from collections import defaultdict
 
+import numpy as np
+
+from category_dictionary import Encoder
+from task7_multilabel_processing import MultilabelMapper
+
 class EncodingMapper:
-    def __init__(self):
+    def __init__(self, dictionary_path=None):
         # Define indices for categorical columns
         self.gender_idx = 3
         self.region_idx = 4
@@ -12,6 +20,9 @@ class EncodingMapper:
         # Define valid categories for each feature
         self.valid_genders = {'0', '1'}  # 0: male, 1: female
         self.valid_eye_colors = {'0', '1', '2', '3'}  # Different eye colors
+
+        # Emit dictionary ids instead of raw values when a dictionary is shipped
+        self.encoder = Encoder(dictionary_path)
         
     def map(self):
         for line in sys.stdin:
@@ -27,20 +38,23 @@ class EncodingMapper:
                 
                 # Emit for gender encoding
                 if gender in self.valid_genders:
-                    print(f"gender\t{gender}")
+                    print(f"gender\t{self.encoder.encode('gender', gender)}")
                 
                 # Emit for region encoding
                 if region:
-                    print(f"region\t{region}")
+                    print(f"region\t{self.encoder.encode('region', region)}")
                 
                 # Emit for eye color encoding
                 if eye_color in self.valid_eye_colors:
-                    print(f"eye_color\t{eye_color}")
+                    print(f"eye_color\t{self.encoder.encode('eye_color', eye_color)}")
                     
             except Exception as e:
                 continue
 
 class EncodingReducer:
+    def __init__(self, dictionary_path=None):
+        self.encoder = Encoder(dictionary_path)
+
     def reduce(self):
         current_feature = None
         value_counts = defaultdict(int)
@@ -73,29 +87,136 @@ class EncodingReducer:
         # Sort categories by count
         sorted_categories = sorted(value_counts.items(), key=lambda x: x[1], reverse=True)
         
-        # Create one-hot encoding mapping
-        encoding = {cat: idx for idx, (cat, _) in enumerate(sorted_categories)}
-        
-        # Output statistics and encoding for each category
-        for category, count in sorted_categories:
+        # Output statistics and the sparse one-hot encoding (index of the
+        # single 1 in the category vector) for each category
+        for idx, (category, count) in enumerate(sorted_categories):
+            label = self.encoder.decode(feature, category)
             percentage = (count / total_count) * 100
-            encoded_value = [0] * len(sorted_categories)
-            encoded_value[encoding[category]] = 1
-            encoded_str = ','.join(map(str, encoded_value))
             
-            print(f"{feature}\t{category}\t{count}\t{percentage:.2f}\t{encoded_str}")
+            print(f"{feature}\t{label}\t{count}\t{percentage:.2f}\t{idx}")
+
+
+def load_encodings(encoding_file):
+    """Read the reducer output into {feature: {category: index}}"""
+    encodings = defaultdict(dict)
+    with open(encoding_file, encoding='utf-8') as f:
+        next(f)  # header
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) == 5:
+                feature, category = parts[0], parts[1]
+                # Categories are written in index order (also for old dense files)
+                encodings[feature][category] = len(encodings[feature])
+    return encodings
+
+
+class ProfileEncodingMapper:
+    """Second stage: encode every profile as the column indices of its 1s"""
+    def __init__(self, encoding_file):
+        self.user_idx = 0
+        self.hobbies_idx = 11
+        self.feature_idx = {'gender': 3, 'region': 4, 'eye_color': 9}
+        self.hobby_categorizer = MultilabelMapper().hobby_categorizer
+
+        # Column layout: gender, region, eye_color one-hot blocks, then hobby labels
+        encodings = load_encodings(encoding_file)
+        self.columns = []
+        self.column_idx = {}
+        for feature in self.feature_idx:
+            for category in encodings.get(feature, {}):
+                self.column_idx[(feature, category)] = len(self.columns)
+                self.columns.append(f"{feature}={category}")
+        for category in self.hobby_categorizer.categories:
+            self.column_idx[('hobby', category)] = len(self.columns)
+            self.columns.append(f"hobby={category}")
+
+    def encode(self, fields):
+        cols = []
+        for feature, idx in self.feature_idx.items():
+            col = self.column_idx.get((feature, fields[idx]))
+            if col is not None:
+                cols.append(col)
+
+        hobbies = fields[self.hobbies_idx]
+        if hobbies and hobbies != "null":
+            for category in sorted(self.hobby_categorizer.categorize(hobbies)):
+                cols.append(self.column_idx[('hobby', category)])
+        return cols
+
+    def map(self):
+        for line in sys.stdin:
+            try:
+                fields = line.strip().split('\t')
+                if len(fields) <= self.hobbies_idx:
+                    continue
+                cols = self.encode(fields)
+                print(f"{fields[self.user_idx]}\t{' '.join(map(str, cols))}")
+            except Exception:
+                continue
+
+
+def save_feature_matrix(rows, columns, output_dir):
+    """Pack "user_id \t col col ..." rows into CSR arrays saved as .npy files"""
+    os.makedirs(output_dir, exist_ok=True)
+    user_ids = array('q')
+    indices = array('i')
+    indptr = array('q', [0])
+    for line in rows:
+        try:
+            user_id, cols = line.rstrip('\n').split('\t')
+            user_ids.append(int(user_id))
+            indices.extend(sorted(int(col) for col in cols.split()))
+            indptr.append(len(indices))
+        except Exception:
+            continue
+
+    # scipy wants indices and indptr in the same int32/int64 dtype; matching them
+    # here lets load_feature_matrix wrap the memory maps without copying
+    index_dtype = np.int32 if len(indices) < 2 ** 31 else np.int64
+    np.save(os.path.join(output_dir, 'user_ids.npy'), np.frombuffer(user_ids, dtype=np.int64))
+    np.save(os.path.join(output_dir, 'indices.npy'), np.frombuffer(indices, dtype=np.int32).astype(index_dtype))
+    np.save(os.path.join(output_dir, 'indptr.npy'), np.frombuffer(indptr, dtype=np.int64).astype(index_dtype))
+    np.save(os.path.join(output_dir, 'data.npy'), np.ones(len(indices), dtype=np.uint8))
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'shape': [len(user_ids), len(columns)], 'nnz': len(indices),
+                   'columns': columns}, f, ensure_ascii=False, indent=1)
+
+
+def load_feature_matrix(matrix_dir, mmap=True):
+    """Return (user_ids, scipy CSR matrix, column names); arrays are memory-mapped"""
+    from scipy.sparse import csr_matrix
+
+    mode = 'r' if mmap else None
+    with open(os.path.join(matrix_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    user_ids = np.load(os.path.join(matrix_dir, 'user_ids.npy'), mmap_mode=mode)
+    indices = np.load(os.path.join(matrix_dir, 'indices.npy'), mmap_mode=mode)
+    indptr = np.load(os.path.join(matrix_dir, 'indptr.npy'), mmap_mode=mode)
+    data = np.load(os.path.join(matrix_dir, 'data.npy'), mmap_mode=mode)
+    matrix = csr_matrix((data, indices, indptr), shape=tuple(manifest['shape']), copy=False)
+    return user_ids, matrix, manifest['columns']
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    if len(sys.argv) < 2:
+        print("Usage: python script.py [mapper|reducer] [category_dictionary.json]")
+        print("       python script.py encode_mapper <encoding_results>")
+        print("       python script.py pack <encoding_results> <encoded_rows> <output_dir>")
         sys.exit(1)
+    dictionary_path = sys.argv[2] if len(sys.argv) == 3 else None
         
-    if sys.argv[1] == "mapper":
-        mapper = EncodingMapper()
+    if sys.argv[1] == "encode_mapper" and len(sys.argv) == 3:
+        mapper = ProfileEncodingMapper(sys.argv[2])
+        mapper.map()
+    elif sys.argv[1] == "pack" and len(sys.argv) == 5:
+        columns = ProfileEncodingMapper(sys.argv[2]).columns
+        with open(sys.argv[3], encoding='utf-8') as rows:
+            save_feature_matrix(rows, columns, sys.argv[4])
+    elif sys.argv[1] == "mapper":
+        mapper = EncodingMapper(dictionary_path)
         mapper.map()
     elif sys.argv[1] == "reducer":
-        reducer = EncodingReducer()
+        reducer = EncodingReducer(dictionary_path)
         reducer.reduce()
     else:
-        print("Invalid argument. Use 'mapper' or 'reducer'")
+        print("Invalid argument. Use 'mapper', 'reducer', 'encode_mapper' or 'pack'")
         sys.exit(1) 
\ No newline at end of file
@@ -4,53 +4,65 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
-def create_visualizations(encoding_file):
+from figure_spec import FigureSpec
+
+ENCODING_FILE = 'results/task6/encoding_results.txt'
+
+def one_hot_index(encoding):
+    # Older results store the dense vector ("0,1,0"), newer ones just the index
+    encoding = str(encoding)
+    if ',' in encoding:
+        return encoding.split(',').index('1')
+    return int(encoding)
+
+def load_encodings(encoding_file):
     # Create task6 directory if it doesn't exist
     os.makedirs('results/task6', exist_ok=True)
     
-    # Read the encoding results
-    df = pd.read_csv(encoding_file, sep='\t')
-    
     # Set style
     sns.set_theme(style="whitegrid")
     
-    # Group data by feature
-    features = df['Feature'].unique()
+    # Read the encoding results
+    return pd.read_csv(encoding_file, sep='\t')
+
+def plot_distribution(encoding_file, feature):
+    df = load_encodings(encoding_file)
     
-    # Create a figure for distribution plots
-    for feature in features:
-        plt.figure(figsize=(12, 6))
-        feature_data = df[df['Feature'] == feature]
-        
-        # Convert categories to strings to ensure proper categorical plotting
-        categories = feature_data['Category'].astype(str)
-        percentages = feature_data['Percentage']
-        
-        # Create bar plot
-        ax = sns.barplot(x=categories, y=percentages)
-        
-        plt.title(f'Distribution of {feature} Categories', pad=20)
-        plt.xlabel('Category', labelpad=10)
-        plt.ylabel('Percentage (%)', labelpad=10)
-        
-        # Rotate x-axis labels if there are many categories
-        if len(categories) > 5:
-            plt.xticks(rotation=45, ha='right')
-        
-        # Add percentage labels on top of bars
-        for i, p in enumerate(percentages):
-            ax.text(i, p, f'{p:.1f}%', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        plt.savefig(f'results/task6/{feature}_distribution.png')
-        plt.close()
+    plt.figure(figsize=(12, 6))
+    feature_data = df[df['Feature'] == feature]
+    
+    # Convert categories to strings to ensure proper categorical plotting
+    categories = feature_data['Category'].astype(str)
+    percentages = feature_data['Percentage']
+    
+    # Create bar plot
+    ax = sns.barplot(x=categories, y=percentages)
+    
+    plt.title(f'Distribution of {feature} Categories', pad=20)
+    plt.xlabel('Category', labelpad=10)
+    plt.ylabel('Percentage (%)', labelpad=10)
+    
+    # Rotate x-axis labels if there are many categories
+    if len(categories) > 5:
+        plt.xticks(rotation=45, ha='right')
+    
+    # Add percentage labels on top of bars
+    for i, p in enumerate(percentages):
+        ax.text(i, p, f'{p:.1f}%', ha='center', va='bottom')
+    
+    plt.tight_layout()
+    plt.savefig(f'results/task6/{feature}_distribution.png')
+    plt.close()
+
+def write_reference(encoding_file):
+    df = load_encodings(encoding_file)
     
     # Save encoding reference
     with open('results/task6/encoding_reference.txt', 'w') as f:
         f.write("Categorical Variables Encoding Reference\n")
         f.write("=" * 80 + "\n\n")
         
-        for feature in features:
+        for feature in df['Feature'].unique():
             f.write(f"{feature.upper()} ENCODING:\n")
             f.write("-" * 40 + "\n")
             
@@ -59,9 +71,26 @@ def create_visualizations(encoding_file):
                 f.write(f"Category: {row['Category']}\n")
                 f.write(f"- Count: {row['Count']}\n")
                 f.write(f"- Percentage: {row['Percentage']:.2f}%\n")
-                f.write(f"- One-hot encoding: [{row['Encoding']}]\n")
+                f.write(f"- One-hot index: {one_hot_index(row['Encoding'])} of {len(feature_data)}\n")
                 f.write("\n")
             f.write("\n")
 
+def create_visualizations(encoding_file):
+    # One distribution plot per feature
+    for feature in load_encodings(encoding_file)['Feature'].unique():
+        plot_distribution(encoding_file, feature)
+    write_reference(encoding_file)
+
+def figures(encoding_file=ENCODING_FILE):
+    """Figures (and the encoding reference) for render_plots.py; one plot per feature in the results"""
+    if not os.path.exists(encoding_file):
+        return []
+    specs = [FigureSpec(f'task6/{feature}_distribution', 'task6_visualize_encoding', 'plot_distribution',
+                        [encoding_file, feature], [encoding_file], [f'results/task6/{feature}_distribution.png'])
+             for feature in pd.read_csv(encoding_file, sep='\t')['Feature'].unique()]
+    specs.append(FigureSpec('task6/encoding_reference', 'task6_visualize_encoding', 'write_reference',
+                            [encoding_file], [encoding_file], ['results/task6/encoding_reference.txt']))
+    return specs
+
 if __name__ == "__main__":
-    create_visualizations('results/task6/encoding_results.txt') 
\ No newline at end of file
+    create_visualizations(ENCODING_FILE)
\ No newline at end of file
@@ -1,65 +1,81 @@
 import sys
+import json
 from collections import defaultdict
-import re
+from itertools import combinations
+
+from text_utils import KeywordCategorizer
+
+# Keyword lists per category (matched case- and diacritic-insensitively).
+# A JSON file with the same {"hobby": {...}, "sport": {...}} shape can be
+# passed to the mapper to add categories or replace their keyword lists.
+DEFAULT_CATEGORIES = {
+    # Common hobby categories in Slovak
+    'hobby': {
+        'music': ['hudba', 'spev', 'tanec', 'koncert'],
+        'sports': ['sport', 'cvicenie', 'pohyb'],
+        'travel': ['cestovanie', 'turistika'],
+        'photography': ['foto', 'fotografovanie'],
+        'reading': ['citanie', 'knihy'],
+        'cooking': ['varenie', 'pecenie'],
+        'gardening': ['zahrada', 'pestovanie'],
+        'shopping': ['nakupovanie', 'moda'],
+        'art': ['malovanie', 'kreslenie'],
+        'social': ['priatelia', 'party', 'zabava']
+    },
+    # Sports categories
+    'sport': {
+        'ball_sports': ['futbal', 'volejbal', 'basketbal', 'tenis'],
+        'winter_sports': ['lyzovanie', 'hokej', 'korculovanie'],
+        'fitness': ['posilnovanie', 'fitnes', 'aerobik', 'behanie'],
+        'cycling': ['bicykel', 'cyklistika'],
+        'swimming': ['plavanie']
+    }
+}
+
+
+def load_categories(categories_file=None):
+    categories = {label_type: dict(cats) for label_type, cats in DEFAULT_CATEGORIES.items()}
+    if categories_file:
+        with open(categories_file, encoding='utf-8') as f:
+            for label_type, cats in json.load(f).items():
+                categories.setdefault(label_type, {}).update(cats)
+    return categories
+
 
 class MultilabelMapper:
-    def __init__(self):
+    def __init__(self, categories_file=None):
         self.hobbies_idx = 11
         self.sports_idx = 39
         
-        # Common hobby categories in Slovak
-        self.hobby_categories = {
-            'music': re.compile(r'(hudba|spev|tanec|koncert)'),
-            'sports': re.compile(r'(sport|cvicenie|pohyb)'),
-            'travel': re.compile(r'(cestovanie|turistika)'),
-            'photography': re.compile(r'(foto|fotografovanie)'),
-            'reading': re.compile(r'(citanie|knihy)'),
-            'cooking': re.compile(r'(varenie|pecenie)'),
-            'gardening': re.compile(r'(zahrada|pestovanie)'),
-            'shopping': re.compile(r'(nakupovanie|moda)'),
-            'art': re.compile(r'(malovanie|kreslenie)'),
-            'social': re.compile(r'(priatelia|party|zabava)')
-        }
+        # One keyword automaton per column, built once per mapper
+        categories = load_categories(categories_file)
+        self.hobby_categorizer = KeywordCategorizer(categories['hobby'])
+        self.sports_categorizer = KeywordCategorizer(categories['sport'])
 
-        # Sports categories
-        self.sports_categories = {
-            'ball_sports': re.compile(r'(futbal|volejbal|basketbal|tenis)'),
-            'winter_sports': re.compile(r'(lyzovanie|hokej|korculovanie)'),
-            'fitness': re.compile(r'(posilnovanie|fitnes|aerobik|behanie)'),
-            'cycling': re.compile(r'(bicykel|cyklistika)'),
-            'swimming': re.compile(r'(plavanie)')
-        }
+    def emit_labels(self, label_type, labels):
+        """Emit every matching label plus each co-occurring pair"""
+        labels = sorted(labels)
+        for label in labels:
+            print(f"{label_type}\t{label}")
+        for first, second in combinations(labels, 2):
+            print(f"{label_type}_pair\t{first}+{second}")
     
     def map(self):
-        sample_count = 0
         for line in sys.stdin:
             try:
                 fields = line.strip().split('\t')
                 if len(fields) <= max(self.hobbies_idx, self.sports_idx):
                     continue
                 
-                # Print first 1000 samples of all fields to understand the data better
-                if sample_count < 1000:
-                    for i, field in enumerate(fields):
-                        if field and field != "null":
-                            print(f"sample\t{i}\t{field}")
-                    sample_count += 1
-                
                 # Process hobbies
                 hobbies = fields[self.hobbies_idx]
                 if hobbies and hobbies != "null":
-                    for category, pattern in self.hobby_categories.items():
-                        if pattern.search(hobbies.lower()):
-                            print(f"hobby\t{category}")
-                            break
+                    self.emit_labels('hobby', self.hobby_categorizer.categorize(hobbies))
                 
                 # Process sports
                 sports = fields[self.sports_idx]
                 if sports and sports != "null":
-                    for category, pattern in self.sports_categories.items():
-                        if pattern.search(sports.lower()):
-                            print(f"sport\t{category}")
-                            break
+                    self.emit_labels('sport', self.sports_categorizer.categorize(sports))
                             
             except Exception:
                 continue
@@ -68,7 +84,6 @@ class MultilabelReducer:
     def reduce(self):
         current_type = None
         label_counts = defaultdict(int)
-        field_samples = defaultdict(list)  # To store samples for each field
         
         print("Type\tLabel\tCount\tPercentage")
         
@@ -77,14 +92,6 @@ class MultilabelReducer:
                 parts = line.strip().split('\t')
                 label_type = parts[0]
                 
-                if label_type == 'sample':
-                    # Store field samples: field_index -> value
-                    field_idx = int(parts[1])
-                    field_value = parts[2]
-                    if len(field_samples[field_idx]) < 10:  # Store first 10 samples per field
-                        field_samples[field_idx].append(field_value)
-                    continue
-                
                 label = parts[1]
                 if current_type and current_type != label_type:
                     self.output_frequencies(current_type, label_counts)
@@ -98,15 +105,6 @@ class MultilabelReducer:
                 
         if current_type:
             self.output_frequencies(current_type, label_counts)
-        
-        # Output field samples
-        print("\nField Samples:")
-        print("=" * 80)
-        for field_idx in sorted(field_samples.keys()):
-            print(f"\nField {field_idx}:")
-            print("-" * 40)
-            for sample in field_samples[field_idx]:
-                print(sample)
     
     def output_frequencies(self, label_type, counts):
         total = sum(counts.values())
@@ -122,12 +120,12 @@ class MultilabelReducer:
                 print(f"{label_type}\t{label}\t{count}\t{percentage:.2f}")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python script.py [mapper|reducer] [categories.json]")
         sys.exit(1)
         
     if sys.argv[1] == "mapper":
-        mapper = MultilabelMapper()
+        mapper = MultilabelMapper(sys.argv[2] if len(sys.argv) == 3 else None)
         mapper.map()
     elif sys.argv[1] == "reducer":
         reducer = MultilabelReducer()
@@ -2,10 +2,15 @@
 import sys
 from datetime import datetime
 
+from shard_writer import ShardWriter
+
+HEADER = "user_id\tdays_since_registration"
+
 class RegistrationMapper:
-    def __init__(self):
+    def __init__(self, writer=None):
         self.registration_idx = 6  # Registration date column
         self.last_login_idx = 5    # Last login column
+        self.writer = writer  # ShardWriter for map-only output
         
     def parse_date(self, date_str):
         try:
@@ -26,14 +31,20 @@ class RegistrationMapper:
                 
                 if last_login and registration:
                     days = (last_login - registration).days
-                    print(f"{user_id}\t{days}")
+                    if self.writer:
+                        self.writer.write('', f"{user_id}\t{days}")
+                    else:
+                        print(f"{user_id}\t{days}")
                     
             except Exception:
                 continue
+        
+        if self.writer:
+            self.writer.close()
 
 class RegistrationReducer:
     def reduce(self):
-        print("user_id\tdays_since_registration")
+        print(HEADER)
         
         for line in sys.stdin:
             try:
@@ -43,16 +54,27 @@ class RegistrationReducer:
                 continue
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py [mapper|reducer]")
+    usage = ("Usage: python task8_registration_days_mr.py [mapper|reducer|header]\n"
+             "       python task8_registration_days_mr.py shard <output_dir> [task_id]")
+    if len(sys.argv) < 2:
+        print(usage)
         sys.exit(1)
         
-    if sys.argv[1] == "mapper":
+    if sys.argv[1] == "mapper" and len(sys.argv) == 2:
+        # With -numReduceTasks 0 this is the map-only job on a cluster: headerless part-m-* in HDFS
         mapper = RegistrationMapper()
         mapper.map()
-    elif sys.argv[1] == "reducer":
+    elif sys.argv[1] == "shard" and len(sys.argv) in (3, 4):
+        # Map-only on a local or shared filesystem only: part-m-<task> shards plus a _header manifest
+        task_id = int(sys.argv[3]) if len(sys.argv) == 4 else None
+        mapper = RegistrationMapper(ShardWriter(sys.argv[2], HEADER, task_id))
+        mapper.map()
+    elif sys.argv[1] == "reducer" and len(sys.argv) == 2:
         reducer = RegistrationReducer()
         reducer.reduce()
+    elif sys.argv[1] == "header" and len(sys.argv) == 2:
+        # Stored once by the driver next to map-only output, e.g. as <output>/_header
+        print(HEADER)
     else:
-        print("Invalid argument. Use 'mapper' or 'reducer'")
-        sys.exit(1) 
\ No newline at end of file
+        print(usage)
+        sys.exit(1)
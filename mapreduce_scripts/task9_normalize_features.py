@@ -1,132 +1,311 @@
 #!/usr/bin/env python3
+"""Two-pass normalization of every numeric profile column.
+
+Pass one (stats_mapper / stats_combiner / stats_reducer) scans all columns
+once. Per column it keeps mergeable moments (count, mean, variance via Chan's
+parallel update, min, max) and a relative-error quantile sketch, and emits
+them as JSON. The reducer writes the stats side file, one line per numeric
+column:
+    column \t mean \t std \t min \t max \t count \t q1 \t median \t q3
+(the first five fields are the format of the original age_stats.txt).
+
+Pass two (normalize_mapper, map-only with -numReduceTasks 0, so Hadoop writes
+headerless part-m-* files to HDFS; `header` prints their header line) loads the
+side file - shipped with -files - and scales the requested columns in vectorized chunks:
+    z-score   (x - mean) / std
+    min-max   (x - min) / (max - min)
+    robust    (x - median) / (q3 - q1)
+Rows where every requested column is null are skipped; other nulls stay null.
+"""
+import json
+import os
 import sys
-from collections import defaultdict
-import math
 
-class StatsMapper:
+import numpy as np
+import pandas as pd
+
+from groupby_engine import PROFILE_COLUMNS, read_profiles
+from shard_writer import ShardWriter
+from sketches import Moments, QuantileSketch
+
+STATS_FILE = 'results/task9/normalization_stats.txt'
+METHODS = ['z_score', 'min_max', 'robust']
+NULL_VALUES = ['', 'null']
+NUMERIC_SHARE = 0.99  # share of non-null values that must parse as numbers
+CHUNK_SIZE = 100000
+
+
+class ColumnStats:
     def __init__(self):
-        self.age_idx = 7  # AGE column index
-        
-    def map(self):
-        """First pass mapper to collect statistics"""
-        for line in sys.stdin:
+        self.present = 0  # non-null values
+        self.moments = Moments()
+        self.quantiles = QuantileSketch()
+
+    def update(self, values):
+        """Update from one chunk of a column (pandas Series of strings)"""
+        present = values[~values.isin(NULL_VALUES)]
+        self.present += len(present)
+        numbers = pd.to_numeric(present, errors='coerce').dropna().to_numpy(np.float64)
+        self.moments.add_many(numbers)
+        self.quantiles.add_many(numbers)
+
+    def merge(self, other):
+        self.present += other.present
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+
+    def remove(self, other):
+        self.present -= other.present
+        self.moments.remove(other.moments)
+        self.quantiles.remove(other.quantiles)
+
+    def is_numeric(self):
+        return self.moments.count > 0 and self.moments.count >= NUMERIC_SHARE * self.present
+
+    def to_dict(self):
+        return {'present': self.present, 'moments': self.moments.to_dict(),
+                'quantiles': self.quantiles.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.present = data['present']
+        stats.moments = Moments.from_dict(data['moments'])
+        stats.quantiles = QuantileSketch.from_dict(data['quantiles'])
+        return stats
+
+
+def collect_stats(frames):
+    stats = {}
+    for frame in frames:
+        for column in frame.columns:
+            stats.setdefault(PROFILE_COLUMNS[column], ColumnStats()).update(frame[column])
+    return stats
+
+
+def write_stats(stats, out=sys.stdout):
+    """Final side-file lines for the numeric columns"""
+    for name, s in stats.items():
+        if s.is_numeric():
+            m = s.moments
+            std = np.sqrt(m.variance) if m.variance > 0 else 1
+            q1, median, q3 = (s.quantiles.quantile(q) for q in (0.25, 0.5, 0.75))
+            out.write(f"{name}\t{m.mean}\t{std}\t{m.min}\t{m.max}\t{m.count}\t{q1}\t{median}\t{q3}\n")
+
+
+def load_stats(path):
+    """{column: {'mean', 'std', 'min', 'max', ...}} from a stats side file.
+
+    Names are normalized to the PROFILE_COLUMNS spelling, so the legacy
+    age_stats.txt entry 'age' is loaded as AGE.
+    """
+    fields = ['mean', 'std', 'min', 'max', 'count', 'q1', 'median', 'q3']
+    stats = {}
+    with open(path) as f:
+        for line in f:
             try:
-                fields = line.strip().split('\t')
-                if len(fields) <= self.age_idx:
-                    continue
-                    
-                age = fields[self.age_idx]
-                if age and age != "null":
-                    try:
-                        age = float(age)
-                        # Output: key -> (value, value^2, count)
-                        print(f"age\t{age}\t{age*age}\t1")
-                    except ValueError:
-                        continue
-                        
+                name, *values = line.rstrip('\n').split('\t')
+                stats[column_name(name)] = dict(zip(fields, map(float, values)))
             except Exception:
                 continue
+    return stats
+
+
+def format_values(values, missing):
+    """Four-decimal strings, 'null' where the input was missing"""
+    text = [f"{v:.4f}" for v in values.tolist()]
+    for i in np.flatnonzero(missing).tolist():
+        text[i] = 'null'
+    return text
+
+
+def column_index(name):
+    """Profile column of a name, matched case-insensitively"""
+    matches = [i for i, column in enumerate(PROFILE_COLUMNS) if column.lower() == name.lower()]
+    if not matches:
+        raise ValueError(f"unknown profile column {name}")
+    return matches[0]
+
+
+def column_name(name):
+    return PROFILE_COLUMNS[column_index(name)]
+
+
+def output_header(columns, methods):
+    names = ['user_id']
+    for column in columns:
+        names += [column] + [f"{column}_{method}" for method in methods]
+    return '\t'.join(names)
+
+
+class StatsMapper:
+    def map(self):
+        """First pass mapper: partial stats of every column except user_id"""
+        stats = collect_stats(read_profiles(sys.stdin, range(1, len(PROFILE_COLUMNS)), CHUNK_SIZE))
+        for name, s in stats.items():
+            print(f"{name}\t{json.dumps(s.to_dict())}")
+
 
 class StatsReducer:
+    def __init__(self, final=True):
+        self.final = final  # False when used as the combiner
+
     def reduce(self):
-        """First pass reducer to calculate statistics"""
-        stats = defaultdict(lambda: {'sum': 0, 'sum_sq': 0, 'count': 0, 'min': float('inf'), 'max': float('-inf')})
-        
+        """First pass reducer: merge partial stats and write the side file"""
+        stats = {}
         for line in sys.stdin:
             try:
-                feature, value, value_sq, count = line.strip().split('\t')
-                value = float(value)
-                value_sq = float(value_sq)
-                count = int(count)
-                
-                stats[feature]['sum'] += value
-                stats[feature]['sum_sq'] += value_sq
-                stats[feature]['count'] += count
-                stats[feature]['min'] = min(stats[feature]['min'], value)
-                stats[feature]['max'] = max(stats[feature]['max'], value)
-                
+                name, data = line.rstrip('\n').split('\t', 1)
+                column_stats = ColumnStats.from_dict(json.loads(data))
             except Exception:
                 continue
-        
-        # Calculate and output statistics
-        for feature, s in stats.items():
-            if s['count'] > 0:
-                mean = s['sum'] / s['count']
-                variance = (s['sum_sq'] / s['count']) - (mean * mean)
-                std = math.sqrt(variance) if variance > 0 else 1
-                
-                # Output format: feature mean std min max
-                print(f"{feature}\t{mean}\t{std}\t{s['min']}\t{s['max']}")
+            if name in stats:
+                stats[name].merge(column_stats)
+            else:
+                stats[name] = column_stats
+
+        if self.final:
+            write_stats(stats)
+        else:
+            for name, s in stats.items():
+                print(f"{name}\t{json.dumps(s.to_dict())}")
+
 
 class NormalizeMapper:
-    def __init__(self):
-        self.age_idx = 7
-        # Hardcode the stats since we know them
-        self.stats = {
-            'age': {
-                'mean': 17.065383060564486,
-                'std': 13.882575413419932,
-                'min': 0.0,
-                'max': 112.0
-            }
-        }
-    
+    def __init__(self, writer=None):
+        self.stats = {}
+        self.columns = []
+        self.indices = []
+        self.methods = METHODS
+        self.writer = writer  # ShardWriter for map-only output
+
+    def configure(self, stats_file, columns=None, methods=None):
+        """Load the pass-one side file; columns default to every column in it.
+
+        Without quartiles (the five-field age_stats.txt) the default methods
+        drop robust scaling; asking for it explicitly is still an error.
+        """
+        self.stats = load_stats(stats_file)
+        self.columns = [column_name(c) for c in columns] if columns else list(self.stats)
+        missing = [c for c in self.columns if c not in self.stats]
+        if missing:
+            raise ValueError(f"no statistics for {', '.join(missing)} in {stats_file}")
+        quartiles = all('q3' in self.stats[c] for c in self.columns)
+        self.methods = methods or (METHODS if quartiles else [m for m in METHODS if m != 'robust'])
+        unknown = [m for m in self.methods if m not in METHODS]
+        if unknown:
+            raise ValueError(f"unknown scaling method {', '.join(unknown)}")
+        self.indices = [column_index(c) for c in self.columns]
+        if 'robust' in self.methods and not quartiles:
+            raise ValueError(f"{stats_file} has no quartiles; rerun the stats pass for robust scaling")
+
+    def scale(self, values, column, method):
+        s = self.stats[column]
+        if method == 'z_score':
+            return (values - s['mean']) / s['std']
+        if method == 'min_max':
+            return (values - s['min']) / ((s['max'] - s['min']) or 1)
+        return (values - s['median']) / ((s['q3'] - s['q1']) or 1)
+
+    def normalize(self, frame):
+        """Output lines for one chunk of profiles"""
+        fields = [frame[0].tolist()]
+        present = np.zeros(len(frame), dtype=bool)
+        for column, index in zip(self.columns, self.indices):
+            raw = frame[index]
+            values = pd.to_numeric(raw.where(~raw.isin(NULL_VALUES)), errors='coerce').to_numpy(np.float64)
+            missing = np.isnan(values)
+            present |= ~missing
+            fields.append(raw.where(~missing, 'null').tolist())
+            for method in self.methods:
+                fields.append(format_values(self.scale(values, column, method), missing))
+        rows = np.flatnonzero(present)
+        if len(rows) == len(frame):
+            return ''.join('\t'.join(row) + '\n' for row in zip(*fields))
+        return ''.join('\t'.join(field[i] for field in fields) + '\n' for i in rows.tolist())
+
     def map(self):
         """Second pass mapper to normalize values"""
-        for line in sys.stdin:
-            try:
-                fields = line.strip().split('\t')
-                if len(fields) <= self.age_idx:
-                    continue
-                
-                user_id = fields[0]
-                age = fields[self.age_idx]
-                
-                if age and age != "null":
-                    try:
-                        age = float(age)
-                        # Z-score normalization
-                        z_score = (age - self.stats['age']['mean']) / self.stats['age']['std']
-                        # Min-max normalization
-                        min_max = (age - self.stats['age']['min']) / (self.stats['age']['max'] - self.stats['age']['min'])
-                        
-                        print(f"{user_id}\t{age}\t{z_score:.4f}\t{min_max:.4f}")
-                    except ValueError:
-                        continue
-                        
-            except Exception:
+        for frame in read_profiles(sys.stdin, [0] + self.indices, CHUNK_SIZE):
+            text = self.normalize(frame)
+            if not text:
                 continue
+            if self.writer:
+                self.writer.write_text('', text)
+            else:
+                sys.stdout.write(text)
+
+        if self.writer:
+            self.writer.close()
+
 
 class NormalizeReducer:
+    def __init__(self, header):
+        self.header = header
+
     def reduce(self):
         """Second pass reducer to format output"""
-        print("user_id\toriginal_age\tz_score\tmin_max_normalized")
-        
+        print(self.header)
+
         for line in sys.stdin:
             try:
                 print(line.strip())
             except Exception:
                 continue
 
+
+def parse_list(args, i):
+    return args[i].split(',') if len(args) > i and args[i] else None
+
+
 if __name__ == '__main__':
+    usage = ("Usage: python task9_normalize_features.py [stats_mapper|stats_combiner|stats_reducer]\n"
+             "       python task9_normalize_features.py stats_local <profiles_file> [stats_file]\n"
+             "       python task9_normalize_features.py [normalize_mapper|normalize_reducer|header] "
+             "<stats_file> [columns] [z_score,min_max,robust]\n"
+             "       python task9_normalize_features.py normalize_shard <output_dir> <stats_file> "
+             "[columns] [methods] [task_id]")
     if len(sys.argv) < 2:
-        print("Usage: python script.py [stats_mapper|stats_reducer|normalize_mapper|normalize_reducer]")
+        print(usage)
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == "stats_mapper":
+            StatsMapper().map()
+        elif sys.argv[1] == "stats_combiner":
+            StatsReducer(final=False).reduce()
+        elif sys.argv[1] == "stats_reducer":
+            StatsReducer().reduce()
+        elif sys.argv[1] == "stats_local" and len(sys.argv) in (3, 4):
+            stats_file = sys.argv[3] if len(sys.argv) == 4 else STATS_FILE
+            stats = collect_stats(read_profiles(sys.argv[2], range(1, len(PROFILE_COLUMNS)), CHUNK_SIZE))
+            os.makedirs(os.path.dirname(stats_file) or '.', exist_ok=True)
+            with open(stats_file, 'w') as f:
+                write_stats(stats, f)
+            print(f"Statistics written to {stats_file}")
+        elif sys.argv[1] == "normalize_mapper" and 3 <= len(sys.argv) <= 5:
+            mapper = NormalizeMapper()
+            mapper.configure(sys.argv[2], parse_list(sys.argv, 3), parse_list(sys.argv, 4))
+            mapper.map()
+        elif sys.argv[1] == "normalize_shard" and 4 <= len(sys.argv) <= 7:
+            # Local or shared-filesystem runs only: part-m-<task> shards plus a _header manifest
+            mapper = NormalizeMapper()
+            mapper.configure(sys.argv[3], parse_list(sys.argv, 4), parse_list(sys.argv, 5))
+            task_id = int(sys.argv[6]) if len(sys.argv) == 7 else None
+            mapper.writer = ShardWriter(sys.argv[2], output_header(mapper.columns, mapper.methods), task_id)
+            mapper.map()
+        elif sys.argv[1] == "normalize_reducer" and 3 <= len(sys.argv) <= 5:
+            mapper = NormalizeMapper()
+            mapper.configure(sys.argv[2], parse_list(sys.argv, 3), parse_list(sys.argv, 4))
+            NormalizeReducer(output_header(mapper.columns, mapper.methods)).reduce()
+        elif sys.argv[1] == "header" and 3 <= len(sys.argv) <= 5:
+            # Header of map-only normalize_mapper output, stored once by the driver
+            mapper = NormalizeMapper()
+            mapper.configure(sys.argv[2], parse_list(sys.argv, 3), parse_list(sys.argv, 4))
+            print(output_header(mapper.columns, mapper.methods))
+        else:
+            print(usage)
+            sys.exit(1)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}\n{usage}")
         sys.exit(1)
-        
-    if sys.argv[1] == "stats_mapper":
-        mapper = StatsMapper()
-        mapper.map()
-    elif sys.argv[1] == "stats_reducer":
-        reducer = StatsReducer()
-        reducer.reduce()
-    elif sys.argv[1] == "normalize_mapper":
-        mapper = NormalizeMapper()
-        if len(sys.argv) > 2:
-            mapper.configure(sys.argv[2])
-        mapper.map()
-    elif sys.argv[1] == "normalize_reducer":
-        reducer = NormalizeReducer()
-        reducer.reduce()
-    else:
-        print("Invalid argument. Use 'stats_mapper', 'stats_reducer', 'normalize_mapper', or 'normalize_reducer'")
-        sys.exit(1) 
\ No newline at end of file
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Term statistics over the free-text profile columns.
+
+Tokens (diacritic-folded words) are counted with the hashing trick, so the
+state per column is two fixed-size arrays of term and document frequencies
+indexed by crc32(token) % n_features, no matter how large the vocabulary is.
+Actual heavy-hitter terms are tracked with a Space-Saving sketch per column.
+Mappers buffer exact counts in memory (in-mapper combining) and fold them into
+the fixed-size state when the buffer fills up.
+
+Every line of mapper, combiner and reducer output merges by addition:
+    N \t column \t documents \t tokens
+    H \t column \t bucket \t term_frequency \t document_frequency
+    F \t column \t sketch floor
+    T \t column \t term \t count offset \t error offset
+"""
+import math
+import sys
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from groupby_engine import PROFILE_COLUMNS, read_profiles
+from sketches import SpaceSaving
+from text_utils import tokenize
+
+# hobbies, my_active_sports and the other mostly free-text columns
+TEXT_COLUMNS = [10, 11, 12, 13, 24, 31, 33, 37, 39, 40, 41, 42, 58]
+N_FEATURES = 2 ** 18
+TOP_K = 100
+MAX_BUFFERED_TERMS = 200000
+
+
+def term_bucket(term, n_features=N_FEATURES):
+    # crc32 rather than hash(): it must agree across mapper processes
+    return zlib.crc32(term.encode('utf-8')) % n_features
+
+
+class ColumnVocabulary:
+    """Mergeable term statistics for one column"""
+    def __init__(self, n_features=N_FEATURES, top_k=TOP_K):
+        self.n_features = n_features
+        self.tf = np.zeros(n_features, dtype=np.int64)
+        self.df = np.zeros(n_features, dtype=np.int64)
+        self.documents = 0
+        self.tokens = 0
+        self.top = SpaceSaving(top_k)
+        self.buffer_tf = defaultdict(int)
+        self.buffer_df = defaultdict(int)
+
+    def add_document(self, tokens):
+        if not tokens:
+            return
+        self.documents += 1
+        self.tokens += len(tokens)
+        for token in tokens:
+            self.buffer_tf[token] += 1
+        for token in set(tokens):
+            self.buffer_df[token] += 1
+        if len(self.buffer_tf) >= MAX_BUFFERED_TERMS:
+            self.flush()
+
+    def flush(self):
+        """Fold the exact in-memory counts into the hashed arrays and the sketch"""
+        if not self.buffer_tf:
+            return
+        terms = list(self.buffer_tf)
+        buckets = np.array([term_bucket(term, self.n_features) for term in terms])
+        np.add.at(self.tf, buckets, [self.buffer_tf[term] for term in terms])
+        np.add.at(self.df, buckets, [self.buffer_df[term] for term in terms])
+        self.top.update(self.buffer_tf)
+        self.buffer_tf.clear()
+        self.buffer_df.clear()
+
+    def emit(self, column, out=sys.stdout):
+        self.flush()
+        out.write(f"N\t{column}\t{self.documents}\t{self.tokens}\n")
+        for bucket in np.flatnonzero(self.tf):
+            out.write(f"H\t{column}\t{bucket}\t{self.tf[bucket]}\t{self.df[bucket]}\n")
+        floor, offsets = self.top.to_parts()
+        out.write(f"F\t{column}\t{floor}\n")
+        for term, count, error in offsets:
+            out.write(f"T\t{column}\t{term}\t{count}\t{error}\n")
+
+
+def read_state(lines, n_features=N_FEATURES, top_k=TOP_K):
+    """Sum mapper/combiner lines into {column: ColumnVocabulary}"""
+    vocabularies = {}
+    floors = defaultdict(int)
+    offsets = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    def vocabulary(column):
+        if column not in vocabularies:
+            vocabularies[column] = ColumnVocabulary(n_features, top_k)
+        return vocabularies[column]
+
+    for line in lines:
+        try:
+            parts = line.rstrip('\n').split('\t')
+            kind, column = parts[0], int(parts[1])
+            if kind == 'N':
+                vocabulary(column).documents += int(parts[2])
+                vocabulary(column).tokens += int(parts[3])
+            elif kind == 'H':
+                bucket = int(parts[2])
+                vocabulary(column).tf[bucket] += int(parts[3])
+                vocabulary(column).df[bucket] += int(parts[4])
+            elif kind == 'F':
+                floors[column] += int(parts[2])
+            elif kind == 'T':
+                entry = offsets[column][parts[2]]
+                entry[0] += int(parts[3])
+                entry[1] += int(parts[4])
+        except Exception:
+            continue
+
+    for column in offsets.keys() | floors.keys():
+        vocabulary(column).top = SpaceSaving.from_parts(floors[column], offsets[column], top_k)
+    return vocabularies
+
+
+class VocabularyMapper:
+    def __init__(self, columns=None):
+        self.columns = columns or TEXT_COLUMNS
+        self.vocabularies = {column: ColumnVocabulary() for column in self.columns}
+
+    def add_frame(self, frame):
+        for column in self.columns:
+            vocabulary = self.vocabularies[column]
+            for text in frame[column]:
+                vocabulary.add_document(tokenize(text))
+
+    def map(self):
+        for frame in read_profiles(sys.stdin, self.columns):
+            self.add_frame(frame)
+        for column, vocabulary in self.vocabularies.items():
+            vocabulary.emit(column)
+
+
+class VocabularyReducer:
+    def reduce(self):
+        """Merge partial states; also usable as the combiner"""
+        for column, vocabulary in sorted(read_state(sys.stdin).items()):
+            vocabulary.emit(column)
+
+
+def report(vocabularies, out=sys.stdout):
+    for column, vocabulary in sorted(vocabularies.items()):
+        used = int(np.count_nonzero(vocabulary.tf))
+        out.write(f"\n{PROFILE_COLUMNS[column]} (column {column}): {vocabulary.documents} documents, "
+                  f"{vocabulary.tokens} tokens, {used} of {vocabulary.n_features} hash buckets used\n")
+        out.write("Term\tCount\tMax_Overcount\tPercentage\n")
+        out.write("-" * 60 + "\n")
+        for term, count, error in vocabulary.top.top():
+            out.write(f"{term}\t{count}\t{error}\t{count / vocabulary.tokens * 100:.2f}\n")
+
+
+def save_vocabulary(vocabularies, path):
+    columns = sorted(vocabularies)
+    np.savez_compressed(
+        path,
+        columns=np.array(columns),
+        documents=np.array([vocabularies[c].documents for c in columns]),
+        df=np.stack([vocabularies[c].df for c in columns]) if columns else np.zeros((0, N_FEATURES)),
+    )
+
+
+class TfidfMapper:
+    """Map-only: per-user hashed TF-IDF rows as user_id \t index:weight ..."""
+    def __init__(self, vocabulary_file):
+        with np.load(vocabulary_file) as data:
+            self.columns = data['columns'].tolist()
+            documents = data['documents']
+            df = data['df']
+        self.n_features = df.shape[1]
+        # Smoothed inverse document frequency per (column, bucket)
+        self.idf = np.log((1 + documents[:, None]) / (1 + df)) + 1
+
+    def rows(self, source):
+        """Yield (user_id, [text per column]) for every profile"""
+        for frame in read_profiles(source, [0] + self.columns):
+            for row in zip(*(frame[column] for column in [0] + self.columns)):
+                yield row[0], row[1:]
+
+    def transform(self, texts):
+        """{feature index: L2-normalised tf-idf} for one profile; columns get separate blocks"""
+        weights = defaultdict(float)
+        for slot, text in enumerate(texts):
+            for token in tokenize(text):
+                bucket = term_bucket(token, self.n_features)
+                weights[slot * self.n_features + bucket] += self.idf[slot, bucket]
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {index: weight / norm for index, weight in weights.items()} if norm else {}
+
+    def map(self):
+        for user_id, texts in self.rows(sys.stdin):
+            weights = self.transform(texts)
+            if weights:
+                cells = ' '.join(f"{index}:{weight:.4f}" for index, weight in sorted(weights.items()))
+                print(f"{user_id}\t{cells}")
+
+
+def export_tfidf(input_file, vocabulary_file, output_file):
+    """Local export of the per-user TF-IDF matrix as a scipy .npz plus user ids"""
+    from scipy.sparse import csr_matrix, save_npz
+
+    mapper = TfidfMapper(vocabulary_file)
+    user_ids, indices, data, indptr = [], [], [], [0]
+    for user_id, texts in mapper.rows(input_file):
+        weights = mapper.transform(texts)
+        user_ids.append(int(user_id))
+        for index in sorted(weights):
+            indices.append(index)
+            data.append(weights[index])
+        indptr.append(len(indices))
+
+    shape = (len(user_ids), len(mapper.columns) * mapper.n_features)
+    matrix = csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32),
+                         np.array(indptr, dtype=np.int64)), shape=shape)
+    save_npz(output_file, matrix)
+    np.save(output_file.replace('.npz', '') + '_user_ids.npy', np.array(user_ids, dtype=np.int64))
+
+
+if __name__ == '__main__':
+    usage = ("Usage: python term_vocabulary.py mapper [col,col,...]\n"
+             "       python term_vocabulary.py reducer\n"
+             "       python term_vocabulary.py report <reducer_output> <vocabulary.npz>\n"
+             "       python term_vocabulary.py local <profiles_file> <vocabulary.npz> [col,col,...]\n"
+             "       python term_vocabulary.py tfidf_mapper <vocabulary.npz>\n"
+             "       python term_vocabulary.py tfidf <profiles_file> <vocabulary.npz> <tfidf.npz>")
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    def parse_columns(arg):
+        return [int(column) for column in arg.split(',')]
+
+    if sys.argv[1] == "mapper":
+        VocabularyMapper(parse_columns(sys.argv[2]) if len(sys.argv) > 2 else None).map()
+    elif sys.argv[1] == "reducer":
+        VocabularyReducer().reduce()
+    elif sys.argv[1] == "report" and len(sys.argv) == 4:
+        with open(sys.argv[2], encoding='utf-8') as f:
+            vocabularies = read_state(f)
+        report(vocabularies)
+        save_vocabulary(vocabularies, sys.argv[3])
+    elif sys.argv[1] == "local" and len(sys.argv) in (4, 5):
+        mapper = VocabularyMapper(parse_columns(sys.argv[4]) if len(sys.argv) == 5 else None)
+        for frame in read_profiles(sys.argv[2], mapper.columns):
+            mapper.add_frame(frame)
+        for vocabulary in mapper.vocabularies.values():
+            vocabulary.flush()
+        report(mapper.vocabularies)
+        save_vocabulary(mapper.vocabularies, sys.argv[3])
+    elif sys.argv[1] == "tfidf_mapper" and len(sys.argv) == 3:
+        TfidfMapper(sys.argv[2]).map()
+    elif sys.argv[1] == "tfidf" and len(sys.argv) == 5:
+        export_tfidf(sys.argv[2], sys.argv[3], sys.argv[4])
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Text helpers shared by the jobs that read free-text profile columns."""
+import re
+import unicodedata
+from collections import defaultdict
+
+COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+TOKEN_PATTERN = re.compile(r'[^\W\d_]{2,}')  # words of 2+ letters
+
+
+def fold_diacritics(text):
+    """Lowercase and strip accents, e.g. 'Plávanie, Lyžovanie' -> 'plavanie, lyzovanie'"""
+    if text.isascii():
+        return text.lower()
+    return COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text)).lower()
+
+
+def tokenize(text):
+    """Diacritic-folded word tokens of a free-text field ("null" has none)"""
+    if not text or text == "null":
+        return []
+    return TOKEN_PATTERN.findall(fold_diacritics(text))
+
+
+def _trie_pattern(node):
+    """Regex for a keyword trie; alternatives share prefixes and longer matches win"""
+    alternatives = [re.escape(char) + _trie_pattern(child)
+                    for char, child in sorted(node.items()) if char != '']
+    if not alternatives:
+        return ''
+    body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    if '' in node:
+        return '(?:' + body + ')?'
+    return body
+
+
+class KeywordCategorizer:
+    """Multi-label keyword matcher built once from {category: [keywords]}.
+
+    All keywords are compiled into a single trie-shaped regex, so a text is
+    scanned once regardless of how many categories there are. The pattern is
+    a lookahead, which reports the longest keyword starting at every position;
+    each keyword also carries the categories of the keywords it contains, so
+    overlapping and nested keywords are all found. Matching is case- and
+    diacritic-insensitive.
+    """
+    def __init__(self, categories):
+        self.categories = list(categories)
+        keyword_categories = defaultdict(set)
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                if keyword.strip():
+                    keyword_categories[fold_diacritics(keyword.strip())].add(category)
+
+        self.keyword_categories = {}
+        for keyword in keyword_categories:
+            self.keyword_categories[keyword] = frozenset().union(
+                *(cats for other, cats in keyword_categories.items() if other in keyword))
+
+        trie = {}
+        for keyword in self.keyword_categories:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self.pattern = re.compile('(?=(' + _trie_pattern(trie) + '))') if trie else None
+
+    def categorize(self, text):
+        """Set of all categories with a keyword in text"""
+        found = set()
+        if self.pattern is None:
+            return found
+        for keyword in set(self.pattern.findall(fold_diacritics(text))):
+            found |= self.keyword_categories[keyword]
+        return found